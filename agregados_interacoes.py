@@ -0,0 +1,252 @@
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from recomendacao import normalizar_descricao
+
+# --- AGREGADOS POR HORA/DIA DO LOG DE INTERAÇÕES (+ retenção) ---
+# 'user_interactions' ganha um documento por requisição. Em vez de varrer o
+# log bruto, os painéis e a mineração de consultas quentes leem
+# 'interacoes_agregadas', um documento por
+#   (granularidade "hora"|"dia", início do balde, dimensão, valor) -> n
+# com as dimensões "total", "sentimento", "poema" e "entrada" (descrição
+# normalizada). A agregação é incremental: lê só o que chegou depois do
+# último (timestamp, _id) processado e soma com $inc + upsert. Só até
+# agora - INTERACOES_GRACA_SEGUNDOS: um worker que grava com um pouco de
+# atraso (relógio, fila, insert lento) ainda cai antes do marcador.
+#
+# Cada lote soma nos baldes com um identificador (o último _id do lote) que
+# fica guardado no balde ('lotes', os últimos LOTES_LEMBRADOS): se o
+# processo cair entre os baldes e o marcador, o mesmo lote relido na próxima
+# execução não soma de novo.
+#
+# Retenção:
+#   - eventos brutos: desligada por padrão. Com INTERACOES_RETENCAO_DIAS > 0
+#     o job de linha de comando (não o servidor) apaga, depois de agregar, os
+#     eventos mais velhos que o prazo E que o marcador da agregação: nada
+#     some antes de ser contado. Sem índice TTL (o monitor do TTL apagaria
+#     cargas históricas antes da agregação); um TTL antigo é removido em
+#     garantir_indices;
+#   - baldes por hora: expiram depois de AGREGADOS_HORA_RETENCAO_DIAS (30);
+#   - baldes por dia: ficam para sempre (são poucos).
+#
+# Cargas diretas nos baldes (leitor_extended_json.py --destino agregados)
+# guardam o _id de cada evento somado em 'interacoes_carregadas'; a
+# agregação pula esses _id se os mesmos eventos também forem inseridos em
+# user_interactions (--destino mongo). Eventos ao vivo nunca são pulados.
+#
+# Uso (cron): python agregados_interacoes.py
+
+ESTADO_ID = "agregados_interacoes"
+COLECAO = "interacoes_agregadas"
+CARREGADAS = "interacoes_carregadas"
+LOTES_LEMBRADOS = 20
+GRACA_SEGUNDOS = int(os.getenv("INTERACOES_GRACA_SEGUNDOS", "120"))
+LOTE_LEITURA = 1000
+RETENCAO_BRUTOS_DIAS = int(os.getenv("INTERACOES_RETENCAO_DIAS", "0"))
+RETENCAO_HORA_DIAS = int(os.getenv("AGREGADOS_HORA_RETENCAO_DIAS", "30"))
+
+
+def baldes(timestamp):
+    """Início do balde de hora e do de dia de um timestamp."""
+    hora = timestamp.replace(minute=0, second=0, microsecond=0)
+    return (("hora", hora), ("dia", hora.replace(hour=0)))
+
+
+def dimensoes(interacao):
+    """Pares (dimensão, valor) que uma interação incrementa."""
+    pares = [("total", "")]
+    if interacao.get("detected_sentiment"):
+        pares.append(("sentimento", interacao["detected_sentiment"]))
+    if interacao.get("recommended_poem_id") is not None:
+        pares.append(("poema", str(interacao["recommended_poem_id"])))
+    entrada = normalizar_descricao(interacao.get("user_input") or "")
+    if entrada:
+        pares.append(("entrada", entrada))
+    return pares
+
+
+def operacoes_de_incremento(contagens, lote=None):
+    """UpdateOne ($inc com upsert) para cada (g, t, d, v) -> n; com 'lote', só onde ele ainda não foi somado."""
+    operacoes = []
+    for (granularidade, inicio, dimensao, valor), n in contagens.items():
+        definir = {}
+        if granularidade == "hora" and RETENCAO_HORA_DIAS > 0:
+            definir["expira_em"] = inicio + timedelta(days=RETENCAO_HORA_DIAS)
+        filtro = {"g": granularidade, "t": inicio, "d": dimensao, "v": valor}
+        atualizacao = {"$inc": {"n": n}}
+        if definir:
+            atualizacao["$setOnInsert"] = definir
+        if lote is not None:
+            filtro["lotes"] = {"$ne": lote}
+            atualizacao["$push"] = {"lotes": {"$each": [lote], "$slice": -LOTES_LEMBRADOS}}
+        operacoes.append(UpdateOne(filtro, atualizacao, upsert=True))
+    return operacoes
+
+
+def somar_nos_baldes(db, contagens, lote):
+    """$inc dos baldes, idempotente por lote: reaplicar o mesmo 'lote' não soma de novo."""
+    if not contagens:
+        return
+    try:
+        db[COLECAO].bulk_write(operacoes_de_incremento(contagens, lote), ordered=False)
+    except BulkWriteError as e:
+        # Chave duplicada: o balde já tem o lote (o filtro não casou e o upsert colidiu no índice único)
+        if any(erro.get("code") != 11000 for erro in e.details.get("writeErrors", [])):
+            raise
+
+
+def contar(contagens, interacao):
+    for granularidade, inicio in baldes(interacao["timestamp"]):
+        for dimensao, valor in dimensoes(interacao):
+            contagens[(granularidade, inicio, dimensao, valor)] += 1
+
+
+def agregar_interacoes(db, lease_segundos=120):
+    """Soma as interações novas nos baldes. Retorna quantas foram lidas (0 se outro processo está agregando)."""
+    estados = db["job_state"]
+    agora = datetime.utcnow()
+    estados.update_one({"_id": ESTADO_ID}, {"$setOnInsert": {"ultimo_timestamp": None, "ultimo_id": None,
+                                                             "lease_ate": None}}, upsert=True)
+
+    # Só um processo (worker do gunicorn, cron...) agrega por vez
+    estado = estados.find_one_and_update(
+        {"_id": ESTADO_ID, "$or": [{"lease_ate": None}, {"lease_ate": {"$lt": agora}}]},
+        {"$set": {"lease_ate": agora + timedelta(seconds=lease_segundos)}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if estado is None:
+        return 0
+
+    # O marcador nunca passa de 'corte': eventos mais novos podem ainda não ter chegado todos
+    corte = agora - timedelta(seconds=GRACA_SEGUNDOS)
+    query = {"timestamp": {"$ne": None, "$lte": corte}}
+    if estado["ultimo_timestamp"] is not None:
+        query = {"timestamp": {"$lte": corte}, "$or": [
+            {"timestamp": {"$gt": estado["ultimo_timestamp"]}},
+            {"timestamp": estado["ultimo_timestamp"], "_id": {"$gt": estado["ultimo_id"]}},
+        ]}
+    lidas = 0
+    lote = []
+
+    def gravar_progresso():
+        # Baldes (idempotentes pelo último _id do lote) e depois o marcador
+        if not lote:
+            return
+        carregadas = {doc["_id"] for doc in db[CARREGADAS].find({"_id": {"$in": [i["_id"] for i in lote]}})}
+        contagens = Counter()
+        for interacao in lote:
+            if interacao["_id"] not in carregadas:  # Já somada pelo leitor_extended_json.py
+                contar(contagens, interacao)
+        ultimo = (lote[-1]["timestamp"], lote[-1]["_id"])
+        somar_nos_baldes(db, contagens, f"agregacao:{ultimo[1]}")
+        estados.update_one({"_id": ESTADO_ID}, {"$set": {
+            "ultimo_timestamp": ultimo[0], "ultimo_id": ultimo[1],
+            "lease_ate": datetime.utcnow() + timedelta(seconds=lease_segundos),
+        }})
+        lote.clear()
+
+    try:
+        cursor = (db["user_interactions"]
+                  .find(query, {"user_input": 1, "timestamp": 1, "detected_sentiment": 1, "recommended_poem_id": 1})
+                  .sort([("timestamp", ASCENDING), ("_id", ASCENDING)])
+                  .batch_size(LOTE_LEITURA))
+        for interacao in cursor:
+            lote.append(interacao)
+            lidas += 1
+            if len(lote) >= LOTE_LEITURA:
+                gravar_progresso()
+        gravar_progresso()
+    finally:
+        estados.update_one({"_id": ESTADO_ID}, {"$set": {"lease_ate": None}})
+    return lidas
+
+
+def registrar_carregadas(db, ids):
+    """Anota os _id somados direto nos baldes (a agregação não os conta de novo)."""
+    if not ids:
+        return
+    agora = datetime.utcnow()
+    try:
+        db[CARREGADAS].insert_many([{"_id": i, "carregado_em": agora} for i in ids], ordered=False)
+    except BulkWriteError as e:
+        # _id já anotado (o mesmo export carregado de novo): nada a fazer
+        if any(erro.get("code") != 11000 for erro in e.details.get("writeErrors", [])):
+            raise
+
+
+def aplicar_retencao(db, dias=RETENCAO_BRUTOS_DIAS):
+    """Apaga eventos brutos mais velhos que 'dias' e já agregados. Devolve quantos (0 = desligada)."""
+    if dias <= 0:
+        return 0
+    estado = db["job_state"].find_one({"_id": ESTADO_ID}) or {}
+    if estado.get("ultimo_timestamp") is None:
+        return 0  # Nada agregado ainda
+    limite = min(datetime.utcnow() - timedelta(days=dias), estado["ultimo_timestamp"])
+    return db["user_interactions"].delete_many({"timestamp": {"$lt": limite}}).deleted_count
+
+
+def _remover_ttl(collection, campo):
+    """Remove um índice TTL antigo em 'campo' (a retenção agora é feita por aplicar_retencao)."""
+    for indice in collection.list_indexes():
+        if "expireAfterSeconds" in indice and list(indice["key"].keys()) == [campo]:
+            try:
+                collection.drop_index(indice["name"])
+            except OperationFailure:
+                pass  # Outro processo removeu primeiro
+
+
+def garantir_indices(db):
+    db["user_interactions"].create_index([("timestamp", ASCENDING), ("_id", ASCENDING)])
+    db[COLECAO].create_index([("g", ASCENDING), ("d", ASCENDING), ("t", ASCENDING), ("v", ASCENDING)], unique=True)
+    db[COLECAO].create_index([("expira_em", ASCENDING)], expireAfterSeconds=0)
+    _remover_ttl(db["user_interactions"], "timestamp")
+
+
+def consultas_mais_frequentes(db, limite, janela_dias=30):
+    """As descrições normalizadas mais pedidas na janela, somando os baldes diários."""
+    inicio = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=janela_dias)
+    return list(db[COLECAO].aggregate([
+        {"$match": {"g": "dia", "d": "entrada", "t": {"$gte": inicio}}},
+        {"$group": {"_id": "$v", "contagem": {"$sum": "$n"}}},
+        {"$sort": {"contagem": DESCENDING, "_id": ASCENDING}},
+        {"$limit": limite},
+    ]))
+
+
+def serie(db, granularidade, dimensao, inicio, fim=None):
+    """Baldes de uma dimensão num intervalo (para painéis): [{t, v, n}] em ordem de tempo."""
+    filtro = {"g": granularidade, "d": dimensao, "t": {"$gte": inicio}}
+    if fim is not None:
+        filtro["t"]["$lt"] = fim
+    return list(db[COLECAO].find(filtro, {"_id": 0, "t": 1, "v": 1, "n": 1}).sort("t", ASCENDING))
+
+
+# --- EXECUÇÃO VIA LINHA DE COMANDO (ex: cron) ---
+if __name__ == "__main__":
+    from conexao import NOME_BANCO, criar_cliente
+
+    client = criar_cliente()
+    db = client[NOME_BANCO]
+    garantir_indices(db)
+
+    start_time = time.time()
+    lidas = agregar_interacoes(db)
+    end_time = time.time()
+    print(f"{lidas} interações novas agregadas em {end_time - start_time:.2f}s.")
+    apagadas = aplicar_retencao(db)
+    if apagadas:
+        print(f"{apagadas} interações já agregadas e com mais de {RETENCAO_BRUTOS_DIAS} dias apagadas.")
+
+    ontem = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    print("\nInterações por sentimento (últimos 2 dias):")
+    for balde in serie(db, "dia", "sentimento", ontem):
+        print(f"  {balde['t']:%Y-%m-%d}  {balde['v']:<10} {balde['n']:>6}")
+    print("\nConsultas mais frequentes (30 dias):")
+    for documento in consultas_mais_frequentes(db, 10):
+        print(f"  {documento['contagem']:>6}  {documento['_id']}")
+    client.close()
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient
+
+from conexao import NOME_BANCO, monitor_de_comandos
+from recomendacao import analisar_descricao, montar_resposta, pipelines_de_busca
+from snapshot_catalogo import CatalogoSnapshot
+
+# --- VARIANTE ASSÍNCRONA (ASGI) DA API DE RECOMENDAÇÃO ---
+# Mesmo contrato JSON do POST /api/recommend do app_principal.py, mas:
+#   - o I/O com o MongoDB (aggregate + insert) roda no event loop, com o
+#     driver assíncrono do próprio pymongo (AsyncMongoClient);
+#   - a análise do TextBlob (CPU) vai para um executor de tamanho fixo,
+#     com um semáforo limitando quantas análises ficam na fila.
+#
+# Rodar com: WEB_CONCURRENCY=4 uvicorn app_async:app --host 0.0.0.0 --port 5001
+# (WEB_CONCURRENCY é o --workers do uvicorn e divide as CPUs entre os pools)
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "2000"))
+# "processos" escapa do GIL (TextBlob é Python puro); "threads" evita o custo de IPC
+ANALISE_EXECUTOR = os.getenv("ANALISE_EXECUTOR", "processos")
+# Cada worker do uvicorn tem o seu pool: as CPUs são divididas entre eles
+WORKERS_UVICORN = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+ANALISE_WORKERS = int(os.getenv("ANALISE_WORKERS", max(1, (os.cpu_count() or 2) // WORKERS_UVICORN)))
+ANALISE_FILA_MAX = int(os.getenv("ANALISE_FILA_MAX", ANALISE_WORKERS * 4))
+
+
+class Estado:
+    client = None
+    db = None
+    catalogo = None
+    executor = None
+    vagas_analise = None
+    tarefas_pendentes = set()
+
+
+async def iniciar():
+    opcoes = {"serverSelectionTimeoutMS": MONGO_TIMEOUT_MS, "connectTimeoutMS": MONGO_TIMEOUT_MS}
+    monitor = monitor_de_comandos()
+    if monitor is not None:
+        opcoes["event_listeners"] = [monitor]
+    Estado.client = AsyncMongoClient(MONGO_URI, **opcoes)
+    Estado.db = Estado.client.get_database(NOME_BANCO)
+    if os.getenv("CATALOGO_SNAPSHOT"):
+        Estado.catalogo = CatalogoSnapshot(os.getenv("CATALOGO_SNAPSHOT"))
+
+    if ANALISE_EXECUTOR == "threads":
+        Estado.executor = ThreadPoolExecutor(max_workers=ANALISE_WORKERS)
+    else:
+        Estado.executor = ProcessPoolExecutor(max_workers=ANALISE_WORKERS)
+    Estado.vagas_analise = asyncio.Semaphore(ANALISE_FILA_MAX)
+
+    # Aquece o executor (carrega o TextBlob em cada processo/thread)
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(
+        loop.run_in_executor(Estado.executor, analisar_descricao, "Estou pensativo hoje.")
+        for _ in range(ANALISE_WORKERS)
+    ))
+    print(f"✅ App assíncrono pronto ({ANALISE_WORKERS} {ANALISE_EXECUTOR} de análise)")
+
+
+async def encerrar():
+    if Estado.tarefas_pendentes:
+        await asyncio.gather(*Estado.tarefas_pendentes, return_exceptions=True)
+    if Estado.executor is not None:
+        Estado.executor.shutdown(wait=True)
+    if Estado.client is not None:
+        await Estado.client.close()
+
+
+async def recomendar_poema_mongo_async(sentimento, keyword=None):
+    poemas_collection = Estado.db["poems"]
+    for pipeline in pipelines_de_busca(sentimento, keyword):
+        cursor = await poemas_collection.aggregate(pipeline)
+        resultado = await cursor.to_list(length=1)
+        if resultado:
+            return resultado[0]
+    return None
+
+
+async def salvar_interacao(documento):
+    try:
+        await Estado.db["user_interactions"].insert_one(documento)
+    except Exception:
+        pass # Não falha se não conseguir salvar log
+
+
+async def recommend(data):
+    user_desc = str(data.get("description", "")).strip()
+    if not user_desc:
+        return 400, {"ok": False, "error": "Descrição vazia"}
+
+    # 1. Análise no executor (CPU fora do event loop, com fila limitada)
+    loop = asyncio.get_running_loop()
+    async with Estado.vagas_analise:
+        analise = await loop.run_in_executor(Estado.executor, analisar_descricao, user_desc)
+
+    # 2. Busca (catálogo mapeado, se houver, senão MongoDB assíncrono)
+    try:
+        if Estado.catalogo is not None:
+            poema = Estado.catalogo.sortear(analise["sentiment"], analise["keyword"])
+        else:
+            poema = await recomendar_poema_mongo_async(analise["sentiment"], analise["keyword"])
+    except Exception as e:
+        print(f"⚠️ Falha ao consultar o MongoDB: {e}")
+        poema = None
+
+    if not poema:
+        return 500, {"ok": False, "error": "Banco de dados vazio ou erro de conexão"}
+
+    # 3. O log da interação não segura a resposta
+    tarefa = asyncio.create_task(salvar_interacao({
+        "user_input": user_desc,
+        "detected_sentiment": analise["sentiment"],
+        "recommended_poem_id": poema["_id"],
+        "timestamp": datetime.utcnow()
+    }))
+    Estado.tarefas_pendentes.add(tarefa)
+    tarefa.add_done_callback(Estado.tarefas_pendentes.discard)
+
+    return 200, montar_resposta(poema, analise)
+
+
+# --- PROTOCOLO ASGI ---
+
+async def _ler_corpo(receive):
+    partes = []
+    while True:
+        mensagem = await receive()
+        partes.append(mensagem.get("body", b""))
+        if not mensagem.get("more_body"):
+            return b"".join(partes)
+
+
+async def _responder(send, status, conteudo):
+    corpo = json.dumps(conteudo, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corpo)).encode()),
+            (b"access-control-allow-origin", b"*"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": corpo})
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                try:
+                    await iniciar()
+                except Exception as e:
+                    # O servidor não sobe e mostra o motivo; libera o que chegou a ser criado
+                    try:
+                        await encerrar()
+                    finally:
+                        await send({"type": "lifespan.startup.failed", "message": f"{type(e).__name__}: {e}"})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                await encerrar()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    rota = (scope["method"], scope["path"])
+    if rota == ("POST", "/api/recommend"):
+        corpo = await _ler_corpo(receive)
+        try:
+            data = json.loads(corpo or b"{}")
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        status, conteudo = await recommend(data)
+        await _responder(send, status, conteudo)
+    elif rota == ("GET", "/api/health"):
+        await _responder(send, 200, {"ok": True, "modo": "async"})
+    else:
+        await _responder(send, 404, {"ok": False, "error": "Rota não encontrada"})
@@ -3,6 +3,8 @@ import sys
 import subprocess
 import json
 import random
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -10,13 +12,30 @@ from textblob import TextBlob
 from deep_translator import GoogleTranslator
 
 # Bibliotecas Web
-from flask import Flask, request, jsonify, send_from_directory
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 
 # Bibliotecas de Dados e IA
-from pymongo import MongoClient
+from conexao import NOME_BANCO, criar_cliente
 from textblob import TextBlob
 
+from catalogo import CAMPOS_CATALOGO, CatalogoPoemas
+from consultas_quentes import CacheQuente
+from contador_recomendacoes import ContadorRecomendacoes
+from disjuntor import Disjuntor, DisjuntorAberto
+from estatisticas_corpus import COLECAO as COLECAO_ESTATISTICAS, DOCUMENTO_ID as ESTATISTICAS_ID, resumo
+from metricas import METRICAS
+from observador_poemas import ObservadorPoemas
+from recomendacao import analisar_descricao, normalizar_descricao, pipelines_de_busca
+from repositorio import abrir_repositorio
+from respostas import ArquivoEstatico, limite_da_consulta, renderizar_fragmento, resposta_de_fragmento
+from sessoes import SessoesVistos
+from vizinhos_poemas import ids_de_binario
+from single_flight import SingleFlight
+from snapshot_catalogo import CatalogoSnapshot, exportar_snapshot
+
 # --- CONFIGURAÇÃO ---
 app = Flask(__name__, static_folder="static", template_folder="templates")
 CORS(app) # Permite que o front-end converse com o back-end sem erros de segurança
@@ -36,68 +55,320 @@ load_dotenv()
 # Pega a URI da variável de ambiente OU usa o localhost como padrão (fallback)
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 
+# Timeouts curtos: com o banco fora do ar, o padrão do driver (30 s de
+# server selection) travaria cada requisição antes de devolver erro.
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "2000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "5000"))
+
 # Conexão MongoDB
-try:
-    # Agora passamos a variável MONGO_URI, não o texto fixo
-    client = MongoClient(MONGO_URI)
-    
-    # Opcional: Se sua string de conexão do Atlas tiver um nome de banco diferente,
-    # você pode garantir que pegamos o banco certo aqui:
-    db = client.get_database("projeto_poesia_db") 
-    
-    print(f"✅ Conectado ao MongoDB em: {MONGO_URI.split('@')[-1]}") # Mostra só o final por segurança
-except Exception as e:
-    print(f"❌ Erro ao conectar no MongoDB: {e}")
-    db = None
+def conectar_mongo():
+    """Cria o MongoClient. Com o gunicorn é chamada de novo em cada worker
+    (post_fork), porque clientes do pymongo não podem atravessar um fork."""
+    global client, db
+    try:
+        # Agora passamos a variável MONGO_URI, não o texto fixo
+        client = criar_cliente(
+            MONGO_URI,
+            serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        )
+
+        # Opcional: Se sua string de conexão do Atlas tiver um nome de banco diferente,
+        # você pode garantir que pegamos o banco certo aqui:
+        db = client.get_database(NOME_BANCO)
+
+        print(f"✅ Conectado ao MongoDB em: {MONGO_URI.split('@')[-1]}") # Mostra só o final por segurança
+    except Exception as e:
+        print(f"❌ Erro ao conectar no MongoDB: {e}")
+        client = None
+        db = None
+
+
+client = None
+db = None
+conectar_mongo()
+
+# Disjuntor em volta das chamadas ao banco: depois de algumas falhas
+# seguidas paramos de tentar por um tempo e servimos do snapshot local.
+disjuntor = Disjuntor(
+    limite_falhas=int(os.getenv("DISJUNTOR_LIMITE_FALHAS", "3")),
+    tempo_reabertura=float(os.getenv("DISJUNTOR_REABERTURA_SEGUNDOS", "30")),
+)
+
+# Snapshot local dos poemas enriquecidos (mesmo formato do snapshot_catalogo.py),
+# usado quando o MongoDB está indisponível ("modo degradado").
+SNAPSHOT_FALLBACK = Path(os.getenv("SNAPSHOT_FALLBACK", BASE_DIR / "poemas_fallback.snapshot"))
+SNAPSHOT_FALLBACK_MAX_IDADE = float(os.getenv("SNAPSHOT_FALLBACK_MAX_IDADE_HORAS", "24")) * 3600
+_catalogo_fallback = None
+_catalogo_fallback_lock = threading.Lock()
+
+# Alterações em 'poems' (enriquecimento, importação) aplicadas poema a poema
+# no catálogo em memória e no cache de consultas quentes (OBSERVAR_POEMAS=0
+# desliga). Criado antes da carga do catálogo para não perder nada no meio.
+def aplicar_alteracao_poema(poema):
+    if catalogo is not None and catalogo.mutavel:
+        catalogo.atualizar_poema(poema)
+    if cache_quente is not None:
+        cache_quente.descartar_poema(poema["_id"])
+
+
+def remover_poema(poem_id):
+    if catalogo is not None and catalogo.mutavel:
+        catalogo.remover_poema(poem_id)
+    if cache_quente is not None:
+        cache_quente.descartar_poema(poem_id)
+
+
+observador = None
+if db is not None and os.getenv("OBSERVAR_POEMAS", "1") == "1":
+    observador = ObservadorPoemas(
+        db, aplicar_alteracao_poema, remover_poema,
+        intervalo=float(os.getenv("OBSERVADOR_INTERVALO_SEGUNDOS", "5")),
+    )
+
+# Catálogo em memória (opcional):
+#   CATALOGO_SNAPSHOT=arquivo -> abre o snapshot binário via mmap (páginas
+#                                compartilhadas entre os workers do gunicorn)
+#   CATALOGO_EM_MEMORIA=1     -> carrega os poemas do MongoDB na subida
+#   POESIA_ARMAZENAMENTO=sqlite:arquivo.db
+#                             -> carrega os poemas do arquivo local (repositorio.py),
+#                                para servir sem servidor de banco
+# Em todos os casos o sorteio deixa de ir ao banco a cada requisição.
+catalogo = None
+CATALOGO_SNAPSHOT = os.getenv("CATALOGO_SNAPSHOT")
+ARMAZENAMENTO = os.getenv("POESIA_ARMAZENAMENTO", "mongo")
+if CATALOGO_SNAPSHOT:
+    try:
+        catalogo = CatalogoSnapshot(CATALOGO_SNAPSHOT)
+        print(f"📚 Snapshot do catálogo mapeado: {len(catalogo)} poemas ({CATALOGO_SNAPSHOT})")
+    except Exception as e:
+        print(f"⚠️ Não foi possível abrir o snapshot do catálogo: {e}")
+        catalogo = None
+elif ARMAZENAMENTO.startswith("sqlite:"):
+    try:
+        repositorio_local = abrir_repositorio(ARMAZENAMENTO)
+        catalogo = CatalogoPoemas(repositorio_local.todos(CAMPOS_CATALOGO))
+        repositorio_local.fechar()
+        print(f"📚 Catálogo carregado do arquivo local: {len(catalogo)} poemas ({ARMAZENAMENTO})")
+    except Exception as e:
+        print(f"⚠️ Não foi possível carregar o catálogo do arquivo local: {e}")
+        catalogo = None
+elif db is not None and os.getenv("CATALOGO_EM_MEMORIA", "0") == "1":
+    try:
+        catalogo = CatalogoPoemas.carregar(db["poems"])
+        print(f"📚 Catálogo em memória carregado: {len(catalogo)} poemas")
+    except Exception as e:
+        print(f"⚠️ Não foi possível carregar o catálogo em memória: {e}")
+        catalogo = None
+
+
+def obter_catalogo_fallback():
+    """Abre (uma vez) o snapshot local usado no modo degradado."""
+    global _catalogo_fallback
+    if _catalogo_fallback is None and SNAPSHOT_FALLBACK.exists():
+        with _catalogo_fallback_lock:
+            if _catalogo_fallback is None:
+                try:
+                    _catalogo_fallback = CatalogoSnapshot(SNAPSHOT_FALLBACK)
+                except Exception as e:
+                    print(f"⚠️ Snapshot de fallback ilegível: {e}")
+    return _catalogo_fallback
+
+
+def atualizar_snapshot_fallback():
+    """Regrava o snapshot local com os poemas já enriquecidos (roda em segundo plano)."""
+    global _catalogo_fallback
+    try:
+        query = {"sentiment_analysis.primary_sentiment": {"$ne": None}}
+        poemas = disjuntor.chamar(lambda: list(db["poems"].find(query, CAMPOS_CATALOGO)))
+        total = exportar_snapshot(poemas, SNAPSHOT_FALLBACK)
+        with _catalogo_fallback_lock:
+            _catalogo_fallback = None  # reabre na próxima vez que for preciso
+        print(f"💾 Snapshot de fallback atualizado: {total} poemas ({SNAPSHOT_FALLBACK})")
+    except Exception as e:
+        print(f"⚠️ Não foi possível atualizar o snapshot de fallback: {e}")
+
+
+def atualizar_snapshot_fallback_se_velho():
+    """Regrava o snapshot se estiver velho; com vários workers, só um deles faz o trabalho."""
+    snapshot_idade = time.time() - SNAPSHOT_FALLBACK.stat().st_mtime if SNAPSHOT_FALLBACK.exists() else None
+    if snapshot_idade is not None and snapshot_idade <= SNAPSHOT_FALLBACK_MAX_IDADE:
+        return
+    trava = SNAPSHOT_FALLBACK.with_name(SNAPSHOT_FALLBACK.name + ".lock")
+    try:
+        descritor = os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        # Outro worker está gerando; trava esquecida (processo morto) vence em 10 minutos
+        if time.time() - trava.stat().st_mtime < 600:
+            return
+        trava.unlink(missing_ok=True)
+        return atualizar_snapshot_fallback_se_velho()
+    try:
+        os.close(descritor)
+        atualizar_snapshot_fallback()
+    finally:
+        trava.unlink(missing_ok=True)
+
+# Contador de 'times_recommended': acumula em memória e grava em lote
+contador = None
+if db is not None:
+    contador = ContadorRecomendacoes(
+        db["poems"],
+        intervalo=float(os.getenv("INTERVALO_FLUSH_CONTADORES", "30")),
+        catalogo=catalogo,
+    )
+
+# Sessões "sem repetição" (só com o catálogo em memória): o front-end manda
+# um 'session_id' e não recebe de novo um poema que já viu naquela sessão.
+sessoes = SessoesVistos(
+    ttl=float(os.getenv("SESSAO_TTL_SEGUNDOS", "1800")),
+    max_sessoes=int(os.getenv("SESSAO_MAX", "10000")),
+)
+
+
+# --- TAREFAS DE FUNDO ---
+# Nada de thread na importação do módulo: com o preload_app do gunicorn o
+# mestre só carrega o app e o catálogo; flush do contador, consultas
+# quentes, observador de 'poems' e snapshot de fallback sobem em cada
+# worker (post_fork), ou na primeira requisição com outros servidores.
+_pid_das_tarefas = None
+
+
+def iniciar_tarefas_de_fundo():
+    """Sobe as threads de fundo neste processo (uma vez por processo)."""
+    global _pid_das_tarefas
+    if _pid_das_tarefas == os.getpid():
+        return
+    _pid_das_tarefas = os.getpid()
+    if os.getenv("METRICAS_DIR"):  # Soma as métricas de todos os workers no /metrics
+        METRICAS.compartilhar(os.environ["METRICAS_DIR"])
+    if db is None:
+        return
+    if contador is not None:
+        contador.reiniciar(db["poems"])
+    if cache_quente is not None:
+        cache_quente.iniciar(db)
+    if observar_poemas:
+        observador.iniciar(db)
+    threading.Thread(target=atualizar_snapshot_fallback_se_velho, name="snapshot-fallback", daemon=True).start()
+
+
+def reiniciar_apos_fork():
+    """Recursos que não sobrevivem ao fork: cliente do MongoDB, estado do
+    disjuntor e threads de fundo."""
+    disjuntor.reiniciar()
+    conectar_mongo()
+    iniciar_tarefas_de_fundo()
+
+
+def aquecer(mongo=True):
+    """Deixa a primeira requisição tão rápida quanto as outras.
+
+    Carrega os corpora/modelos do TextBlob, abre o pool de conexões do
+    MongoDB e toca as páginas do catálogo (se houver). No mestre do gunicorn
+    é chamada com mongo=False: o ping fica para cada worker (post_worker_init).
+    """
+    TextBlob("Estou me sentindo reflexivo e pensando sobre o tempo").sentiment
+    if mongo and db is not None:
+        try:
+            disjuntor.chamar(db.command, "ping")
+        except Exception as e:
+            print(f"⚠️ Aquecimento: MongoDB não respondeu ao ping: {e}")
+    if catalogo is not None and len(catalogo):
+        catalogo.sortear("neutral")
+
 
 # --- LÓGICA DE RECOMENDAÇÃO (DO NOSSO PROJETO ANTERIOR) ---
-def recomendar_poema_mongo(sentimento_usuario, keyword_usuario=None):
-    if db is None: return None
-    
+# Quantos poemas cada busca no banco devolve (só os campos do catálogo). A
+# busca é compartilhada entre requisições simultâneas (single-flight) e cada
+# uma sorteia o seu poema dentro desse conjunto, então o resultado continua
+# variado mesmo na primeira rajada de pedidos iguais.
+CANDIDATOS_POR_BUSCA = int(os.getenv("CANDIDATOS_POR_BUSCA", "20"))
+
+# Requisições idênticas em paralelo dividem a mesma análise e a mesma busca
+voo_analise = SingleFlight()
+voo_busca = SingleFlight()
+
+
+def buscar_candidatos_mongo(sentimento_usuario, keyword_usuario=None, tamanho=CANDIDATOS_POR_BUSCA):
+    if db is None: return []
+
     poemas_collection = db["poems"]
-    query_filter = {}
 
-    # 1. Filtro por Sentimento
-    if sentimento_usuario:
-        query_filter["recommendation_tags.good_for_feeling"] = sentimento_usuario.lower()
+    # Tenta do filtro mais específico ao mais genérico:
+    # sentimento + keyword -> só sentimento -> qualquer poema aleatório
+    for nivel, pipeline in enumerate(pipelines_de_busca(sentimento_usuario, keyword_usuario, tamanho)):
+        with METRICAS.cronometro("etapa_segundos", etapa="mongo_aggregate", nivel=nivel):
+            resultado = list(poemas_collection.aggregate(pipeline))
+        if resultado:
+            if nivel > 0:
+                METRICAS.incrementar("fallback", nivel=nivel)
+            return resultado
+    return []
 
-    # 2. Filtro por Keyword (Opcional)
-    if keyword_usuario:
-        # Busca flexível (regex) ou exata no array
-        query_filter["sentiment_analysis.keywords"] = keyword_usuario.lower()
 
-    # Pipeline de busca
-    pipeline = []
-    if query_filter:
-        pipeline.append({"$match": query_filter})
-    
-    pipeline.append({"$sample": {"size": 1}}) # Pega um aleatório
+def recomendar_poema_mongo(sentimento_usuario, keyword_usuario=None):
+    candidatos = voo_busca.executar(
+        (sentimento_usuario, keyword_usuario),
+        disjuntor.chamar, buscar_candidatos_mongo, sentimento_usuario, keyword_usuario,
+    )
+    return random.choice(candidatos) if candidatos else None
 
-    resultado = list(poemas_collection.aggregate(pipeline))
-    
-    if resultado:
-        return resultado[0]
-    else:
-        # Fallback: Se não achou com keyword, tenta só com sentimento
-        if keyword_usuario and sentimento_usuario:
-            return recomendar_poema_mongo(sentimento_usuario, None)
-        # Fallback Final: Qualquer poema aleatório
-        pipeline_random = [{"$sample": {"size": 1}}]
-        res_random = list(poemas_collection.aggregate(pipeline_random))
-        return res_random[0] if res_random else None
+
+def buscar_candidatos_quentes(sentimento_usuario, keyword_usuario=None):
+    # Com o catálogo em memória o sorteio já é local: basta guardar a análise
+    if catalogo is not None:
+        return []
+    return disjuntor.chamar(buscar_candidatos_mongo, sentimento_usuario, keyword_usuario)
+
+
+# Cache das descrições mais frequentes do log (CONSULTAS_QUENTES=0 desliga)
+cache_quente = None
+if db is not None and os.getenv("CONSULTAS_QUENTES", "1") == "1":
+    cache_quente = CacheQuente(
+        db,
+        buscar_candidatos_quentes,
+        tamanho=int(os.getenv("CONSULTAS_QUENTES_TAMANHO", "200")),
+        intervalo=float(os.getenv("CONSULTAS_QUENTES_INTERVALO", "300")),
+    )
+
+# Só observa se há o que manter em dia vindo do MongoDB (o snapshot mapeado
+# é somente leitura; o catálogo do arquivo SQLite não vem do MongoDB)
+observar_poemas = observador is not None and not ARMAZENAMENTO.startswith("sqlite:") and (
+    (catalogo is not None and catalogo.mutavel) or cache_quente is not None)
 
 # --- ROTAS DA API ---
 
+# index.html lido e comprimido (gzip/br) uma vez; servido com ETag e cache longo
+INDEX_MAX_AGE = int(os.getenv("INDEX_MAX_AGE", str(7 * 24 * 3600)))
+_index_html = None
+
+
 @app.route("/", methods=["GET"])
 def index():
+    global _index_html
     # Cria a pasta static se não existir, para não dar erro
     if not os.path.exists(app.static_folder):
         os.makedirs(app.static_folder)
     # Tenta servir o index.html, ou cria um aviso se não existir
-    try:
-        return send_from_directory("static", "index.html")
-    except:
-        return "<h1>API de Poesia Rodando!</h1><p>Coloque seu 'index.html' na pasta 'static'.</p>"
+    if _index_html is None:
+        try:
+            _index_html = ArquivoEstatico(os.path.join(app.static_folder, "index.html"), "text/html; charset=utf-8")
+        except OSError:
+            return "<h1>API de Poesia Rodando!</h1><p>Coloque seu 'index.html' na pasta 'static'.</p>"
+
+    cabecalhos = {
+        "ETag": f'"{_index_html.etag}"',
+        "Cache-Control": f"public, max-age={INDEX_MAX_AGE}",
+        "Vary": "Accept-Encoding",
+    }
+    if _index_html.corresponde(request.headers.get("If-None-Match")):
+        return Response(status=304, headers=cabecalhos)
+    codificacao, corpo = _index_html.escolher(request.headers.get("Accept-Encoding"))
+    if codificacao != "identity":
+        cabecalhos["Content-Encoding"] = codificacao
+    return Response(corpo, mimetype=_index_html.mimetype, headers=cabecalhos)
 
 @app.route("/api/recommend", methods=["POST"])
 def recommend():
@@ -105,64 +376,189 @@ def recommend():
     Recebe: JSON { "description": "Estou me sentindo triste e pensando no amor" }
     Retorna: JSON com o poema e a análise.
     """
-    data = request.get_json() or {}
-    user_desc = data.get("description", "").strip()
+    with METRICAS.cronometro("etapa_segundos", etapa="parse"):
+        data = request.get_json() or {}
+        user_desc = data.get("description", "").strip()
 
     if not user_desc:
         return jsonify({"ok": False, "error": "Descrição vazia"}), 400
 
     # 1. ANALISAR O INPUT DO USUÁRIO (Mini-NLP na hora)
-    # Usamos o TextBlob para entender se a frase do usuário é positiva ou negativa
-    blob = TextBlob(user_desc)
-    polarity = blob.sentiment.polarity
-    
-    if polarity >= 0.1:
-        detected_sentiment = "positive"
-        sentiment_display = "Positivo"
-    elif polarity <= -0.1:
-        detected_sentiment = "negative"
-        sentiment_display = "Negativo"
+    chave = normalizar_descricao(user_desc)
+    quente = cache_quente.obter(chave) if cache_quente is not None else None
+    if quente is not None:
+        analise = quente["analise"]
+        METRICAS.incrementar("cache_quente_acertos")
     else:
-        detected_sentiment = "neutral"
-        sentiment_display = "Neutro"
-
-    # (Opcional) Tentar extrair uma palavra-chave simples da frase
-    # Aqui pegamos a última palavra maior que 4 letras como "chute" de keyword
-    # Ou passamos None para focar no sentimento
-    words = [w for w in user_desc.split() if len(w) > 4]
-    detected_keyword = words[-1].lower() if words else None
+        with METRICAS.cronometro("etapa_segundos", etapa="nlp"):
+            analise = voo_analise.executar(chave, analisar_descricao, user_desc)
+    detected_sentiment = analise["sentiment"]
+    detected_keyword = analise["keyword"]
 
-    # 2. BUSCAR NO MONGODB
-    poema = recomendar_poema_mongo(detected_sentiment, detected_keyword)
+    # 2. BUSCAR O POEMA (catálogo em memória, se carregado, ou MongoDB)
+    session_id = data.get("session_id") or request.headers.get("X-Session-Id")
+    indice, fonte = None, None  # Catálogo de origem do poema (para a resposta pré-renderizada)
+    if catalogo is not None and session_id:
+        vistos = sessoes.obter(str(session_id))
+        indice = catalogo.sortear_indice(detected_sentiment, detected_keyword, excluir=vistos)
+        if indice is None and len(catalogo):
+            # A sessão já viu todo o catálogo: recomeça o ciclo
+            vistos.limpar()
+            indice = catalogo.sortear_indice(detected_sentiment, detected_keyword)
+        if indice is not None:
+            vistos.adicionar(indice)
+        poema = catalogo.poema(indice) if indice is not None else None
+        fonte = catalogo
+    elif catalogo is not None:
+        indice = catalogo.sortear_indice(detected_sentiment, detected_keyword)
+        poema = catalogo.poema(indice) if indice is not None else None
+        fonte = catalogo
+    elif quente is not None and quente["candidatos"]:
+        poema = random.choice(quente["candidatos"])
+    else:
+        poema = None
+        banco_indisponivel = db is None
+        if db is not None:
+            try:
+                poema = recomendar_poema_mongo(detected_sentiment, detected_keyword)
+            except DisjuntorAberto:
+                banco_indisponivel = True
+            except Exception as e:
+                print(f"⚠️ Falha ao consultar o MongoDB, usando snapshot local: {e}")
+                banco_indisponivel = True
+        if banco_indisponivel:
+            # Modo degradado: banco fora do ar, responde do snapshot local
+            fonte = obter_catalogo_fallback()
+            indice = fonte.sortear_indice(detected_sentiment, detected_keyword) if fonte else None
+            poema = fonte.poema(indice) if indice is not None else None
 
     if poema:
-        # Monta a resposta bonita
-        resposta = {
-            "ok": True,
-            "sentiment": f"Detectamos um tom {sentiment_display}. Recomendação:",
-            "poem": f"{poema['title'].upper()}\n\n{poema['full_text']}\n\n-- {poema['author']}",
-            "details": {
-                "tags": poema.get("recommendation_tags", {}).get("evokes", []),
-                "match_sentiment": detected_sentiment
-            }
-        }
-        
+        if contador is not None:
+            contador.registrar(poema["_id"])
+
         # (Opcional) Salvar Interação
         try:
-            db["user_interactions"].insert_one({
-                "user_input": user_desc,
-                "detected_sentiment": detected_sentiment,
-                "recommended_poem_id": poema["_id"],
-                "timestamp": datetime.utcnow()
-            })
+            with METRICAS.cronometro("etapa_segundos", etapa="insert_interacao"):
+                disjuntor.chamar(db["user_interactions"].insert_one, {
+                    "user_input": user_desc,
+                    "detected_sentiment": detected_sentiment,
+                    "recommended_poem_id": poema["_id"],
+                    "timestamp": datetime.utcnow()
+                })
         except:
             pass # Não falha se não conseguir salvar log
 
-        return jsonify(resposta)
+        # Monta a resposta bonita (o miolo do poema vem pronto do catálogo)
+        with METRICAS.cronometro("etapa_segundos", etapa="serializacao"):
+            fragmento = fonte.fragmento(indice) if indice is not None else renderizar_fragmento(poema)
+            return Response(resposta_de_fragmento(fragmento, analise), mimetype="application/json")
     else:
+        METRICAS.incrementar("sem_resultado")
         return jsonify({"ok": False, "error": "Banco de dados vazio ou erro de conexão"}), 500
 
 
+SIMILARES_LIMITE = 20
+
+
+@app.route("/api/poems/<poem_id>/similar", methods=["GET"])
+def similar(poem_id):
+    """Poemas parecidos com um poema, pré-calculados pelo vizinhos_poemas.py."""
+    try:
+        poem_id = ObjectId(poem_id)
+    except (InvalidId, TypeError):
+        return jsonify({"ok": False, "error": "Id de poema inválido"}), 400
+    limite = limite_da_consulta(request.args.get("limite"), 10, SIMILARES_LIMITE)
+    if db is None:
+        return jsonify({"ok": False, "error": "Banco de dados indisponível"}), 503
+
+    try:
+        documento = disjuntor.chamar(db["poem_neighbors"].find_one, {"_id": poem_id})
+    except Exception as e:
+        return jsonify({"ok": False, "error": f"Erro ao consultar vizinhos: {e}"}), 503
+    if documento is None:
+        return jsonify({"ok": False, "error": "Poema sem vizinhos calculados"}), 404
+
+    ids = ids_de_binario(documento["vizinhos"])[:limite]
+    scores = documento["scores"][:limite]
+    # Com o catálogo em memória os vizinhos saem dele; senão, uma leitura só com $in
+    if catalogo is not None:
+        indices = {vizinho: catalogo.indice_de(vizinho) for vizinho in ids}
+        poemas = {vizinho: catalogo.poema(i) for vizinho, i in indices.items() if i is not None}
+    else:
+        poemas = {p["_id"]: p for p in db["poems"].find(
+            {"_id": {"$in": ids}}, {"title": 1, "author": 1, "recommendation_tags.evokes": 1})}
+
+    return jsonify({
+        "ok": True,
+        "poem_id": str(poem_id),
+        "similar": [
+            {"_id": str(vizinho), "title": poemas[vizinho]["title"], "author": poemas[vizinho]["author"],
+             "score": score, "tags": (poemas[vizinho].get("recommendation_tags") or {}).get("evokes") or []}
+            for vizinho, score in zip(ids, scores) if vizinho in poemas
+        ],
+    })
+
+
+ESTATISTICAS_TAGS_LIMITE = 500
+
+
+@app.route("/api/stats", methods=["GET"])
+def stats():
+    """Cobertura do enriquecimento, sentimentos e tags: um documento mantido pelos scripts de escrita."""
+    if db is None:
+        return jsonify({"ok": False, "error": "Banco de dados indisponível"}), 503
+    try:
+        documento = disjuntor.chamar(db[COLECAO_ESTATISTICAS].find_one, {"_id": ESTATISTICAS_ID})
+    except Exception as e:
+        return jsonify({"ok": False, "error": f"Erro ao consultar estatísticas: {e}"}), 503
+    if documento is None:
+        return jsonify({"ok": False, "error": "Estatísticas ainda não calculadas (rode estatisticas_corpus.py)"}), 404
+    limite_tags = limite_da_consulta(request.args.get("tags"), 50, ESTATISTICAS_TAGS_LIMITE)
+    return jsonify({"ok": True, **resumo(documento, limite_tags)})
+
+
+@app.before_request
+def marcar_inicio_requisicao():
+    g.inicio_requisicao = time.perf_counter()
+    if _pid_das_tarefas != os.getpid():  # Servidor sem o post_fork do gunicorn
+        iniciar_tarefas_de_fundo()
+
+
+@app.after_request
+def medir_requisicao(resposta):
+    inicio = g.get("inicio_requisicao")
+    if inicio is not None and request.endpoint == "recommend":
+        METRICAS.observar("requisicao_segundos", time.perf_counter() - inicio, status=resposta.status_code)
+    return resposta
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Métricas no formato texto do Prometheus."""
+    return Response(METRICAS.texto_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/api/health", methods=["GET"])
+def health():
+    """Informa se estamos servindo do MongoDB (normal) ou do snapshot local (degradado)."""
+    estado_banco = disjuntor.estado
+    if catalogo is not None:
+        modo = "catalogo"
+    elif db is None or estado_banco != "fechado":
+        modo = "degradado"
+    else:
+        modo = "normal"
+    return jsonify({
+        "ok": True,
+        "modo": modo,
+        "mongo": {"conectado": db is not None, "disjuntor": estado_banco,
+                  "falhas_seguidas": disjuntor.falhas_seguidas},
+        "snapshot_fallback": {"arquivo": str(SNAPSHOT_FALLBACK), "existe": SNAPSHOT_FALLBACK.exists()},
+        "observador": {"modo": observador.modo, "alteracoes_aplicadas": observador.aplicadas}
+                      if observador is not None and observador.ativo else None,
+    })
+
+
 # --- ROTAS DE ADMINISTRAÇÃO (Scripts) ---
 
 @app.route("/api/import_poems", methods=["POST"])
@@ -203,4 +599,5 @@ def run_script(script_path):
 if __name__ == "__main__":
     print(f"🚀 Iniciando servidor Flask...")
     print(f"📂 Diretório Base: {BASE_DIR}")
+    iniciar_tarefas_de_fundo()
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+# --- BENCHMARK: APP SÍNCRONO (Flask/gunicorn) x APP ASSÍNCRONO (ASGI) ---
+# Sobe a concorrência em degraus e mede requisições/segundo e latências em
+# cada degrau. O número que importa é o maior req/s com p99 dentro do
+# limite (--p99-ms): é ele que comparamos entre os dois apps.
+#
+# Exemplo (com os dois servidores no ar, apontando para o mesmo banco):
+#   gunicorn -c gunicorn.conf.py wsgi:app                    (porta 5000)
+#   uvicorn app_async:app --port 5001 --workers 4
+#   python benchmark_async.py http://localhost:5000 http://localhost:5001
+
+DESCRICOES = [
+    "Estou me sentindo reflexivo e pensando sobre o tempo",
+    "Estou me sentindo triste hoje. Gostaria de algo que me anime",
+    "Estou pensando bastante sobre a vida e a morte ultimamente",
+    "Estou me sentindo bastante animado e empolgado",
+    "Estou muito feliz!",
+    "Estou pensativo hoje.",
+]
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    posicao = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[posicao]
+
+
+def _cliente(url_base, fim, latencias, erros, lock, descricoes, deslocamento):
+    partes = urlsplit(url_base)
+    conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+    i = deslocamento
+    minhas_latencias, meus_erros = [], 0
+    while time.perf_counter() < fim:
+        corpo = json.dumps({"description": descricoes[i % len(descricoes)]})
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            conexao.request("POST", "/api/recommend", corpo, {"Content-Type": "application/json"})
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status != 200:
+                meus_erros += 1
+        except Exception:
+            meus_erros += 1
+            conexao.close()
+            conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+            continue
+        minhas_latencias.append(time.perf_counter() - inicio)
+    conexao.close()
+    with lock:
+        latencias.extend(minhas_latencias)
+        erros[0] += meus_erros
+
+
+def medir(url_base, concorrencia, duracao, descricoes=DESCRICOES):
+    """Roda 'concorrencia' clientes por 'duracao' segundos e devolve as estatísticas."""
+    latencias, erros, lock = [], [0], threading.Lock()
+    fim = time.perf_counter() + duracao
+    threads = [
+        threading.Thread(target=_cliente, args=(url_base, fim, latencias, erros, lock, descricoes, n))
+        for n in range(concorrencia)
+    ]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "concorrencia": concorrencia,
+        "requisicoes": len(latencias),
+        "erros": erros[0],
+        "req_por_segundo": len(latencias) / decorrido if decorrido else 0.0,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+    }
+
+
+def capacidade(url_base, p99_ms, duracao, niveis):
+    """Maior req/s cujo p99 fica dentro do limite."""
+    degraus, melhor = [], None
+    for concorrencia in niveis:
+        resultado = medir(url_base, concorrencia, duracao)
+        degraus.append(resultado)
+        print(f"  {url_base} c={concorrencia:<4} {resultado['req_por_segundo']:8.1f} req/s  "
+              f"p50={resultado['p50_ms']:.1f}ms p99={resultado['p99_ms']:.1f}ms erros={resultado['erros']}")
+        if resultado["p99_ms"] <= p99_ms and resultado["erros"] == 0:
+            if melhor is None or resultado["req_por_segundo"] > melhor["req_por_segundo"]:
+                melhor = resultado
+        elif melhor is not None:
+            break # Passou do limite: degraus maiores só pioram o p99
+    return {"url": url_base, "melhor": melhor, "degraus": degraus}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara req/s com p99 fixo entre o app síncrono e o assíncrono.")
+    parser.add_argument("url_sync", help="ex: http://localhost:5000")
+    parser.add_argument("url_async", help="ex: http://localhost:5001")
+    parser.add_argument("--p99-ms", type=float, default=200.0)
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos por degrau")
+    parser.add_argument("--niveis", default="1,2,4,8,16,32,64,128")
+    parser.add_argument("--saida", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    niveis = [int(n) for n in args.niveis.split(",")]
+    resultados = {}
+    for nome, url in (("sync", args.url_sync), ("async", args.url_async)):
+        print(f"\n--- {nome.upper()} ({url}) ---")
+        resultados[nome] = capacidade(url, args.p99_ms, args.duracao, niveis)
+
+    print(f"\n--- CAPACIDADE COM p99 <= {args.p99_ms:.0f}ms ---")
+    for nome, resultado in resultados.items():
+        melhor = resultado["melhor"]
+        if melhor:
+            print(f"{nome:>5}: {melhor['req_por_segundo']:.1f} req/s (concorrência {melhor['concorrencia']})")
+        else:
+            print(f"{nome:>5}: nenhum degrau dentro do limite")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"p99_ms": args.p99_ms, "resultados": resultados}, f, indent=2)
@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmark_async import medir, percentil
+from leitor_extended_json import ler_registros
+from regras_enriquecimento import derivar_evokes
+
+# --- SUÍTE DE BENCHMARK REPRODUTÍVEL (servidor + enriquecimento) ---
+# 1. Gera um corpus sintético de poemas em português, com o MESMO esquema
+#    de documento do importar_poemas.py (já com os campos de enriquecimento
+#    preenchidos, para o recomendador ter o que filtrar).
+# 2. Carrega o corpus num mongod local (--mongo) ou num substituto em
+#    processo (o catálogo em memória, padrão), sem precisar de servidor.
+# 3. Reproduz descrições no estilo de 'user_interactions' contra o
+#    /api/recommend (in-process pelo test_client do Flask, ou --url para um
+#    servidor de verdade) e mede vazão e latências p50/p95/p99.
+# 4. Mede poemas/s de cada etapa do enriquecimento (TextBlob, spaCy, evokes).
+# 5. Grava tudo em JSON (com o commit atual) para comparar execuções:
+#    python benchmark_poesia.py --poemas 5000 --comparar benchmarks/anterior.json
+
+BASE_DIR = Path(__file__).resolve().parent
+SEMENTE_PADRAO = 42
+
+SUBSTANTIVOS = ["amor", "saudade", "mar", "noite", "vida", "morte", "tempo", "olhos", "coração", "sol",
+                "lua", "estrela", "silêncio", "vento", "chuva", "flor", "rio", "sonho", "alma", "dor",
+                "esperança", "memória", "caminho", "céu", "terra", "fogo", "sombra", "luz", "verso", "beijo"]
+ADJETIVOS = ["triste", "feliz", "sereno", "escuro", "claro", "profundo", "leve", "eterno", "frio", "quente",
+             "belo", "sombrio", "doce", "amargo", "calmo", "infinito", "perdido", "antigo", "novo", "vazio"]
+VERBOS = ["canta", "chora", "espera", "lembra", "esquece", "sonha", "ama", "parte", "volta", "arde",
+          "cala", "brilha", "morre", "nasce", "passa", "fica", "dança", "sangra", "floresce", "respira"]
+AUTORES = ["Ana Lima", "Carlos Souza", "Mariana Alves", "João Pereira", "Beatriz Costa",
+           "Paulo Martins", "Cecília Rocha", "Rafael Dias", "Helena Barros", "Tiago Nunes"]
+SECUNDARIOS = {
+    "POSITIVE": ["Apaixonado", "Esperançoso", "Sereno"],
+    "NEGATIVE": ["Melancólico", "Sombrio", "Crítico"],
+    "NEUTRAL": ["Introspectivo", "Contemplativo"],
+}
+DESCRICOES_BASE = [
+    "Estou me sentindo reflexivo e pensando sobre o tempo",
+    "Estou me sentindo triste hoje. Gostaria de algo que me anime",
+    "Estou pensando bastante sobre a vida e a morte ultimamente",
+    "Estou me sentindo bastante animado e empolgado",
+    "Estou muito feliz!",
+    "Estou extremamente triste hoje",
+    "Estou pensativo hoje.",
+]
+
+
+# --- 1. CORPUS SINTÉTICO ---
+
+def gerar_verso(rng):
+    return f"{rng.choice(['o', 'a', 'teu', 'meu'])} {rng.choice(SUBSTANTIVOS)} {rng.choice(ADJETIVOS)} " \
+           f"{rng.choice(VERBOS)} {rng.choice(['na', 'no', 'sem', 'com'])} {rng.choice(SUBSTANTIVOS)}"
+
+
+def gerar_poema(rng, enriquecido=True):
+    """Documento no esquema do importar_poemas.py (opcionalmente já enriquecido)."""
+    estrofes = ["\n".join(gerar_verso(rng) for _ in range(rng.randint(3, 5))) for _ in range(rng.randint(1, 4))]
+    primario = rng.choice(["POSITIVE", "NEGATIVE", "NEUTRAL"])
+    keywords = rng.sample(SUBSTANTIVOS, 5)
+    secundario = [rng.choice(SECUNDARIOS[primario])]
+    return {
+        "title": f"{rng.choice(SUBSTANTIVOS).capitalize()} {rng.choice(ADJETIVOS)}",
+        "author": rng.choice(AUTORES),
+        "full_text": "\n\n".join(estrofes),
+        "sentiment_analysis": {
+            "primary_sentiment": primario if enriquecido else None,
+            "secondary_sentiment": secundario if enriquecido else None,
+            "score": round(rng.uniform(-1, 1), 3) if enriquecido else None,
+            "keywords": keywords if enriquecido else [],
+        },
+        "recommendation_tags": {
+            "evokes": [t.lower() for t in keywords + secundario] if enriquecido else [],
+            "good_for_feeling": [primario.lower()] if enriquecido else [],
+            "intensity": "media",
+        },
+        "metadata": {
+            "views_csv": rng.randint(0, 100000),
+            "times_recommended": 0,
+            "average_rating": 0,
+        },
+    }
+
+
+def gerar_corpus(quantidade, semente=SEMENTE_PADRAO, enriquecido=True):
+    rng = random.Random(semente)
+    return [gerar_poema(rng, enriquecido) for _ in range(quantidade)]
+
+
+def carregar_descricoes(caminho, quantidade, semente=SEMENTE_PADRAO):
+    """Descrições no estilo de user_interactions: as do export (se existir) + variações."""
+    descricoes = list(DESCRICOES_BASE)
+    if caminho and Path(caminho).exists():
+        # Em fluxo: os exports de produção não cabem num json.load
+        with open(caminho, encoding="utf-8") as f:
+            descricoes += [item["user_input"] for item in ler_registros(f) if item.get("user_input")]
+    rng = random.Random(semente)
+    variacoes = [f"Estou pensando em {rng.choice(SUBSTANTIVOS)} e me sentindo {rng.choice(ADJETIVOS)}"
+                 for _ in range(max(0, quantidade - len(descricoes)))]
+    return descricoes + variacoes
+
+
+# --- 2. CARGA ---
+
+def carregar_no_mongo(corpus, uri, banco):
+    from conexao import criar_cliente
+    from pymongo import ASCENDING
+
+    client = criar_cliente(uri)
+    collection = client[banco]["poems"]
+    collection.drop()
+    inicio = time.perf_counter()
+    for i in range(0, len(corpus), 1000):
+        collection.insert_many([dict(poema) for poema in corpus[i:i + 1000]])
+    collection.create_index([("recommendation_tags.good_for_feeling", ASCENDING)])
+    collection.create_index([("sentiment_analysis.keywords", ASCENDING)])
+    decorrido = time.perf_counter() - inicio
+    client.close()
+    return {"poemas": len(corpus), "segundos": round(decorrido, 3),
+            "poemas_por_segundo": round(len(corpus) / decorrido, 1)}
+
+
+def preparar_app(substituto, corpus):
+    """Importa o app Flask; no modo substituto ele serve do catálogo em memória, sem banco."""
+    os.environ.setdefault("CONSULTAS_QUENTES", "0")
+    import app_principal
+    from catalogo import CatalogoPoemas
+    from bson import ObjectId
+
+    if substituto:
+        for poema in corpus:
+            poema.setdefault("_id", ObjectId())
+        app_principal.catalogo = CatalogoPoemas(corpus)
+        app_principal.db = None
+        app_principal.contador = None
+    return app_principal.app
+
+
+# --- 3. REPLAY CONTRA /api/recommend ---
+
+def replay_in_process(app, descricoes, requisicoes, concorrencia):
+    latencias, erros, lock = [], [0], threading.Lock()
+    proxima = iter(range(requisicoes))
+
+    def cliente():
+        test_client = app.test_client()
+        minhas, meus_erros = [], 0
+        while True:
+            with lock:
+                i = next(proxima, None)
+            if i is None:
+                break
+            inicio = time.perf_counter()
+            resposta = test_client.post("/api/recommend", json={"description": descricoes[i % len(descricoes)]})
+            minhas.append(time.perf_counter() - inicio)
+            if resposta.status_code != 200:
+                meus_erros += 1
+        with lock:
+            latencias.extend(minhas)
+            erros[0] += meus_erros
+
+    threads = [threading.Thread(target=cliente) for _ in range(concorrencia)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "modo": "in-process",
+        "concorrencia": concorrencia,
+        "requisicoes": len(latencias),
+        "erros": erros[0],
+        "req_por_segundo": round(len(latencias) / decorrido, 1) if decorrido else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+    }
+
+
+def replay_http(url, descricoes, duracao, concorrencia):
+    resultado = medir(url, concorrencia, duracao, descricoes)
+    resultado["modo"] = f"http {url}"
+    return {chave: round(valor, 3) if isinstance(valor, float) else valor for chave, valor in resultado.items()}
+
+
+# --- 4. ENRIQUECIMENTO (poemas/s por etapa) ---
+
+def medir_enriquecimento(corpus, amostra):
+    from textblob import TextBlob
+
+    textos = [poema["full_text"] for poema in corpus[:amostra]]
+    etapas = {}
+
+    def cronometrar(nome, funcao):
+        inicio = time.perf_counter()
+        for texto in textos:
+            funcao(texto)
+        decorrido = time.perf_counter() - inicio
+        etapas[nome] = {"poemas": len(textos), "segundos": round(decorrido, 3),
+                        "poemas_por_segundo": round(len(textos) / decorrido, 1) if decorrido else 0.0}
+
+    cronometrar("textblob", lambda texto: TextBlob(texto).sentiment)
+
+    try:
+        import spacy
+        nlp = spacy.load("pt_core_news_md")
+    except Exception as e:
+        etapas["spacy"] = {"ignorado": f"modelo indisponível: {e}"}
+    else:
+        cronometrar("spacy", lambda texto: [t.lemma_ for t in nlp(texto)
+                                            if not t.is_stop and t.pos_ in ("NOUN", "PROPN", "ADJ")])
+
+    analises = [poema["sentiment_analysis"] for poema in corpus[:amostra]]
+    inicio = time.perf_counter()
+    for analise in analises:
+        derivar_evokes(analise.get("keywords"), analise.get("secondary_sentiment"))
+    decorrido = time.perf_counter() - inicio
+    etapas["evokes"] = {"poemas": len(analises), "segundos": round(decorrido, 4),
+                        "poemas_por_segundo": round(len(analises) / decorrido, 1) if decorrido else 0.0}
+    return etapas
+
+
+# --- 5. RESULTADO ---
+
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def comparar(atual, anterior):
+    """Imprime a variação percentual das métricas principais contra uma execução anterior."""
+    print(f"\n--- Comparação com {anterior.get('commit')} ({anterior.get('data')}) ---")
+    pares = [("replay", "req_por_segundo"), ("replay", "p50_ms"), ("replay", "p99_ms")]
+    pares += [("enriquecimento", etapa) for etapa in atual.get("enriquecimento", {})]
+    for secao, chave in pares:
+        if secao == "enriquecimento":
+            novo = atual[secao].get(chave, {}).get("poemas_por_segundo")
+            velho = anterior.get(secao, {}).get(chave, {}).get("poemas_por_segundo")
+            rotulo = f"{chave} poemas/s"
+        else:
+            novo, velho = atual[secao].get(chave), anterior.get(secao, {}).get(chave)
+            rotulo = chave
+        if novo is None or not velho:
+            continue
+        print(f"  {rotulo:<28} {velho:>10} -> {novo:>10} ({(novo - velho) / velho:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark reprodutível do PoesIA.")
+    parser.add_argument("--poemas", type=int, default=5000, help="tamanho do corpus sintético")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--mongo", metavar="URI", help="carrega o corpus num mongod em vez do substituto em memória")
+    parser.add_argument("--banco", default="projeto_poesia_bench", help="banco usado com --mongo")
+    parser.add_argument("--url", help="replay contra um servidor já no ar (ex: http://localhost:5000)")
+    parser.add_argument("--interacoes", default=str(BASE_DIR / "projeto_poesia_db.user_interactions.json"))
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos de replay com --url")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--amostra-enriquecimento", type=int, default=500)
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/<data>_<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    if args.mongo:
+        # O app lê estas variáveis na importação
+        os.environ["MONGO_URI"] = args.mongo
+        os.environ["MONGO_DB"] = args.banco
+
+    print(f"Gerando corpus sintético com {args.poemas} poemas (semente {args.semente})...")
+    corpus = gerar_corpus(args.poemas, args.semente)
+    descricoes = carregar_descricoes(args.interacoes, 50, args.semente)
+
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_atual(),
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(),
+                     "cpus": os.cpu_count()},
+        "parametros": vars(args),
+    }
+
+    if args.mongo:
+        print(f"Carregando no MongoDB ({args.banco})...")
+        resultado["carga"] = carregar_no_mongo(corpus, args.mongo, args.banco)
+        print(f"  {resultado['carga']['poemas_por_segundo']} poemas/s")
+
+    print("Reproduzindo descrições contra /api/recommend...")
+    if args.url:
+        resultado["replay"] = replay_http(args.url, descricoes, args.duracao, args.concorrencia)
+    else:
+        app = preparar_app(substituto=not args.mongo, corpus=corpus)
+        replay_in_process(app, descricoes, min(50, args.requisicoes), args.concorrencia)  # aquecimento
+        resultado["replay"] = replay_in_process(app, descricoes, args.requisicoes, args.concorrencia)
+    replay = resultado["replay"]
+    print(f"  {replay['req_por_segundo']} req/s | p50 {replay['p50_ms']}ms | p95 {replay['p95_ms']}ms | "
+          f"p99 {replay['p99_ms']}ms | erros {replay['erros']}")
+
+    print("Medindo as etapas do enriquecimento...")
+    resultado["enriquecimento"] = medir_enriquecimento(corpus, args.amostra_enriquecimento)
+    for etapa, medida in resultado["enriquecimento"].items():
+        print(f"  {etapa:<10} {medida.get('poemas_por_segundo', medida.get('ignorado'))}")
+
+    saida = Path(args.saida or BASE_DIR / "benchmarks" /
+                 f"{datetime.now():%Y%m%d_%H%M%S}_{resultado['commit'] or 'sem-commit'}.json")
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\nResultado gravado em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(resultado, json.load(f))
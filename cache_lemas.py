@@ -0,0 +1,174 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+# --- CACHE PERSISTENTE DE LEMA / CLASSE GRAMATICAL POR TOKEN ---
+# O vocabulário de poesia se repete muito, mas o spaCy roda o tagger inteiro
+# em cada ocorrência. Aqui cada token é guardado pela chave
+#   (forma na superfície, token anterior, token seguinte)
+# (a "assinatura de contexto": o mesmo "canto" vira VERB ou NOUN conforme os
+# vizinhos) com lema, classe gramatical, stopword e pontuação.
+#
+# AnalisadorCacheado tokeniza o texto só com o tokenizer (barato) e monta as
+# chaves; se TODAS estiverem no cache o texto sai sem passar pelo modelo,
+# senão o texto inteiro passa pelo pipeline (com o contexto do poema todo,
+# como antes do cache) e alimenta o cache. Os tokens devolvidos têm os
+# mesmos atributos do spaCy (text, lemma_, pos_, is_stop, is_punct), sem os
+# de espaço/quebra de linha, então o código que lia o Doc continua igual.
+# A taxa de acerto é contada por texto (quantos saíram sem rodar o modelo),
+# que é a economia real: um texto com um único token novo custa o modelo
+# inteiro, então poemas inéditos e consultas livres raramente acertam.
+#
+# O cache é limitado (LRU) e salvo em disco (JSON, troca atômica), com o nome
+# do modelo: trocar de modelo descarta o cache antigo. Cada processo grava
+# num temporário próprio (vários workers podem salvar ao mesmo tempo na
+# saída; o último os.replace vence, sem arquivo misturado).
+# Variáveis de ambiente: CACHE_LEMAS (arquivo), CACHE_LEMAS_MAX (entradas).
+
+BASE_DIR = Path(__file__).resolve().parent
+CAMINHO_PADRAO = os.getenv("CACHE_LEMAS", str(BASE_DIR / "cache_lemas.json"))
+MAX_ENTRADAS_PADRAO = int(os.getenv("CACHE_LEMAS_MAX", "500000"))
+
+TokenAnalisado = namedtuple("TokenAnalisado", ["text", "lemma_", "pos_", "is_stop", "is_punct"])
+
+
+def assinatura_contexto(textos, i):
+    """Vizinhos imediatos (minúsculos) do token i; "" nas bordas do texto."""
+    anterior = textos[i - 1].lower() if i > 0 else ""
+    seguinte = textos[i + 1].lower() if i + 1 < len(textos) else ""
+    return anterior, seguinte
+
+
+class CacheLemas:
+    def __init__(self, caminho=CAMINHO_PADRAO, max_entradas=MAX_ENTRADAS_PADRAO, modelo=None):
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self.modelo = modelo
+        self._entradas = OrderedDict()  # (superfície, anterior, seguinte) -> (lema, pos, stop, pontuação)
+        self._lock = threading.Lock()
+        self._alterado = False
+        if caminho and os.path.exists(caminho):
+            self.carregar()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obter(self, chave):
+        with self._lock:
+            valor = self._entradas.get(chave)
+            if valor is not None:
+                self._entradas.move_to_end(chave)
+            return valor
+
+    def contem(self, chave):
+        """Consulta sem mexer nas estatísticas nem na ordem do LRU."""
+        return chave in self._entradas
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._entradas[chave] = valor
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+            self._alterado = True
+
+    def resumo(self):
+        return f"cache de lemas: {len(self)} entradas"
+
+    def carregar(self):
+        with open(self.caminho, encoding="utf-8") as f:
+            dados = json.load(f)
+        if self.modelo and dados.get("modelo") != self.modelo:
+            print(f"Cache de lemas de outro modelo ({dados.get('modelo')}); começando vazio.")
+            return
+        for superficie, anterior, seguinte, lema, pos, stop, pontuacao in dados.get("entradas", []):
+            self._entradas[(superficie, anterior, seguinte)] = (lema, pos, stop, pontuacao)
+        # O arquivo está em ordem de uso (mais antigo primeiro), então o corte mantém os recentes
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def salvar(self):
+        """Grava em disco (só se mudou), trocando o arquivo de uma vez."""
+        if not self.caminho or not self._alterado:
+            return
+        with self._lock:
+            entradas = [list(chave) + list(valor) for chave, valor in self._entradas.items()]
+            self._alterado = False
+        pasta = os.path.dirname(os.path.abspath(self.caminho))
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=pasta, suffix=".tmp",
+                                         prefix=os.path.basename(self.caminho) + ".", delete=False) as f:
+            temporario = f.name
+            try:
+                json.dump({"modelo": self.modelo, "entradas": entradas}, f, ensure_ascii=False)
+            except BaseException:
+                f.close()
+                os.remove(temporario)
+                raise
+        os.replace(temporario, self.caminho)
+
+
+class AnalisadorCacheado:
+    """Lematização/POS de textos, passando pelo modelo só o que o cache não conhece."""
+
+    def __init__(self, nlp, cache=None):
+        self.nlp = nlp
+        nome_modelo = f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}"
+        self.cache = cache if cache is not None else CacheLemas(modelo=nome_modelo)
+        self.textos_do_cache = 0
+        self.textos_do_modelo = 0
+
+    def analisar(self, texto):
+        """Lista de TokenAnalisado do texto inteiro (espaços e quebras de linha ficam de fora)."""
+        texto = texto or ""
+        if not texto.strip():
+            return []
+        textos = [t.text for t in self.nlp.tokenizer(texto)]
+        chaves = [(texto_token, *assinatura_contexto(textos, i)) for i, texto_token in enumerate(textos)]
+        if all(self.cache.contem(chave) for chave in chaves):
+            valores = [self.cache.obter(chave) for chave in chaves]
+            if None not in valores:  # (outra thread pode ter expulsado alguma entrada no meio tempo)
+                self.textos_do_cache += 1
+                return [TokenAnalisado(chave[0], *valor) for chave, valor in zip(chaves, valores)
+                        if not chave[0].isspace()]
+
+        self.textos_do_modelo += 1
+        doc = self.nlp(texto)
+        textos = [t.text for t in doc]
+        resultado = []
+        for i, token in enumerate(doc):
+            valor = (token.lemma_, token.pos_, token.is_stop, token.is_punct)
+            chave = (token.text, *assinatura_contexto(textos, i))
+            # Guarda para a próxima vez (o modelo já rodou: nada aqui conta como acerto)
+            if not self.cache.contem(chave):
+                self.cache.guardar(chave, valor)
+            if not token.is_space:
+                resultado.append(TokenAnalisado(token.text, *valor))
+        return resultado
+
+    def taxa_de_acerto(self):
+        """Fração dos textos analisados sem rodar o modelo."""
+        total = self.textos_do_cache + self.textos_do_modelo
+        return self.textos_do_cache / total if total else 0.0
+
+    def resumo(self):
+        return (f"{self.cache.resumo()}; textos: {self.textos_do_cache} do cache, "
+                f"{self.textos_do_modelo} pelo modelo ({self.taxa_de_acerto():.1%} sem o modelo)")
+
+
+_analisador_consulta = None
+_lock_consulta = threading.Lock()
+
+
+def lematizador_de_consulta():
+    """Analisador único por processo para o lado da consulta (carrega o spaCy na 1ª chamada)."""
+    global _analisador_consulta
+    with _lock_consulta:
+        if _analisador_consulta is None:
+            import spacy
+            _analisador_consulta = AnalisadorCacheado(spacy.load("pt_core_news_md", disable=["parser", "ner"]))
+            atexit.register(_analisador_consulta.cache.salvar)
+        return _analisador_consulta
@@ -0,0 +1,201 @@
+import random
+from array import array
+from collections import defaultdict
+
+from respostas import renderizar_fragmento
+
+# --- CATÁLOGO DE POEMAS EM MEMÓRIA ---
+# Guarda apenas os campos que a rota de recomendação usa, com índices
+# invertidos por sentimento e por keyword. Assim o sorteio acontece no
+# próprio processo, sem um $sample no MongoDB a cada requisição.
+
+# Projeção usada na carga (não trazemos nada que o servidor não usa)
+CAMPOS_CATALOGO = {
+    "title": 1,
+    "author": 1,
+    "full_text": 1,
+    "sentiment_analysis.keywords": 1,
+    "recommendation_tags.evokes": 1,
+    "recommendation_tags.good_for_feeling": 1,
+    "metadata.times_recommended": 1,
+}
+
+
+def niveis_de_fallback(sentimento, keyword=None):
+    """Filtros tentados em ordem: sentimento+keyword, só sentimento, qualquer poema."""
+    niveis = [(sentimento, keyword)]
+    if keyword and sentimento:
+        niveis.append((sentimento, None))
+    if sentimento or keyword:
+        niveis.append((None, None))
+    return niveis
+
+
+def _sentimentos(poema):
+    return [s.lower() for s in (poema.get("recommendation_tags") or {}).get("good_for_feeling") or []]
+
+
+def _keywords(poema):
+    return [k.lower() for k in (poema.get("sentiment_analysis") or {}).get("keywords") or []]
+
+
+class CatalogoPoemas:
+    """Poemas prontos para servir, endereçados por um índice inteiro estável."""
+
+    # Aceita alterações poema a poema (atualizar_poema/remover_poema)
+    mutavel = True
+
+    def __init__(self, poemas=()):
+        self._poemas = []
+        self._indice_por_id = {}
+        self._por_sentimento = defaultdict(list)
+        self._por_keyword = defaultdict(list)
+        self._vezes_recomendado = array("q")
+        self._fragmentos = {}  # índice -> miolo da resposta já serializado (respostas.py)
+        self._removidos = set()
+        self._ativos = None  # range(len) sem os removidos, montado quando preciso
+        for poema in poemas:
+            self.adicionar(poema)
+
+    @classmethod
+    def carregar(cls, collection):
+        """Lê a coleção 'poems' uma única vez e monta o catálogo."""
+        return cls(collection.find({}, CAMPOS_CATALOGO))
+
+    def __len__(self):
+        return len(self._poemas)
+
+    def adicionar(self, poema):
+        indice = len(self._poemas)
+        self._poemas.append(poema)
+        self._indice_por_id[poema["_id"]] = indice
+        self._ativos = None
+
+        for sentimento in _sentimentos(poema):
+            self._por_sentimento[sentimento].append(indice)
+        for keyword in _keywords(poema):
+            self._por_keyword[keyword].append(indice)
+
+        metadata = poema.get("metadata") or {}
+        self._vezes_recomendado.append(int(metadata.get("times_recommended") or 0))
+        return indice
+
+    def atualizar_poema(self, poema):
+        """Aplica a versão nova de um poema (ou o adiciona); devolve o índice.
+
+        As listas invertidas alteradas são trocadas por cópias, nunca editadas
+        no lugar: requisições sorteando ao mesmo tempo continuam consistentes.
+        """
+        indice = self._indice_por_id.get(poema["_id"])
+        if indice is None:
+            return self.adicionar(poema)
+        antigo = self._poemas[indice]
+        _trocar_indice(self._por_sentimento, _sentimentos(antigo), _sentimentos(poema), indice)
+        _trocar_indice(self._por_keyword, _keywords(antigo), _keywords(poema), indice)
+        # times_recommended vem do contador em memória (o do documento está atrasado)
+        poema.setdefault("metadata", {})["times_recommended"] = self._vezes_recomendado[indice]
+        self._poemas[indice] = poema
+        self.invalidar_fragmento(indice)
+        return indice
+
+    def remover_poema(self, poem_id):
+        """Tira o poema dos sorteios; o índice não é reaproveitado. Devolve o índice (ou None)."""
+        indice = self._indice_por_id.pop(poem_id, None)
+        if indice is None:
+            return None
+        antigo = self._poemas[indice]
+        _trocar_indice(self._por_sentimento, _sentimentos(antigo), (), indice)
+        _trocar_indice(self._por_keyword, _keywords(antigo), (), indice)
+        self._removidos.add(indice)
+        self._ativos = None
+        self.invalidar_fragmento(indice)
+        return indice
+
+    def poema(self, indice):
+        return self._poemas[indice]
+
+    def indice_de(self, poem_id):
+        return self._indice_por_id.get(poem_id)
+
+    def fragmento(self, indice):
+        """Miolo JSON da resposta do poema, renderizado na primeira vez e reaproveitado."""
+        fragmento = self._fragmentos.get(indice)
+        if fragmento is None:
+            fragmento = self._fragmentos[indice] = renderizar_fragmento(self.poema(indice))
+        return fragmento
+
+    def invalidar_fragmento(self, indice):
+        """Chamar sempre que o título, texto, autor ou tags do poema mudarem."""
+        self._fragmentos.pop(indice, None)
+
+    def vezes_recomendado(self, indice):
+        return self._vezes_recomendado[indice]
+
+    def candidatos(self, sentimento=None, keyword=None):
+        """Índices que casam com os filtros (mesma semântica do $match da API)."""
+        if sentimento and keyword:
+            por_keyword = set(self._por_keyword.get(keyword.lower(), ()))
+            return [i for i in self._por_sentimento.get(sentimento.lower(), ()) if i in por_keyword]
+        if sentimento:
+            return self._por_sentimento.get(sentimento.lower(), [])
+        if keyword:
+            return self._por_keyword.get(keyword.lower(), [])
+        if not self._removidos:
+            return range(len(self._poemas))
+        ativos = self._ativos
+        if ativos is None:
+            ativos = self._ativos = [i for i in range(len(self._poemas)) if i not in self._removidos]
+        return ativos
+
+    def sortear(self, sentimento, keyword=None, excluir=None):
+        """Equivalente em memória de recomendar_poema_mongo (com os mesmos fallbacks).
+
+        'excluir' é um conjunto de índices (ex: ConjuntoVistos de uma sessão)
+        que não devem ser sorteados. Se todos os candidatos de um nível
+        estiverem excluídos, passa para o próximo nível de fallback.
+        """
+        indice = self.sortear_indice(sentimento, keyword, excluir)
+        return self.poema(indice) if indice is not None else None
+
+    def sortear_indice(self, sentimento, keyword=None, excluir=None):
+        for nivel_sentimento, nivel_keyword in niveis_de_fallback(sentimento, keyword):
+            indices = self.candidatos(nivel_sentimento, nivel_keyword)
+            indice = _escolher(indices, excluir)
+            if indice is not None:
+                return indice
+        return None
+
+    def aplicar_incrementos(self, contagens):
+        """Soma as contagens de recomendação já gravadas no banco ({_id: n})."""
+        for poem_id, quantidade in contagens.items():
+            indice = self._indice_por_id.get(poem_id)
+            if indice is None:
+                continue
+            self._vezes_recomendado[indice] += quantidade
+            metadata = self._poemas[indice].setdefault("metadata", {})
+            metadata["times_recommended"] = self._vezes_recomendado[indice]
+
+
+def _trocar_indice(invertido, antigas, novas, indice):
+    """Move 'indice' das chaves antigas para as novas de uma lista invertida (cópia na remoção)."""
+    antigas, novas = set(antigas), set(novas)
+    for chave in antigas - novas:
+        invertido[chave] = [i for i in invertido.get(chave, ()) if i != indice]
+    for chave in novas - antigas:
+        invertido[chave].append(indice)
+
+
+def _escolher(indices, excluir=None, tentativas=8):
+    """Sorteia um índice fora de 'excluir' sem percorrer a lista no caso comum."""
+    if not indices:
+        return None
+    if not excluir:
+        return random.choice(indices)
+    # Primeiro algumas tentativas aleatórias (barato quando poucos foram vistos)...
+    for _ in range(tentativas):
+        indice = random.choice(indices)
+        if indice not in excluir:
+            return indice
+    # ...e só então filtra a lista inteira
+    restantes = [i for i in indices if i not in excluir]
+    return random.choice(restantes) if restantes else None
@@ -0,0 +1,34 @@
+import os
+
+from pymongo import MongoClient
+
+from monitoramento_mongo import MonitorComandos, imprimir_resumo_na_saida
+
+# --- CONEXÃO COM O MONGODB COMPARTILHADA PELOS SCRIPTS E PELO SERVIDOR ---
+# Variáveis de ambiente:
+#   MONGO_URI                  string de conexão (padrão: localhost)
+#   MONGO_DB                   nome do banco usado pelos servidores (padrão: projeto_poesia_db)
+#   POESIA_TRACE_MONGO=1       liga o rastreamento de comandos (monitoramento_mongo.py)
+#   POESIA_TRACE_LIMITE_MS     comandos acima disso são logados (padrão 100)
+#   POESIA_TRACE_TOP           quantos formatos entram no resumo final (padrão 10)
+
+MONGO_URI_PADRAO = "mongodb://localhost:27017/"
+NOME_BANCO = os.getenv("MONGO_DB", "projeto_poesia_db")
+
+_monitor = None
+
+
+def monitor_de_comandos():
+    """Listener único por processo (None se o rastreamento estiver desligado)."""
+    global _monitor
+    if _monitor is None and os.getenv("POESIA_TRACE_MONGO", "0") == "1":
+        _monitor = MonitorComandos(limite_ms=float(os.getenv("POESIA_TRACE_LIMITE_MS", "100")))
+        imprimir_resumo_na_saida(_monitor, top=int(os.getenv("POESIA_TRACE_TOP", "10")))
+    return _monitor
+
+
+def criar_cliente(uri=None, **opcoes):
+    monitor = monitor_de_comandos()
+    if monitor is not None:
+        opcoes.setdefault("event_listeners", []).append(monitor)
+    return MongoClient(uri or os.getenv("MONGO_URI", MONGO_URI_PADRAO), **opcoes)
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from agregados_interacoes import agregar_interacoes, consultas_mais_frequentes, garantir_indices
+from recomendacao import analisar_descricao
+
+# --- CONSULTAS QUENTES (pré-computadas a partir do log de interações) ---
+# 1. Mineração incremental: a agregação por hora/dia (agregados_interacoes.py)
+#    lê de 'user_interactions' apenas o que chegou depois do último
+#    (timestamp, _id) processado; o ranking sai da soma dos poucos baldes
+#    diários da dimensão "entrada" nos últimos JANELA_DIAS. O log bruto
+#    nunca é relido.
+# 2. Cache quente: as N descrições mais frequentes têm a análise e o
+#    conjunto de poemas candidatos calculados de antemão; a rota
+#    /api/recommend consulta esse cache antes de qualquer outra coisa.
+
+JANELA_DIAS = 30
+
+
+class CacheQuente:
+    """Análise + candidatos das descrições mais frequentes (troca atômica do dict inteiro)."""
+
+    def __init__(self, db, buscar_candidatos, tamanho=200, intervalo=300.0, janela_dias=JANELA_DIAS):
+        self.db = db
+        self.buscar_candidatos = buscar_candidatos
+        self.tamanho = tamanho
+        self.intervalo = intervalo
+        self.janela_dias = janela_dias
+        self._entradas = {}
+        self._chaves_por_poema = {}  # _id -> descrições que têm o poema entre os candidatos
+        self.acertos = 0
+        self.erros = 0
+        self._indices_criados = False
+        self._parar = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obter(self, chave):
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            self.erros += 1
+        else:
+            self.acertos += 1
+        return entrada
+
+    def reconstruir(self):
+        """Recalcula as entradas das N descrições mais frequentes."""
+        topo = consultas_mais_frequentes(self.db, self.tamanho, self.janela_dias)
+        anteriores = self._entradas
+        novas, chaves_por_poema = {}, {}
+        for documento in topo:
+            chave = documento["_id"]
+            analise = anteriores[chave]["analise"] if chave in anteriores else analisar_descricao(chave)
+            novas[chave] = {
+                "analise": analise,
+                "candidatos": self.buscar_candidatos(analise["sentiment"], analise["keyword"]),
+            }
+            for poema in novas[chave]["candidatos"]:
+                chaves_por_poema.setdefault(poema["_id"], []).append(chave)
+        self._entradas = novas
+        self._chaves_por_poema = chaves_por_poema
+        return len(novas)
+
+    def descartar_poema(self, poem_id):
+        """Tira um poema alterado ou removido dos candidatos (a próxima reconstrução completa)."""
+        for chave in self._chaves_por_poema.pop(poem_id, ()):
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                entrada["candidatos"] = [p for p in entrada["candidatos"] if p["_id"] != poem_id]
+
+    def atualizar(self):
+        try:
+            if not self._indices_criados:
+                garantir_indices(self.db)
+                self._indices_criados = True
+            agregar_interacoes(self.db)
+            self.reconstruir()
+        except Exception as e:
+            print(f"⚠️ Falha ao atualizar o cache de consultas quentes: {e}")
+
+    def iniciar(self, db=None):
+        """Sobe a atualização periódica (chamar de novo depois de um fork, com o novo db)."""
+        if db is not None:
+            self.db = db
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="consultas-quentes", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _loop(self):
+        self.atualizar()
+        while not self._parar.wait(self.intervalo):
+            self.atualizar()
+
+
+# --- EXECUÇÃO VIA LINHA DE COMANDO (ex: cron) ---
+# Apenas a mineração incremental; os servidores reconstroem o cache sozinhos.
+if __name__ == "__main__":
+    from conexao import NOME_BANCO, criar_cliente
+
+    client = criar_cliente()
+    db = client[NOME_BANCO]
+    garantir_indices(db)
+
+    start_time = time.time()
+    lidas = agregar_interacoes(db)
+    end_time = time.time()
+    print(f"{lidas} interações novas processadas em {end_time - start_time:.2f}s.")
+    for documento in consultas_mais_frequentes(db, 10, JANELA_DIAS):
+        print(f"  {documento['contagem']:>6}  {documento['_id']}")
+    client.close()
@@ -0,0 +1,99 @@
+import atexit
+import threading
+from collections import Counter
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# --- CONTADOR DE RECOMENDAÇÕES EM LOTE ---
+# Cada recomendação só incrementa um Counter em memória. De tempos em
+# tempos (e ao desligar o servidor) as contagens viram UM único
+# bulk_write de $inc em 'metadata.times_recommended'. Nenhuma escrita
+# no banco acontece durante a requisição.
+
+
+class ContadorRecomendacoes:
+    def __init__(self, collection, intervalo=30.0, catalogo=None):
+        self.collection = collection
+        self.intervalo = intervalo
+        self.catalogo = catalogo
+        self._pendentes = Counter()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self._atexit_registrado = False
+
+    def registrar(self, poem_id):
+        """Conta uma recomendação (chamado na rota, custo O(1))."""
+        with self._lock:
+            self._pendentes[poem_id] += 1
+
+    def descarregar(self):
+        """Grava as contagens pendentes no banco. Retorna quantos poemas foram atualizados."""
+        with self._lock:
+            if not self._pendentes:
+                return 0
+            contagens, self._pendentes = self._pendentes, Counter()
+
+        itens = list(contagens.items())
+        operacoes = [
+            UpdateOne({"_id": poem_id}, {"$inc": {"metadata.times_recommended": quantidade}})
+            for poem_id, quantidade in itens
+        ]
+        try:
+            self.collection.bulk_write(operacoes, ordered=False)
+        except BulkWriteError as e:
+            # Falha parcial: só as operações que falharam voltam para a fila;
+            # as outras já foram gravadas e não podem ser somadas de novo
+            falhas = {erro["index"] for erro in e.details.get("writeErrors", [])}
+            print(f"⚠️ {len(falhas)} de {len(operacoes)} contadores de recomendação não foram gravados: {e}")
+            with self._lock:
+                for indice in falhas:
+                    poem_id, quantidade = itens[indice]
+                    self._pendentes[poem_id] += quantidade
+            gravadas = Counter({poem_id: n for i, (poem_id, n) in enumerate(itens) if i not in falhas})
+            if self.catalogo is not None:
+                self.catalogo.aplicar_incrementos(gravadas)
+            return len(gravadas)
+        except Exception as e:
+            # Devolve as contagens para a próxima tentativa em vez de perdê-las
+            print(f"⚠️ Falha ao gravar contadores de recomendação: {e}")
+            with self._lock:
+                self._pendentes.update(contagens)
+            return 0
+
+        if self.catalogo is not None:
+            self.catalogo.aplicar_incrementos(contagens)
+        return len(operacoes)
+
+    def iniciar(self):
+        """Sobe a thread de flush periódico e garante um último flush na saída."""
+        if self._thread is not None:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="contador-recomendacoes", daemon=True)
+        self._thread.start()
+        if not self._atexit_registrado:
+            atexit.register(self.parar)
+            self._atexit_registrado = True
+
+    def reiniciar(self, collection):
+        """Usado depois de um fork: a thread do processo pai não existe no filho
+        e o lock pode ter sido copiado travado."""
+        self.collection = collection
+        self._pendentes = Counter()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self.iniciar()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.intervalo)
+            self._thread = None
+        self.descarregar()
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            self.descarregar()
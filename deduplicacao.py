@@ -0,0 +1,112 @@
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+# --- DETECÇÃO DE POEMAS QUASE DUPLICADOS (MinHash + LSH) ---
+# O CSV de origem tem o mesmo poema com título ou espaços ligeiramente
+# diferentes. Cada poema vira um conjunto de shingles (trincas de palavras do
+# texto normalizado) e uma assinatura MinHash de NUM_PERMUTACOES mínimos; a
+# assinatura é cortada em 'bandas' e cada banda vai para um dicionário
+# (LSH). Só poemas que colidem em alguma banda são comparados, então o custo
+# é ~linear no corpus, em vez de comparar todos os pares.
+#
+# Funciona em fluxo (um poema por vez, durante a importação): o primeiro de
+# cada grupo é o canônico, os seguintes viram aliases dele. Textos vazios
+# (ou NaN do pandas) não entram: todos virariam o mesmo shingle e seriam
+# agrupados como "duplicatas".
+
+NUM_PERMUTACOES = 128
+TAMANHO_SHINGLE = 3
+# Hash universal (a*x + b) mod p com p = 2^31 - 1: como x (crc32) < 2^32 e a < 2^31,
+# a*x + b cabe em uint64 sem estourar
+_PRIMO = (1 << 31) - 1
+
+
+def normalizar_texto(texto):
+    """NFC, minúsculas, sem pontuação e com espaços colapsados ("" para o que não é texto, como NaN)."""
+    texto = unicodedata.normalize("NFC", texto if isinstance(texto, str) else "").lower()
+    texto = re.sub(r"[^\w\s]", " ", texto)
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+def shingles(texto, tamanho=TAMANHO_SHINGLE):
+    """Hashes (uint64) das trincas de palavras; poemas curtos usam trincas de caracteres."""
+    palavras = normalizar_texto(texto).split()
+    if len(palavras) >= tamanho:
+        pedacos = {" ".join(palavras[i:i + tamanho]) for i in range(len(palavras) - tamanho + 1)}
+    else:
+        compacto = " ".join(palavras)
+        pedacos = {compacto[i:i + tamanho] for i in range(max(1, len(compacto) - tamanho + 1))}
+    return np.fromiter((zlib.crc32(p.encode("utf-8")) for p in pedacos), dtype=np.uint64, count=len(pedacos))
+
+
+def corte_lsh(bandas, linhas):
+    """Similaridade em que um par vira candidato com ~50% de chance: (1/b)^(1/r)."""
+    return (1 / bandas) ** (1 / linhas)
+
+
+def escolher_bandas(limiar, num_permutacoes=NUM_PERMUTACOES):
+    """(bandas, linhas), com bandas*linhas = num_permutacoes, de maior corte que ainda fica <= limiar.
+
+    Corte abaixo do limiar: pares no limiar viram candidatos quase sempre (16x8
+    com 0.8 e 128 permutações: ~95%). Os falsos positivos a mais são barrados
+    pela comparação das assinaturas em verificar().
+    """
+    opcoes = [(b, num_permutacoes // b) for b in range(1, num_permutacoes + 1) if num_permutacoes % b == 0]
+    abaixo = [br for br in opcoes if corte_lsh(*br) <= limiar]
+    if not abaixo:  # Limiar menor que qualquer corte possível: o mais baixo
+        return min(opcoes, key=lambda br: corte_lsh(*br))
+    return max(abaixo, key=lambda br: corte_lsh(*br))
+
+
+class DetectorDuplicatas:
+    def __init__(self, limiar=0.8, num_permutacoes=NUM_PERMUTACOES, semente=1):
+        self.limiar = limiar
+        self.bandas, self.linhas = escolher_bandas(limiar, num_permutacoes)
+        rng = np.random.default_rng(semente)
+        self._a = rng.integers(1, _PRIMO, size=num_permutacoes, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIMO, size=num_permutacoes, dtype=np.uint64)
+        self._baldes = [{} for _ in range(self.bandas)]  # banda -> {bytes da banda: [chaves]}
+        self._assinaturas = {}  # chave canônica -> assinatura
+        self.grupos = {}  # chave canônica -> [(chave do alias, similaridade estimada)]
+
+    def assinatura(self, texto):
+        hashes = shingles(texto)
+        # Todas as permutações de uma vez: matriz (shingles x permutações), mínimo por coluna
+        valores = (hashes[:, None] * self._a + self._b) % np.uint64(_PRIMO)
+        return valores.min(axis=0)
+
+    @staticmethod
+    def similaridade(assinatura_a, assinatura_b):
+        """Jaccard estimado: fração de mínimos iguais."""
+        return float(np.mean(assinatura_a == assinatura_b))
+
+    def verificar(self, chave, texto):
+        """Devolve a chave canônica se 'texto' é quase duplicado de um já visto; senão registra e devolve None.
+
+        Texto vazio devolve None sem registrar (não é duplicata de nada).
+        """
+        if not normalizar_texto(texto):
+            return None
+        assinatura = self.assinatura(texto)
+        bandas = [assinatura[i * self.linhas:(i + 1) * self.linhas].tobytes() for i in range(self.bandas)]
+
+        candidatos = set()
+        for balde, banda in zip(self._baldes, bandas):
+            candidatos.update(balde.get(banda, ()))
+        melhor, melhor_similaridade = None, 0.0
+        for candidato in candidatos:
+            similaridade = self.similaridade(assinatura, self._assinaturas[candidato])
+            if similaridade >= self.limiar and similaridade > melhor_similaridade:
+                melhor, melhor_similaridade = candidato, similaridade
+
+        if melhor is not None:
+            self.grupos.setdefault(melhor, []).append((chave, round(melhor_similaridade, 3)))
+            return melhor
+
+        self._assinaturas[chave] = assinatura
+        for balde, banda in zip(self._baldes, bandas):
+            balde.setdefault(banda, []).append(chave)
+        return None
@@ -0,0 +1,75 @@
+import threading
+import time
+
+# --- DISJUNTOR (CIRCUIT BREAKER) PARA O MONGODB ---
+# Depois de 'limite_falhas' erros seguidos o disjuntor "abre": as chamadas
+# falham na hora (sem esperar timeout do driver) e o servidor usa o
+# snapshot local. Passado 'tempo_reabertura', uma única chamada de teste
+# é liberada (meio-aberto); se ela funcionar, o disjuntor fecha de novo.
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio-aberto"
+
+
+class DisjuntorAberto(Exception):
+    """Chamada recusada porque o banco está marcado como indisponível."""
+
+
+class Disjuntor:
+    def __init__(self, limite_falhas=3, tempo_reabertura=30.0):
+        self.limite_falhas = limite_falhas
+        self.tempo_reabertura = tempo_reabertura
+        self.falhas_seguidas = 0
+        self.aberto_desde = None
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    def reiniciar(self):
+        """Volta ao estado inicial (fechado). Usado em cada worker depois do
+        fork, para não herdar falhas nem o lock do processo mestre."""
+        self.falhas_seguidas = 0
+        self.aberto_desde = None
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._lock:
+            return self._estado(time.monotonic())
+
+    def _estado(self, agora):
+        if self.aberto_desde is None:
+            return FECHADO
+        if agora - self.aberto_desde >= self.tempo_reabertura:
+            return MEIO_ABERTO
+        return ABERTO
+
+    def chamar(self, funcao, *args, **kwargs):
+        with self._lock:
+            estado = self._estado(time.monotonic())
+            if estado == ABERTO or (estado == MEIO_ABERTO and self._teste_em_andamento):
+                raise DisjuntorAberto("MongoDB indisponível (disjuntor aberto)")
+            if estado == MEIO_ABERTO:
+                self._teste_em_andamento = True
+
+        try:
+            resultado = funcao(*args, **kwargs)
+        except Exception:
+            self._registrar_falha()
+            raise
+        self._registrar_sucesso()
+        return resultado
+
+    def _registrar_sucesso(self):
+        with self._lock:
+            self.falhas_seguidas = 0
+            self.aberto_desde = None
+            self._teste_em_andamento = False
+
+    def _registrar_falha(self):
+        with self._lock:
+            self.falhas_seguidas += 1
+            self._teste_em_andamento = False
+            if self.aberto_desde is not None or self.falhas_seguidas >= self.limite_falhas:
+                self.aberto_desde = time.monotonic()
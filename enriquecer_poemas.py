@@ -1,5 +1,5 @@
 import time
-from pymongo import MongoClient
+from conexao import criar_cliente
 from transformers import pipeline
 
 # --- 1. CONFIGURAÇÃO DA ANÁLISE DE SENTIMENTO ---
@@ -16,7 +16,7 @@ print("Modelo carregado com sucesso!")
 
 # --- 2. CONFIGURAÇÃO DO MONGODB ---
 # Use a MESMA string de conexão e nomes do script anterior!
-client = MongoClient("mongodb://localhost:27017/") # <-- Verifique sua string de conexão
+client = criar_cliente() # <-- Usa MONGO_URI (padrão: localhost)
 db = client["projeto_poesia_db"]
 collection = db["poems"]
 
@@ -1,5 +1,5 @@
 import time
-from pymongo import MongoClient
+from conexao import criar_cliente
 from textblob import TextBlob
 # Não precisamos mais do 'nltk' ou 'vadersentiment' diretamente
 
@@ -9,7 +9,7 @@ print("Analisador carregado com sucesso!")
 
 
 # --- 2. CONFIGURAÇÃO DO MONGODB ---
-client = MongoClient("mongodb://localhost:27017/") # <-- Verifique sua string de conexão
+client = criar_cliente() # <-- Usa MONGO_URI (padrão: localhost)
 db = client["projeto_poesia_db"]
 collection = db["poems"]
 
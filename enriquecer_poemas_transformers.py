@@ -1,7 +1,7 @@
 import time
 import os
 import warnings
-from pymongo import MongoClient
+from conexao import criar_cliente
 from transformers import pipeline
 from dotenv import load_dotenv
 
@@ -17,7 +17,7 @@ load_dotenv()
 MEU_TOKEN_API = os.getenv("HF_TOKEN")
 
 # Constantes do Projeto
-MONGO_URI = "mongodb://localhost:27017/"
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DB_NAME = "projeto_poesia_db"
 COLLECTION_NAME = "poems"
 MODEL_ID = "neuralmind/bert-large-portuguese-cased"
@@ -76,7 +76,7 @@ def traduzir_estrelas_para_sentimento(label, score):
 # --- 4. CONEXÃO COM O MONGODB ---
 
 try:
-    client = MongoClient(MONGO_URI)
+    client = criar_cliente(MONGO_URI)
     db = client[DB_NAME]
     collection = db[COLLECTION_NAME]
     # Testa a conexão
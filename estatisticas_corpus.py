@@ -0,0 +1,179 @@
+import time
+from collections import Counter
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+# --- ESTATÍSTICAS DO CORPUS MANTIDAS INCREMENTALMENTE ---
+# Cobertura do enriquecimento (quantos poemas ainda têm primary_sentiment
+# None), distribuição dos sentimentos e frequência das tags (evokes) ficam
+# num único documento de 'corpus_stats':
+#   {_id: "corpus", total, sem_sentimento, sentimentos: {POSITIVE: n, ...},
+#    tags: {tag: n}, atualizado_em, reconciliado_em}
+# Quem grava poemas (importar_poemas.py, enriquecer_completo.py,
+# trabalhador_enriquecimento.py, varredura_paralela.py) calcula a variação
+# de cada documento (antes -> $set) e soma tudo com um $inc por lote, logo
+# depois do bulk_write dos poemas. O /api/stats lê só esse documento.
+#
+# Só entra a variação dos poemas que o bulk_write realmente gravou (um
+# lease perdido no meio do lote não conta; ver repositorio.atualizar_campos).
+# As duas escritas não são atômicas, então uma queda entre elas faz os
+# contadores desviarem um pouco: rodar 'python estatisticas_corpus.py' de
+# vez em quando (cron) recalcula tudo com uma agregação e substitui o documento.
+
+COLECAO = "corpus_stats"
+DOCUMENTO_ID = "corpus"
+CAMINHO_SENTIMENTO = "sentiment_analysis.primary_sentiment"
+CAMINHO_TAGS = "recommendation_tags.evokes"
+# Campos que o poema lido precisa trazer para a variação ser calculada certa
+PROJECAO_ESTATISTICAS = {CAMINHO_SENTIMENTO: 1, CAMINHO_TAGS: 1}
+
+
+def _chave(valor):
+    """Nome de campo seguro para o Mongo ('.' e '$' inicial viram os equivalentes de largura total)."""
+    valor = str(valor).replace(".", "．")
+    return "＄" + valor[1:] if valor.startswith("$") else valor
+
+
+def _valor(chave):
+    chave = chave.replace("．", ".")
+    return "$" + chave[1:] if chave.startswith("＄") else chave
+
+
+def _ler(poem, caminho):
+    valor = poem
+    for parte in caminho.split("."):
+        valor = (valor or {}).get(parte)
+    return valor
+
+
+def contribuicao(sentimento, tags):
+    """O que um poema com esse sentimento e essas tags soma nos contadores."""
+    contagens = Counter({"total": 1})
+    if sentimento is None:
+        contagens["sem_sentimento"] += 1
+    else:
+        contagens[f"sentimentos.{_chave(sentimento)}"] += 1
+    for tag in tags or []:
+        contagens[f"tags.{_chave(tag)}"] += 1
+    return contagens
+
+
+def variacao(poem, novos_valores):
+    """Diferença nos contadores ao aplicar o $set 'novos_valores' (chaves com ponto) sobre 'poem'."""
+    if CAMINHO_SENTIMENTO not in novos_valores and CAMINHO_TAGS not in novos_valores:
+        return Counter()
+    antes = (_ler(poem, CAMINHO_SENTIMENTO), _ler(poem, CAMINHO_TAGS))
+    depois = (novos_valores.get(CAMINHO_SENTIMENTO, antes[0]), novos_valores.get(CAMINHO_TAGS, antes[1]))
+    contagens = contribuicao(*depois)
+    contagens.subtract(contribuicao(*antes))
+    return contagens
+
+
+def operacao_de_incremento(contagens):
+    """UpdateOne com o $inc das contagens (None se não há o que somar)."""
+    incrementos = {chave: n for chave, n in contagens.items() if n}
+    if not incrementos:
+        return None
+    return UpdateOne({"_id": DOCUMENTO_ID},
+                     {"$inc": incrementos, "$set": {"atualizado_em": datetime.utcnow()}}, upsert=True)
+
+
+def registrar(db, contagens):
+    """Soma as contagens de um lote já gravado em 'poems'."""
+    operacao = operacao_de_incremento(contagens)
+    if operacao is not None:
+        db[COLECAO].bulk_write([operacao])
+
+
+def zerar(db):
+    """Para quando a coleção 'poems' é esvaziada (importar_poemas.py)."""
+    agora = datetime.utcnow()
+    db[COLECAO].replace_one({"_id": DOCUMENTO_ID}, {
+        "total": 0, "sem_sentimento": 0, "sentimentos": {}, "tags": {},
+        "atualizado_em": agora, "reconciliado_em": agora,
+    }, upsert=True)
+
+
+def recalcular(db):
+    """Contadores calculados do zero sobre a coleção inteira (uma agregação)."""
+    resultado = next(db["poems"].aggregate([
+        {"$project": PROJECAO_ESTATISTICAS},
+        {"$facet": {
+            "sentimentos": [{"$group": {"_id": f"${CAMINHO_SENTIMENTO}", "n": {"$sum": 1}}}],
+            "tags": [{"$unwind": f"${CAMINHO_TAGS}"}, {"$group": {"_id": f"${CAMINHO_TAGS}", "n": {"$sum": 1}}}],
+        }},
+    ], allowDiskUse=True))
+    sentimentos = {grupo["_id"]: grupo["n"] for grupo in resultado["sentimentos"]}
+    return {
+        "total": sum(sentimentos.values()),
+        "sem_sentimento": sentimentos.pop(None, 0),
+        "sentimentos": {_chave(sentimento): n for sentimento, n in sentimentos.items()},
+        "tags": {_chave(grupo["_id"]): grupo["n"] for grupo in resultado["tags"]},
+    }
+
+
+def reconciliar(db):
+    """Substitui os contadores pelos recalculados; devolve o desvio encontrado {chave: recalculado - mantido}."""
+    mantido = db[COLECAO].find_one({"_id": DOCUMENTO_ID}) or {}
+    correto = recalcular(db)
+    agora = datetime.utcnow()
+    db[COLECAO].replace_one({"_id": DOCUMENTO_ID}, dict(correto, atualizado_em=agora, reconciliado_em=agora),
+                            upsert=True)
+
+    desvio = {}
+    for campo in ("total", "sem_sentimento"):
+        if correto[campo] != mantido.get(campo, 0):
+            desvio[campo] = correto[campo] - mantido.get(campo, 0)
+    for campo in ("sentimentos", "tags"):
+        antigos, novos = mantido.get(campo) or {}, correto[campo]
+        for chave in set(antigos) | set(novos):
+            if novos.get(chave, 0) != antigos.get(chave, 0):
+                desvio[f"{campo}.{_valor(chave)}"] = novos.get(chave, 0) - antigos.get(chave, 0)
+    return desvio
+
+
+def resumo(documento, limite_tags=50):
+    """Contadores prontos para a API (sem zeros, tags mais frequentes primeiro)."""
+    documento = documento or {}
+    total = documento.get("total", 0)
+    sem_sentimento = documento.get("sem_sentimento", 0)
+    tags = [(_valor(chave), n) for chave, n in (documento.get("tags") or {}).items() if n > 0]
+    tags.sort(key=lambda par: (-par[1], par[0]))
+    return {
+        "total": total,
+        "enriquecidos": total - sem_sentimento,
+        "sem_sentimento": sem_sentimento,
+        "cobertura": round((total - sem_sentimento) / total, 4) if total else 0.0,
+        "sentimentos": {_valor(chave): n for chave, n in (documento.get("sentimentos") or {}).items() if n > 0},
+        "tags": dict(tags[:limite_tags]),
+        "tags_distintas": len(tags),
+        "atualizado_em": documento.get("atualizado_em"),
+        "reconciliado_em": documento.get("reconciliado_em"),
+    }
+
+
+# --- RECONCILIAÇÃO VIA LINHA DE COMANDO (ex: cron) ---
+if __name__ == "__main__":
+    from conexao import NOME_BANCO, criar_cliente
+
+    client = criar_cliente()
+    db = client[NOME_BANCO]
+
+    start_time = time.time()
+    desvio = reconciliar(db)
+    end_time = time.time()
+    print(f"Estatísticas recalculadas em {end_time - start_time:.2f}s.")
+    if desvio:
+        print(f"Desvio corrigido em {len(desvio)} contadores:")
+        for chave, diferenca in sorted(desvio.items()):
+            print(f"  {chave:<40} {diferenca:+d}")
+    else:
+        print("Nenhum desvio: os contadores incrementais estavam certos.")
+
+    estatisticas = resumo(db[COLECAO].find_one({"_id": DOCUMENTO_ID}), limite_tags=10)
+    print(f"\n{estatisticas['enriquecidos']} de {estatisticas['total']} poemas enriquecidos "
+          f"({estatisticas['cobertura']:.1%}).")
+    print(f"Sentimentos: {estatisticas['sentimentos']}")
+    print(f"Tags mais frequentes: {estatisticas['tags']}")
+    client.close()
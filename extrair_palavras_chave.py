@@ -1,17 +1,27 @@
 import time
-from pymongo import MongoClient
+from conexao import criar_cliente
 import spacy
 from collections import Counter # Usaremos isso para contar as palavras
 
+from cache_lemas import AnalisadorCacheado
+from perfilamento import Perfilador
+from regras_enriquecimento import versoes_apos_escrita
+
+# --profile grava cProfile + relatório por etapa (ver perfilamento.py)
+perfil = Perfilador.da_linha_de_comando(
+    "extrair_palavras_chave", "Extrai as keywords (spaCy) dos poemas ainda sem keywords.")
+
 # --- 1. CONFIGURAÇÃO DO spaCy ---
 print("Carregando o modelo de PLN (spaCy)...")
 # Carrega o modelo de português 'médio' que acabamos de baixar
 nlp = spacy.load("pt_core_news_md")
-print("Modelo carregado com sucesso!")
+# Poemas já vistos saem do cache em disco, sem passar pelo modelo (ver cache_lemas.py)
+analisador = AnalisadorCacheado(nlp)
+print(f"Modelo carregado com sucesso! ({len(analisador.cache)} tokens no cache de lemas)")
 
 
 # --- 2. CONFIGURAÇÃO DO MONGODB ---
-client = MongoClient("mongodb://localhost:27017/") # <-- Verifique sua string
+client = criar_cliente() # <-- Usa MONGO_URI (padrão: localhost)
 db = client["projeto_poesia_db"]
 collection = db["poems"]
 
@@ -38,14 +48,15 @@ else:
 start_time = time.time()
 count = 0
 
-for poem in poemas_para_analisar:
+for poem in perfil.iterar(poemas_para_analisar):
     poem_id = poem["_id"]
     poem_text = poem["full_text"]
     
     try:
         # 4a. A Análise de PLN (spaCy)
         # Processa o texto completo com o modelo
-        doc = nlp(poem_text)
+        with perfil.etapa("analyse"):
+            doc = analisador.analisar(poem_text)
         
         keywords = []
         # Itera em cada "token" (palavra) que o spaCy encontrou
@@ -74,12 +85,17 @@ for poem in poemas_para_analisar:
         # 4c. Prepara a atualização para o MongoDB
         update_data = {
             "$set": {
-                "sentiment_analysis.keywords": top_5_keywords
-            }
+                "sentiment_analysis.keywords": top_5_keywords,
+                # 'evokes' depende das keywords: fica marcado para o recalcular_derivados.py
+                **versoes_apos_escrita(["keywords"])
+            },
+            # Para o observador_poemas.py (modo sem change stream)
+            "$currentDate": {"atualizado_em": True}
         }
         
         # 4d. Atualiza o documento no banco
-        collection.update_one({"_id": poem_id}, update_data)
+        with perfil.etapa("write"):
+            collection.update_one({"_id": poem_id}, update_data)
         
         print(f"  > Poema '{poem['title']}' analisado. Keywords: {top_5_keywords}")
         count += 1
@@ -94,5 +110,8 @@ if count > 0:
     print(f"Total de {count} poemas atualizados em {end_time - start_time:.2f} segundos.")
 else:
     print("Nenhum poema foi processado nesta execução.")
+print(analisador.resumo())
+analisador.cache.salvar()
+perfil.finalizar(count)
 
 client.close()
\ No newline at end of file
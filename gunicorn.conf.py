@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+import tempfile
+
+# --- CONFIGURAÇÃO DO GUNICORN ---
+# Rodar com: gunicorn -c gunicorn.conf.py wsgi:app
+# Todos os valores podem ser sobrescritos por variáveis de ambiente.
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+# Diretório onde cada worker grava as suas métricas; o /metrics soma todos
+# (sem isso cada scrape veria só o worker que atendeu). Um por porta.
+os.environ.setdefault("METRICAS_DIR", os.path.join(
+    tempfile.gettempdir(), f"poesia_metricas_{bind.rsplit(':', 1)[-1]}"))
+
+# Workers derivados do número de CPUs: a análise (TextBlob) usa CPU, então
+# um processo por núcleo (+1 para cobrir I/O); as threads de cada worker
+# cobrem a espera pelo MongoDB.
+cpus = multiprocessing.cpu_count()
+workers = int(os.getenv("GUNICORN_WORKERS", cpus + 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", max(2, min(8, cpus * 2))))
+
+# Carrega o app (e os recursos de PLN) antes do fork -> memória compartilhada
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+# Recicla workers de tempos em tempos (com jitter para não reiniciarem juntos)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Métricas compartilhadas entre workers (ver metricas.py) começam do zero
+    if os.getenv("METRICAS_DIR"):
+        from metricas import Metricas
+        os.makedirs(os.environ["METRICAS_DIR"], exist_ok=True)
+        Metricas.limpar_diretorio(os.environ["METRICAS_DIR"])
+
+
+def post_fork(server, worker):
+    # Clientes do pymongo não são fork-safe: cada worker cria o seu. As
+    # threads de fundo também sobem só aqui; o mestre só carrega o app.
+    import app_principal
+    app_principal.reiniciar_apos_fork()
+
+
+def post_worker_init(worker):
+    # Abre o pool de conexões antes da primeira requisição de verdade
+    import app_principal
+    app_principal.aquecer()
+
+
+def worker_exit(server, worker):
+    # Grava os contadores de recomendação pendentes deste worker
+    import app_principal
+    if app_principal.contador is not None:
+        app_principal.contador.parar()
+    # E os totais finais das métricas, para o /metrics dos outros workers
+    app_principal.METRICAS.exportar()
@@ -1,20 +1,34 @@
+import argparse
+import json
 import pandas as pd
-from pymongo import MongoClient
+from bson import ObjectId
 import time
 
-# --- 1. CONFIGURAÇÃO DA CONEXÃO ---
-# Conecta ao servidor MongoDB (assume que está rodando localmente)
-client = MongoClient("mongodb://localhost:27017/")
+from deduplicacao import DetectorDuplicatas
+from perfilamento import Perfilador
+from repositorio import abrir_repositorio
+
+parser = argparse.ArgumentParser(description="Importa o CSV de poemas para o MongoDB.")
+parser.add_argument("--limiar-duplicata", type=float, default=0.8,
+                    help="similaridade (Jaccard estimado) a partir da qual dois poemas são o mesmo")
+parser.add_argument("--sem-deduplicacao", action="store_true", help="insere todos os poemas do CSV")
+parser.add_argument("--relatorio", default="relatorio_duplicatas.json", help="grupos de duplicatas colapsados")
+parser.add_argument("--armazenamento", default=None,
+                    help="'mongo' ou 'sqlite:arquivo.db' (padrão: POESIA_ARMAZENAMENTO ou mongo)")
+Perfilador.adicionar_opcao(parser)
+args = parser.parse_args()
 
-# Seleciona (ou cria) seu banco de dados
-db = client["projeto_poesia_db"]
+# --profile grava cProfile + relatório por etapa (ver perfilamento.py)
+perfil = Perfilador.dos_argumentos("importar_poemas", args)
 
-# Seleciona (ou cria) sua coleção de poemas
-collection = db["poems"]
+# --- 1. CONFIGURAÇÃO DA CONEXÃO ---
+# Coleção 'poems' do MongoDB ou arquivo SQLite local (ver repositorio.py)
+repositorio = abrir_repositorio(args.armazenamento)
 
 # Limpa a coleção para evitar duplicatas se rodarmos o script várias vezes
 # Comente esta linha se quiser adicionar a um banco já existente
-collection.delete_many({})
+# (no MongoDB também zera os contadores do /api/stats, ver estatisticas_corpus.py)
+repositorio.limpar()
 print("Coleção 'poems' limpa.")
 
 # --- 2. LEITURA DO ARQUIVO CSV ---
@@ -23,20 +37,43 @@ batch_size = 1000  # Número de poemas para inserir de uma vez
 poemas_para_inserir = []
 total_inseridos = 0
 
+# --- DEDUPLICAÇÃO (MinHash + LSH, ver deduplicacao.py) ---
+# O mesmo poema aparece no CSV com títulos/espaços diferentes: só o primeiro
+# de cada grupo é inserido; os outros viram 'aliases' dele.
+detector = None if args.sem_deduplicacao else DetectorDuplicatas(limiar=args.limiar_duplicata)
+aliases = {}  # _id canônico -> [{title, author, views_csv}]
+titulos = {}  # _id canônico -> (título, autor), para o relatório
+total_duplicados = 0
+
 try:
     print(f"Iniciando a leitura de '{csv_file_path}'...")
     # Usamos 'chunksize' para ler o CSV em pedaços (lotes)
     # Isso economiza memória e é eficiente para arquivos grandes
-    for chunk in pd.read_csv(csv_file_path, chunksize=batch_size):
+    for chunk in perfil.iterar(pd.read_csv(csv_file_path, chunksize=batch_size), "read"):
         
         start_batch_time = time.time()
+        inicio_analise = time.perf_counter()
         
         for index, row in chunk.iterrows():
             # --- 3. TRANSFORMAÇÃO DO DADO ---
             # Aqui está a mágica: mapeamos as colunas do CSV
             # para o nosso esquema de documento JSON que projetamos.
             
+            # _id gerado aqui para os aliases poderem apontar para o canônico
+            poema_id = ObjectId()
+            # Sem texto (vazio/NaN) não é duplicata de nada: entra como está
+            tem_texto = isinstance(row["Content"], str) and row["Content"].strip()
+            canonico = detector.verificar(poema_id, row["Content"]) if detector and tem_texto else None
+            if canonico is not None:
+                aliases.setdefault(canonico, []).append(
+                    {"title": row["Title"], "author": row["Author"], "views_csv": int(row["Views"])}
+                )
+                total_duplicados += 1
+                continue
+            titulos[poema_id] = (row["Title"], row["Author"])
+
             poema_documento = {
+                "_id": poema_id,
                 "title": row["Title"],
                 "author": row["Author"],
                 "full_text": row["Content"],
@@ -64,9 +101,12 @@ try:
             
             poemas_para_inserir.append(poema_documento)
 
+        perfil.registrar("analyse", time.perf_counter() - inicio_analise)
+
         # --- 4. INSERÇÃO EM LOTE ---
         if poemas_para_inserir:
-            collection.insert_many(poemas_para_inserir)
+            with perfil.etapa("write"):
+                repositorio.inserir(poemas_para_inserir)
             total_inseridos += len(poemas_para_inserir)
             
             end_batch_time = time.time()
@@ -76,8 +116,30 @@ try:
             
             poemas_para_inserir = [] # Limpa a lista para o próximo lote
 
+    # --- 5. ALIASES DAS DUPLICATAS ---
+    if aliases:
+        with perfil.etapa("write"):
+            repositorio.atualizar_campos([({"_id": poema_id}, {"aliases": lista}) for poema_id, lista in aliases.items()])
+
+        relatorio = {
+            "limiar": args.limiar_duplicata,
+            "grupos": [
+                {
+                    "canonico": {"_id": str(poema_id), "title": titulos[poema_id][0], "author": titulos[poema_id][1]},
+                    "duplicatas": [dict(alias, similaridade=similaridade)
+                                   for alias, (_, similaridade) in zip(aliases[poema_id], detector.grupos[poema_id])],
+                }
+                for poema_id in aliases
+            ],
+        }
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False, default=str)
+
     print("\n--- Processo Concluído! ---")
     print(f"Total de {total_inseridos} poemas importados para o banco 'projeto_poesia_db', coleção 'poems'.")
+    if detector:
+        print(f"Duplicatas colapsadas: {total_duplicados} em {len(aliases)} grupos "
+              f"(relatório em '{args.relatorio}').")
 
 except FileNotFoundError:
     print(f"ERRO: Arquivo '{csv_file_path}' não encontrado.")
@@ -86,4 +148,5 @@ except Exception as e:
     print(f"Ocorreu um erro inesperado: {e}")
 
 finally:
-    client.close() # Sempre feche a conexão
\ No newline at end of file
+    perfil.finalizar(total_inseridos)
+    repositorio.fechar() # Sempre feche a conexão
\ No newline at end of file
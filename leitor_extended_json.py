@@ -0,0 +1,171 @@
+import argparse
+import json
+import time
+from collections import Counter
+from functools import partial
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from agregados_interacoes import (CARREGADAS, ESTADO_ID, contar, garantir_indices, registrar_carregadas,
+                                  somar_nos_baldes)
+from conexao import NOME_BANCO, criar_cliente
+
+# --- LEITURA EM FLUXO DE EXPORTS EM EXTENDED JSON ---
+# O projeto_poesia_db.user_interactions.json é um array em Extended JSON
+# ({"$oid": ...}, {"$date": ...}); os exports de produção passam de GB e o
+# json.load precisa do arquivo inteiro na memória. Aqui o arquivo é lido em
+# blocos e cada registro sai assim que termina de chegar (raw_decode sobre o
+# buffer), já convertido (ObjectId, datetime): memória constante, do tamanho
+# de um bloco + um registro. Também aceita um registro por linha (mongoexport
+# sem --jsonArray).
+#
+# Uso:
+#   python leitor_extended_json.py export.json --destino mongo       (insere em user_interactions)
+#   python leitor_extended_json.py export.json --destino agregados   (só soma nos baldes hora/dia)
+#   python leitor_extended_json.py export.json                       (só conta, mede a vazão)
+#
+# --destino agregados não passa pelo marcador do agregados_interacoes.py,
+# então deduplica pelo _id de cada evento:
+#   - pula os que a agregação já contou (em user_interactions, com timestamp
+#     até o marcador) e os de uma carga anterior ('interacoes_carregadas');
+#   - anota em 'interacoes_carregadas' os que somou, e a agregação os pula
+#     se o mesmo export também for inserido com --destino mongo.
+# Cada lote soma com um identificador próprio: repetir uma carga que caiu no
+# meio não conta o mesmo lote duas vezes. Registros sem _id não têm como ser
+# deduplicados e são somados como vierem.
+#
+# Registro inválido: no formato um por linha, a linha inteira é pulada (e
+# avisada com a posição no arquivo); num array não há como achar o próximo
+# registro com segurança, então a leitura para com a posição do erro. Nos
+# dois casos o buffer nunca passa de TAMANHO_MAXIMO_REGISTRO.
+
+TAMANHO_BLOCO = 1 << 16
+# Um documento BSON tem no máximo 16 MB; em Extended JSON ($oid, $date) o
+# texto é maior, daí a folga. Registro "incompleto" maior que isso está quebrado.
+TAMANHO_MAXIMO_REGISTRO = 32 * 1024 * 1024
+# datetime sem fuso (UTC), igual ao datetime.utcnow() gravado pelos servidores
+_OPCOES = json_util.DEFAULT_JSON_OPTIONS.with_options(tz_aware=False)
+_decodificador = json.JSONDecoder(object_hook=partial(json_util.object_hook, json_options=_OPCOES))
+
+
+def ler_registros(arquivo, tamanho_bloco=TAMANHO_BLOCO, tamanho_maximo=TAMANHO_MAXIMO_REGISTRO):
+    """Gera os registros de um array JSON (ou de um JSON por linha) lendo em blocos."""
+    buffer, posicao, fim_do_arquivo = "", 0, False
+    inicio_do_buffer = 0  # Posição (em caracteres) do começo do buffer no arquivo
+    dentro_do_array = None  # None = ainda não sabe; True = "[...]"; False = um por linha
+
+    while True:
+        # Pula espaços e separadores entre registros
+        while posicao < len(buffer) and buffer[posicao] in " \t\r\n,":
+            posicao += 1
+        if dentro_do_array is None and posicao < len(buffer):
+            dentro_do_array = buffer[posicao] == "["
+            if dentro_do_array:
+                posicao += 1
+                continue
+        if posicao < len(buffer) and buffer[posicao] == "]" and dentro_do_array:
+            return
+
+        if posicao < len(buffer):
+            try:
+                registro, fim = _decodificador.raw_decode(buffer, posicao)
+            except json.JSONDecodeError as erro:
+                fim_da_linha = -1 if dentro_do_array else buffer.find("\n", posicao)
+                if fim_da_linha != -1 and buffer[posicao:fim_da_linha].rstrip().endswith("}"):
+                    # Um por linha e a linha já chegou inteira: o registro é inválido, não incompleto
+                    print(f"  > [AVISO] Registro inválido no caractere {inicio_do_buffer + posicao} "
+                          f"({erro.msg}); linha ignorada.")
+                    posicao = fim_da_linha + 1
+                    continue
+                if fim_do_arquivo or len(buffer) - posicao > tamanho_maximo:
+                    raise ValueError(f"Registro inválido no caractere {inicio_do_buffer + posicao}: "
+                                     f"{erro.msg}") from erro
+            else:
+                posicao = fim
+                yield registro
+                continue
+
+        if fim_do_arquivo:
+            return
+        # Registro incompleto (ou buffer vazio): descarta o que já foi lido e traz mais um bloco
+        bloco = arquivo.read(tamanho_bloco)
+        fim_do_arquivo = not bloco
+        inicio_do_buffer += posicao
+        buffer, posicao = buffer[posicao:] + bloco, 0
+
+
+def em_lotes(registros, tamanho):
+    lote = []
+    for registro in registros:
+        lote.append(registro)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def carregar(caminho, destino=None, tamanho_lote=1000, banco=NOME_BANCO, intervalo_aviso=50000):
+    """Lê o export em fluxo e entrega em lotes ao destino ("mongo", "agregados" ou None). Devolve o total."""
+    client = criar_cliente() if destino else None
+    db = client[banco] if client else None
+    marcador = None
+    if destino == "agregados":
+        garantir_indices(db)
+        marcador = (db["job_state"].find_one({"_id": ESTADO_ID}) or {}).get("ultimo_timestamp")
+
+    total, proximo_aviso = 0, intervalo_aviso
+    inicio = time.perf_counter()
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            for lote in em_lotes(ler_registros(arquivo), tamanho_lote):
+                if destino == "mongo":
+                    # ordered=False: _id repetido (reimportação) não interrompe o resto do lote
+                    try:
+                        db["user_interactions"].insert_many(lote, ordered=False)
+                    except BulkWriteError as e:
+                        print(f"  > [AVISO] {len(e.details.get('writeErrors', []))} documentos do lote "
+                              f"já existiam ou são inválidos.")
+                elif destino == "agregados":
+                    validos = [r for r in lote if r.get("timestamp") is not None]
+                    ids = [r["_id"] for r in validos if r.get("_id") is not None]
+                    ja_contados = {doc["_id"] for doc in db[CARREGADAS].find({"_id": {"$in": ids}})} if ids else set()
+                    if marcador is not None and ids:
+                        # Já em user_interactions e até o marcador: a agregação incremental já contou
+                        ja_contados |= {doc["_id"] for doc in db["user_interactions"].find(
+                            {"_id": {"$in": ids}, "timestamp": {"$lte": marcador}}, {"_id": 1})}
+                    contagens, somados = Counter(), []
+                    for registro in validos:
+                        if registro.get("_id") in ja_contados:
+                            continue
+                        contar(contagens, registro)
+                        if registro.get("_id") is not None:
+                            somados.append(registro["_id"])
+                    # Baldes antes da anotação: se cair no meio, a repetição soma o lote só uma vez
+                    somar_nos_baldes(db, contagens, f"carga:{ids[-1]}" if ids else None)
+                    registrar_carregadas(db, somados)
+                total += len(lote)
+                if total >= proximo_aviso:
+                    decorrido = time.perf_counter() - inicio
+                    print(f"  > {total} registros ({total / decorrido:.0f}/s)...")
+                    proximo_aviso += intervalo_aviso
+    finally:
+        if client is not None:
+            client.close()
+
+    decorrido = time.perf_counter() - inicio
+    print(f"{total} registros em {decorrido:.2f}s ({total / decorrido if decorrido else 0:.0f}/s).")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carrega um export de user_interactions em Extended JSON, em fluxo.")
+    parser.add_argument("arquivo")
+    parser.add_argument("--destino", choices=["mongo", "agregados"], default=None,
+                        help="mongo: insere os documentos; agregados: só soma nos baldes; omitido: só lê")
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--banco", default=NOME_BANCO)
+    args = parser.parse_args()
+
+    carregar(args.arquivo, args.destino, args.lote, args.banco)
@@ -0,0 +1,209 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- MÉTRICAS (histogramas de latência e contadores) ---
+# Cada thread escreve só nos SEUS baldes (threading.local), então o caminho
+# quente não disputa lock nenhum; o lock só é usado quando uma thread nova
+# aparece e na hora de ler (soma os baldes de todas as threads).
+# A saída segue o formato texto do Prometheus (rota /metrics), mas o mesmo
+# objeto também serve para os scripts de enriquecimento (resumo()).
+#
+# Com vários workers do gunicorn cada processo tem os seus números e o
+# scrape cai num worker qualquer. Com METRICAS_DIR definido (mesma ideia do
+# modo multiprocess do prometheus_client), cada processo grava os seus
+# totais em METRICAS_DIR/metricas_<pid>.json a cada poucos segundos e na
+# saída, e o /metrics soma os arquivos de todos. Os arquivos de workers já
+# reciclados ficam (contadores não podem voltar atrás); o diretório é
+# esvaziado quando o servidor sobe (on_starting no gunicorn.conf.py).
+
+# Limites dos baldes, em segundos (de 0,5 ms a 30 s)
+BALDES_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metricas:
+    def __init__(self, prefixo="poesia", baldes=BALDES_PADRAO):
+        self.prefixo = prefixo
+        self.baldes = tuple(baldes)
+        self._local = threading.local()
+        self._por_thread = []  # dicts de todas as threads que já registraram algo
+        self._lock = threading.Lock()
+        self._ajuda = {}
+        self.diretorio = None
+        self._exportacao = None
+
+    # --- agregação entre processos ---
+
+    def _arquivo(self, pid=None):
+        return os.path.join(self.diretorio, f"metricas_{pid or os.getpid()}.json")
+
+    def compartilhar(self, diretorio, intervalo=5.0):
+        """Grava os totais deste processo em 'diretorio' periodicamente (chamar depois do fork)."""
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+        if self._exportacao is not None and self._exportacao[0] == os.getpid():
+            return
+        # Depois do fork: o que o mestre registrou já está no arquivo dele, não soma de novo
+        with self._lock:
+            self._local = threading.local()
+            self._por_thread = []
+        parar = threading.Event()
+
+        def exportar_periodicamente():
+            while not parar.wait(intervalo):
+                self.exportar()
+
+        thread = threading.Thread(target=exportar_periodicamente, name="metricas-exportacao", daemon=True)
+        self._exportacao = (os.getpid(), parar)
+        thread.start()
+
+    def exportar(self):
+        """Grava os totais deste processo no diretório compartilhado."""
+        if self.diretorio is None:
+            return
+        histogramas, contadores = self._somar()
+        dados = {
+            "histogramas": [[nome, list(rotulos), serie] for (nome, rotulos), serie in histogramas.items()],
+            "contadores": [[nome, list(rotulos), valor] for (nome, rotulos), valor in contadores.items()],
+        }
+        temporario = f"{self._arquivo()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(dados, arquivo)
+        os.replace(temporario, self._arquivo())
+
+    @staticmethod
+    def limpar_diretorio(diretorio):
+        """Apaga os arquivos de uma execução anterior (subida do servidor)."""
+        for caminho in glob.glob(os.path.join(diretorio, "metricas_*.json*")):
+            os.remove(caminho)
+
+    def _meus(self):
+        dados = getattr(self._local, "dados", None)
+        if dados is None:
+            dados = self._local.dados = {"histogramas": {}, "contadores": {}}
+            with self._lock:
+                self._por_thread.append(dados)
+        return dados
+
+    def descrever(self, nome, ajuda):
+        self._ajuda[nome] = ajuda
+
+    def observar(self, nome, segundos, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        histogramas = self._meus()["histogramas"]
+        serie = histogramas.get(chave)
+        if serie is None:
+            # [contagem por balde..., +Inf] + soma
+            serie = histogramas[chave] = [0] * (len(self.baldes) + 1) + [0.0]
+        serie[bisect.bisect_left(self.baldes, segundos)] += 1
+        serie[-1] += segundos
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        contadores = self._meus()["contadores"]
+        contadores[chave] = contadores.get(chave, 0) + valor
+
+    @contextmanager
+    def cronometro(self, nome, **rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def _somar_processos(self):
+        """Totais deste processo (em memória) + os gravados pelos outros."""
+        histogramas, contadores = self._somar()
+        if self.diretorio is None:
+            return histogramas, contadores
+        proprio = self._arquivo()
+        for caminho in glob.glob(os.path.join(self.diretorio, "metricas_*.json")):
+            if caminho == proprio:
+                continue
+            try:
+                with open(caminho, encoding="utf-8") as arquivo:
+                    dados = json.load(arquivo)
+            except (OSError, ValueError):
+                continue  # Apagado ou trocado no meio da leitura
+            for nome, rotulos, serie in dados["histogramas"]:
+                chave = (nome, tuple(tuple(par) for par in rotulos))
+                total = histogramas.setdefault(chave, [0] * len(serie))
+                for i, valor in enumerate(serie):
+                    total[i] += valor
+            for nome, rotulos, valor in dados["contadores"]:
+                chave = (nome, tuple(tuple(par) for par in rotulos))
+                contadores[chave] = contadores.get(chave, 0) + valor
+        return histogramas, contadores
+
+    def _somar(self):
+        histogramas, contadores = {}, {}
+        with self._lock:
+            por_thread = list(self._por_thread)
+        for dados in por_thread:
+            # list(...) tira uma cópia rasa: a thread dona pode estar escrevendo
+            for chave, serie in list(dados["histogramas"].items()):
+                total = histogramas.setdefault(chave, [0] * len(serie))
+                for i, valor in enumerate(list(serie)):
+                    total[i] += valor
+            for chave, valor in list(dados["contadores"].items()):
+                contadores[chave] = contadores.get(chave, 0) + valor
+        return histogramas, contadores
+
+    def texto_prometheus(self):
+        histogramas, contadores = self._somar_processos()
+        linhas = []
+        vistos = set()
+
+        def cabecalho(nome, tipo, sufixo=""):
+            if nome not in vistos:
+                vistos.add(nome)
+                if nome in self._ajuda:
+                    linhas.append(f"# HELP {self.prefixo}_{nome}{sufixo} {self._ajuda[nome]}")
+                linhas.append(f"# TYPE {self.prefixo}_{nome}{sufixo} {tipo}")
+
+        for (nome, rotulos), serie in sorted(histogramas.items()):
+            cabecalho(nome, "histogram")
+            acumulado = 0
+            for limite, quantidade in zip(self.baldes + ("+Inf",), serie[:-1]):
+                acumulado += quantidade
+                linhas.append(f"{self.prefixo}_{nome}_bucket{_rotulos(rotulos, le=limite)} {acumulado}")
+            linhas.append(f"{self.prefixo}_{nome}_sum{_rotulos(rotulos)} {serie[-1]:.6f}")
+            linhas.append(f"{self.prefixo}_{nome}_count{_rotulos(rotulos)} {acumulado}")
+
+        for (nome, rotulos), valor in sorted(contadores.items()):
+            cabecalho(nome, "counter", "_total")
+            linhas.append(f"{self.prefixo}_{nome}_total{_rotulos(rotulos)} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    def resumo(self):
+        """Tabela legível para o fim dos scripts: contagem, média e total por série."""
+        histogramas, contadores = self._somar()
+        linhas = []
+        for (nome, rotulos), serie in sorted(histogramas.items()):
+            quantidade = sum(serie[:-1])
+            media_ms = serie[-1] / quantidade * 1000 if quantidade else 0.0
+            linhas.append(f"  {nome}{_rotulos(rotulos)}: {quantidade} x {media_ms:.2f}ms "
+                          f"(total {serie[-1]:.2f}s)")
+        for (nome, rotulos), valor in sorted(contadores.items()):
+            linhas.append(f"  {nome}{_rotulos(rotulos)}: {valor}")
+        return "\n".join(linhas)
+
+
+def _rotulos(rotulos, **extras):
+    pares = list(rotulos) + [(k, v) for k, v in extras.items()]
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+
+# Instância compartilhada pelo servidor e pelos scripts
+METRICAS = Metricas()
+METRICAS.descrever("etapa_segundos", "Latência de cada etapa da rota /api/recommend")
+METRICAS.descrever("requisicao_segundos", "Latência total da rota /api/recommend")
+METRICAS.descrever("fallback", "Recomendações que só acharam poema num nível de fallback")
+METRICAS.descrever("sem_resultado", "Recomendações que terminaram sem poema")
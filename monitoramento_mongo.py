@@ -0,0 +1,116 @@
+import atexit
+import json
+import threading
+import time
+
+from pymongo import monitoring
+
+# --- RASTREAMENTO DE CONSULTAS LENTAS (pymongo command monitoring) ---
+# Listener opcional, ligado com POESIA_TRACE_MONGO=1 (ver conexao.py).
+# Para cada comando guarda nome, coleção, duração e documentos devolvidos;
+# comandos acima do limite são logados com o "formato" do filtro (valores
+# trocados pelo tipo, ex: {"_id": "<ObjectId>"}), e no fim da execução
+# sai um resumo com os formatos de consulta mais lentos.
+
+COMANDOS_IGNORADOS = {"hello", "ismaster", "isMaster", "ping", "buildInfo", "endSessions",
+                      "saslStart", "saslContinue", "killCursors"}
+
+
+def formato_do_filtro(valor):
+    """Troca valores por tipos mantendo operadores e campos: o que importa para o índice."""
+    if isinstance(valor, dict):
+        return {chave: formato_do_filtro(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [formato_do_filtro(valor[0])] if valor else []
+    if valor is None:
+        return None
+    return f"<{type(valor).__name__}>"
+
+
+def _filtro_do_comando(nome, comando):
+    if nome == "find":
+        return comando.get("filter", {})
+    if nome == "aggregate":
+        return [list(etapa)[0] if "$match" not in etapa else {"$match": etapa["$match"]}
+                for etapa in comando.get("pipeline", [])]
+    if nome in ("count", "findAndModify", "distinct"):
+        return comando.get("query", {})
+    if nome == "update":
+        updates = comando.get("updates") or [{}]
+        return {"q": updates[0].get("q", {}), "lote": len(updates)}
+    if nome == "delete":
+        deletes = comando.get("deletes") or [{}]
+        return {"q": deletes[0].get("q", {}), "lote": len(deletes)}
+    if nome == "insert":
+        return {"lote": len(comando.get("documents") or [])}
+    return {}
+
+
+def _documentos_devolvidos(resposta):
+    cursor = resposta.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "n" in resposta:
+        return resposta["n"]
+    if "value" in resposta:
+        return 1 if resposta["value"] is not None else 0
+    return 0
+
+
+class MonitorComandos(monitoring.CommandListener):
+    def __init__(self, limite_ms=100.0, log=print):
+        self.limite_ms = limite_ms
+        self.log = log
+        self._em_andamento = {}
+        self._por_formato = {}  # (comando, coleção, formato) -> [qtd, total_ms, max_ms, docs]
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in COMANDOS_IGNORADOS:
+            return
+        comando = event.command
+        colecao = comando.get("collection" if event.command_name == "getMore" else event.command_name)
+        formato = json.dumps(formato_do_filtro(_filtro_do_comando(event.command_name, comando)),
+                             sort_keys=True, ensure_ascii=False, default=str)
+        self._em_andamento[(event.connection_id, event.request_id)] = (
+            event.command_name, colecao if isinstance(colecao, str) else "", formato
+        )
+
+    def succeeded(self, event):
+        self._finalizar(event, _documentos_devolvidos(event.reply), erro=None)
+
+    def failed(self, event):
+        self._finalizar(event, 0, erro=event.failure)
+
+    def _finalizar(self, event, documentos, erro):
+        registro = self._em_andamento.pop((event.connection_id, event.request_id), None)
+        if registro is None:
+            return
+        duracao_ms = event.duration_micros / 1000
+        with self._lock:
+            estatistica = self._por_formato.setdefault(registro, [0, 0.0, 0.0, 0])
+            estatistica[0] += 1
+            estatistica[1] += duracao_ms
+            estatistica[2] = max(estatistica[2], duracao_ms)
+            estatistica[3] += documentos
+
+        if duracao_ms >= self.limite_ms or erro is not None:
+            nome, colecao, formato = registro
+            status = f"ERRO {erro}" if erro is not None else f"{documentos} docs"
+            self.log(f"🐢 [mongo] {nome} {colecao} {duracao_ms:.1f}ms ({status}) filtro={formato}")
+
+    def resumo(self, top=10):
+        """Os 'top' formatos de consulta com maior tempo total."""
+        with self._lock:
+            itens = sorted(self._por_formato.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        linhas = [f"--- Top {len(itens)} formatos de consulta mais lentos (tempo total) ---"]
+        for (nome, colecao, formato), (quantidade, total_ms, max_ms, documentos) in itens:
+            linhas.append(f"  {total_ms:10.1f}ms total | {quantidade:>7}x | média {total_ms / quantidade:8.2f}ms "
+                          f"| máx {max_ms:8.1f}ms | {documentos} docs | {nome} {colecao} {formato}")
+        return "\n".join(linhas)
+
+
+def imprimir_resumo_na_saida(monitor, top=10):
+    """Imprime o resumo do monitor no fim da execução do processo."""
+    inicio = time.time()
+    atexit.register(lambda: print(f"\n{monitor.resumo(top)}\n(execução de {time.time() - inicio:.2f}s)"))
@@ -0,0 +1,189 @@
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+from catalogo import CAMPOS_CATALOGO
+from repositorio import projetar
+
+# --- OBSERVADOR DE ALTERAÇÕES NA COLEÇÃO 'poems' ---
+# O catálogo em memória e o cache de consultas quentes envelhecem assim que
+# o /api/enrich ou o /api/import_poems regravam poemas. Em vez de recarregar
+# tudo de tempos em tempos, este observador aplica as alterações poema a
+# poema (aplicar(poema) / remover(_id)):
+#   - com change streams (replica set; um nó só já serve): insert, replace,
+#     update e delete chegam em ordem. Updates que não mexem em nenhum campo
+#     do catálogo (leases do trabalhador, times_recommended) são ignorados.
+#     O resume token vai para 'job_state' e, depois de um reinício (ou de um
+#     fork do gunicorn), o stream continua de onde parou: reaplicar um
+#     poema é inofensivo.
+#   - sem change streams (servidor standalone): consulta periódica pelo
+#     campo 'atualizado_em', que os scripts de escrita gravam em cada poema.
+#     Nesse modo remoções não aparecem (importar_poemas.py recria a coleção:
+#     reinicie o servidor depois de uma importação).
+
+ESTADO_PREFIXO = "observador_poemas"
+# Código 40573: "$changeStream stage is only supported on replica sets"
+CODIGOS_SEM_CHANGE_STREAM = {40573}
+# 280/286: o resume token saiu do oplog (servidor parado tempo demais)
+CODIGOS_TOKEN_PERDIDO = {280, 286}
+# Escritas com relógio um pouco atrasado não escapam da consulta periódica
+MARGEM_CONSULTA = timedelta(seconds=5)
+INTERVALO_SALVAR_TOKEN = 10.0
+# Gravado pelo próprio servidor (contador_recomendacoes.py): não é alteração de fora
+CAMPOS_IGNORADOS = {"metadata.times_recommended"}
+
+
+def afeta_projecao(campos, projecao=CAMPOS_CATALOGO):
+    """Algum dos campos alterados (caminhos com ponto) está na projeção?"""
+    for campo in campos:
+        if campo in CAMPOS_IGNORADOS:
+            continue
+        for caminho in projecao:
+            if campo == caminho or campo.startswith(caminho + ".") or caminho.startswith(campo + "."):
+                return True
+    return False
+
+
+def momento_da_mudanca(mudanca):
+    """Hora (UTC, sem fuso) em que a alteração aconteceu no servidor."""
+    if mudanca.get("wallTime") is not None:  # MongoDB 6.0+
+        return mudanca["wallTime"].replace(tzinfo=None)
+    return mudanca["clusterTime"].as_datetime().replace(tzinfo=None)
+
+
+class ObservadorPoemas:
+    """Mantém caches do servidor em dia com 'poems' (change stream ou consulta periódica)."""
+
+    def __init__(self, db, aplicar, remover, projecao=CAMPOS_CATALOGO, estado_id=None, intervalo=5.0):
+        self.db = db
+        self.aplicar = aplicar
+        self.remover = remover
+        self.projecao = projecao
+        self.estado_id = estado_id or f"{ESTADO_PREFIXO}:{socket.gethostname()}"
+        self.intervalo = intervalo
+        self.token = None
+        # Criar ANTES de carregar o catálogo: a primeira consulta cobre a janela até o início
+        self.desde = datetime.utcnow()
+        self.modo = None  # "change_stream" ou "consulta"
+        self.aplicadas = 0
+        self.ativo = False
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self, db=None):
+        """Sobe a thread (chamar de novo depois de um fork, com o novo db)."""
+        if db is not None:
+            self.db = db
+        self.ativo = True
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="observador-poemas", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    # --- aplicação ---
+
+    def _aplicar_mudanca(self, mudanca):
+        tipo = mudanca["operationType"]
+        poem_id = (mudanca.get("documentKey") or {}).get("_id")
+        if tipo == "delete":
+            self.remover(poem_id)
+        elif tipo in ("insert", "replace"):
+            self.aplicar(projetar(mudanca["fullDocument"], self.projecao))
+        elif tipo == "update":
+            descricao = mudanca.get("updateDescription") or {}
+            campos = list(descricao.get("updatedFields") or {}) + list(descricao.get("removedFields") or [])
+            if not afeta_projecao(campos, self.projecao):
+                return
+            poema = self.db["poems"].find_one({"_id": poem_id}, self.projecao)
+            if poema is None:  # Removido logo depois
+                self.remover(poem_id)
+            else:
+                self.aplicar(poema)
+        else:
+            return
+        self.aplicadas += 1
+
+    def _consultar(self):
+        """Aplica os poemas com 'atualizado_em' desde a última consulta; devolve quantos."""
+        marca, aplicados = self.desde, 0
+        cursor = (self.db["poems"]
+                  .find({"atualizado_em": {"$gte": self.desde - MARGEM_CONSULTA}},
+                        {**self.projecao, "atualizado_em": 1})
+                  .sort("atualizado_em", ASCENDING))
+        for poema in cursor:
+            marca = max(marca, poema.pop("atualizado_em"))
+            self.aplicar(poema)
+            aplicados += 1
+        self.desde = marca
+        self.aplicadas += aplicados
+        return aplicados
+
+    # --- estado ---
+
+    def _salvar_token(self):
+        self.db["job_state"].update_one({"_id": self.estado_id}, {"$set": {
+            "resume_token": self.token, "atualizado_em": datetime.utcnow(),
+        }}, upsert=True)
+
+    def _seguir_change_stream(self):
+        self.modo = "change_stream"
+        with self.db["poems"].watch(resume_after=self.token, max_await_time_ms=1000) as stream:
+            if self.token is None:
+                # Stream aberto: agora a consulta cobre o que mudou antes dele, sem buracos
+                self._consultar()
+            salvo_em, token_salvo = time.monotonic(), self.token
+            while not self._parar.is_set() and stream.alive:
+                mudanca = stream.try_next()
+                if mudanca is not None:
+                    if mudanca["operationType"] == "invalidate":
+                        # Coleção apagada/renomeada: o token não serve mais
+                        print("⚠️ Observador: coleção 'poems' invalidada; recomeçando o stream.")
+                        self.token, self.desde = None, datetime.utcnow()
+                        self._salvar_token()
+                        return
+                    self._aplicar_mudanca(mudanca)
+                    self.desde = momento_da_mudanca(mudanca)
+                self.token = stream.resume_token
+                if self.token != token_salvo and time.monotonic() - salvo_em >= INTERVALO_SALVAR_TOKEN:
+                    self._salvar_token()
+                    salvo_em, token_salvo = time.monotonic(), self.token
+            if self.token != token_salvo:
+                self._salvar_token()
+
+    def _loop(self):
+        if self.token is None:
+            try:
+                estado = self.db["job_state"].find_one({"_id": self.estado_id}) or {}
+                self.token = estado.get("resume_token")
+            except PyMongoError as e:
+                print(f"⚠️ Observador: não foi possível ler o resume token: {e}")
+
+        while not self._parar.is_set():
+            try:
+                if self.modo == "consulta":
+                    self._consultar()
+                    self._parar.wait(self.intervalo)
+                else:
+                    self._seguir_change_stream()
+            except OperationFailure as e:
+                if e.code in CODIGOS_SEM_CHANGE_STREAM:
+                    print("ℹ️ Observador: change streams indisponíveis (servidor sem replica set); "
+                          f"consultando 'atualizado_em' a cada {self.intervalo:.0f}s.")
+                    self.modo = "consulta"
+                    self.db["poems"].create_index([("atualizado_em", ASCENDING)])
+                elif e.code in CODIGOS_TOKEN_PERDIDO:
+                    # Recomeça do zero; a consulta da abertura cobre desde o último poema aplicado
+                    print(f"⚠️ Observador: resume token perdido ({e.code}); recomeçando.")
+                    self.token = None
+                else:
+                    print(f"⚠️ Observador: falha no MongoDB: {e}")
+                    self._parar.wait(self.intervalo)
+            except PyMongoError as e:
+                print(f"⚠️ Observador: falha no MongoDB: {e}")
+                self._parar.wait(self.intervalo)
@@ -0,0 +1,140 @@
+import argparse
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from metricas import METRICAS
+
+# --- MODO DE PERFILAMENTO DOS SCRIPTS (--profile) ---
+# Uso em qualquer script de importação/enriquecimento:
+#   python enriquecer_completo.py --profile
+# Gera em PASTA_PERFIS:
+#   <script>_<data>.prof  -> dump do cProfile (abrir com snakeviz ou pstats)
+#   <script>_<data>.json  -> relatório por etapa (read / analyse / write),
+#                            vazão (itens/s) e pico de memória (RSS) do
+#                            script e dos processos filhos (varredura_paralela)
+# Sem --profile as etapas continuam sendo medidas (custo desprezível), mas
+# nada é gravado em disco.
+
+PASTA_PERFIS = os.getenv("PASTA_PERFIS", "perfis")
+
+
+class Perfilador:
+    def __init__(self, nome_script, ativo=False):
+        self.nome_script = nome_script
+        self.ativo = ativo
+        self.etapas = {}  # nome -> [quantidade, segundos]
+        self._profiler = cProfile.Profile() if ativo else None
+        self._inicio = None
+
+    @staticmethod
+    def adicionar_opcao(parser):
+        """Registra --profile no argparse do script (aparece no --help)."""
+        parser.add_argument("--profile", action="store_true",
+                            help=f"grava cProfile + relatório por etapa em {PASTA_PERFIS}/")
+
+    @classmethod
+    def dos_argumentos(cls, nome_script, args):
+        """Perfilador já iniciado, ligado se o script foi chamado com --profile."""
+        perfilador = cls(nome_script, args.profile)
+        perfilador.iniciar()
+        return perfilador
+
+    @classmethod
+    def da_linha_de_comando(cls, nome_script, descricao=None):
+        """Para scripts sem argumentos próprios: o argparse só com --profile."""
+        parser = argparse.ArgumentParser(description=descricao)
+        cls.adicionar_opcao(parser)
+        return cls.dos_argumentos(nome_script, parser.parse_args())
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        if self._profiler is not None:
+            print(f"[profile] Perfilamento ligado para '{self.nome_script}'.")
+            self._profiler.enable()
+
+    def registrar(self, nome, segundos):
+        """Soma um tempo já medido à etapa (para blocos que não cabem num with)."""
+        etapa = self.etapas.setdefault(nome, [0, 0.0])
+        etapa[0] += 1
+        etapa[1] += segundos
+        METRICAS.observar("etapa_segundos", segundos, script=self.nome_script, etapa=nome)
+
+    def incorporar(self, etapas):
+        """Soma as etapas medidas por outro Perfilador (ex: de um processo filho)."""
+        for nome, (quantidade, segundos) in etapas.items():
+            etapa = self.etapas.setdefault(nome, [0, 0.0])
+            etapa[0] += quantidade
+            etapa[1] += segundos
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nome, time.perf_counter() - inicio)
+
+    def iterar(self, iteravel, nome="read"):
+        """Percorre um cursor/iterável medindo o tempo de cada next() como 'nome'."""
+        iterador = iter(iteravel)
+        while True:
+            inicio = time.perf_counter()
+            try:
+                item = next(iterador)
+            except StopIteration:
+                self.registrar(nome, time.perf_counter() - inicio)
+                return
+            self.registrar(nome, time.perf_counter() - inicio)
+            yield item
+
+    def finalizar(self, itens):
+        """Fecha o perfil; com --profile grava o .prof e o relatório JSON. Devolve o relatório."""
+        total = time.perf_counter() - self._inicio
+        if self._profiler is not None:
+            self._profiler.disable()
+
+        # ru_maxrss vem em KB no Linux e em bytes no macOS. RUSAGE_CHILDREN é o
+        # maior pico entre os filhos já encerrados (os processos da varredura)
+        escala = 1024 * 1024 if sys.platform == "darwin" else 1024
+        pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / escala
+        pico_filhos_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / escala
+
+        relatorio = {
+            "script": self.nome_script,
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "argumentos": sys.argv[1:],
+            "tempo_total_s": round(total, 4),
+            "itens": itens,
+            "itens_por_segundo": round(itens / total, 2) if total else 0.0,
+            "pico_rss_mb": round(pico_mb, 1),
+            "pico_rss_filhos_mb": round(pico_filhos_mb, 1),
+            "etapas": {
+                nome: {
+                    "chamadas": quantidade,
+                    "total_s": round(segundos, 4),
+                    "media_ms": round(segundos / quantidade * 1000, 3) if quantidade else 0.0,
+                    "fracao_do_total": round(segundos / total, 4) if total else 0.0,
+                }
+                for nome, (quantidade, segundos) in self.etapas.items()
+            },
+        }
+
+        if self.ativo:
+            os.makedirs(PASTA_PERFIS, exist_ok=True)
+            base = os.path.join(PASTA_PERFIS, f"{self.nome_script}_{datetime.now():%Y%m%d_%H%M%S}")
+            self._profiler.dump_stats(f"{base}.prof")
+            with open(f"{base}.json", "w", encoding="utf-8") as f:
+                json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+            print(f"\n[profile] {itens} itens em {total:.2f}s ({relatorio['itens_por_segundo']} itens/s), "
+                  f"pico de RSS {relatorio['pico_rss_mb']} MB (filhos: {relatorio['pico_rss_filhos_mb']} MB)")
+            for nome, etapa in relatorio["etapas"].items():
+                print(f"[profile]   {nome:<10} {etapa['total_s']:>9.2f}s  ({etapa['fracao_do_total']:.0%})")
+            print(f"[profile] Arquivos gravados: {base}.prof e {base}.json")
+        return relatorio
@@ -0,0 +1,41 @@
+import argparse
+import time
+from conexao import NOME_BANCO, criar_cliente
+
+from perfilamento import Perfilador
+from regras_enriquecimento import ORDEM_DERIVADOS, filtro_desatualizados, projecao_do_grafo, recalcular_derivados
+from varredura_paralela import varrer_em_paralelo
+
+# --- RECÁLCULO INCREMENTAL DOS CAMPOS DERIVADOS ---
+# Substitui "lembrar de rodar refinar_sentimentos + force_update_evokes, nessa
+# ordem, em tudo": lê o grafo de dependência de regras_enriquecimento.py e só
+# recalcula, nos documentos afetados, os campos cuja versão mudou e os que
+# dependem deles.
+
+# O guard é obrigatório: os processos da varredura (spawn) reimportam este arquivo
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula só os campos derivados desatualizados.")
+    parser.add_argument("--processos", type=int, default=None, help="processos da varredura (padrão: nº de CPUs)")
+    Perfilador.adicionar_opcao(parser)
+    args = parser.parse_args()
+
+    # --profile grava cProfile + relatório por etapa (ver perfilamento.py)
+    perfil = Perfilador.dos_argumentos("recalcular_derivados", args)
+
+    client = criar_cliente()
+    collection = client[NOME_BANCO]["poems"]
+    print("Campos desatualizados por tipo:")
+    for campo in ORDEM_DERIVADOS:
+        print(f"  {campo:<20} {collection.count_documents(filtro_desatualizados([campo]))}")
+    client.close()
+
+    start_time = time.time()
+    totais = varrer_em_paralelo(recalcular_derivados, NOME_BANCO, query=filtro_desatualizados(),
+                                projecao=projecao_do_grafo(), processos=args.processos, perfil=perfil)
+
+    end_time = time.time()
+    print("\n--- Recálculo Concluído! ---")
+    print(f"Total de {totais['atualizados']} poemas atualizados em {end_time - start_time:.2f} segundos.")
+    if totais["erros"]:
+        print(f"Total de erros: {totais['erros']}")
+    perfil.finalizar(totais["processados"])
@@ -0,0 +1,87 @@
+import os
+import re
+import unicodedata
+
+from textblob import TextBlob
+
+from cache_lemas import lematizador_de_consulta
+from catalogo import CAMPOS_CATALOGO, niveis_de_fallback
+
+# --- LÓGICA COMPARTILHADA DA ROTA /api/recommend ---
+# Usada tanto pelo app Flask (app_principal.py) quanto pela variante
+# assíncrona (app_async.py), para que as duas devolvam exatamente o mesmo JSON.
+
+LEMATIZAR_CONSULTA = os.getenv("LEMATIZAR_CONSULTA", "0") == "1"
+
+
+def normalizar_descricao(user_desc):
+    """Chave canônica de uma descrição: NFC, minúsculas e espaços colapsados."""
+    texto = unicodedata.normalize("NFC", user_desc).lower()
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+def analisar_descricao(user_desc):
+    """Mini-NLP do texto do usuário: sentimento (TextBlob) e um "chute" de keyword."""
+    # Usamos o TextBlob para entender se a frase do usuário é positiva ou negativa
+    polarity = TextBlob(user_desc).sentiment.polarity
+
+    if polarity >= 0.1:
+        detected_sentiment = "positive"
+        sentiment_display = "Positivo"
+    elif polarity <= -0.1:
+        detected_sentiment = "negative"
+        sentiment_display = "Negativo"
+    else:
+        detected_sentiment = "neutral"
+        sentiment_display = "Neutro"
+
+    # (Opcional) Tentar extrair uma palavra-chave simples da frase
+    # Aqui pegamos a última palavra maior que 4 letras como "chute" de keyword
+    # Ou passamos None para focar no sentimento
+    words = [w for w in user_desc.split() if len(w) > 4]
+    detected_keyword = words[-1].lower() if words else None
+
+    # Com LEMATIZAR_CONSULTA=1 o "chute" vira o lema do último substantivo/adjetivo,
+    # no mesmo formato das keywords gravadas ("tristes" -> "triste")
+    if LEMATIZAR_CONSULTA:
+        candidatos = [t.lemma_.lower() for t in lematizador_de_consulta().analisar(user_desc)
+                      if not t.is_stop and not t.is_punct and t.pos_ in ("NOUN", "PROPN", "ADJ")]
+        detected_keyword = candidatos[-1] if candidatos else detected_keyword
+
+    return {
+        "sentiment": detected_sentiment,
+        "sentiment_display": sentiment_display,
+        "keyword": detected_keyword,
+    }
+
+
+def pipelines_de_busca(sentimento, keyword=None, tamanho=1):
+    """Pipelines de $sample para cada nível de fallback (mesma ordem do catálogo)."""
+    pipelines = []
+    for nivel_sentimento, nivel_keyword in niveis_de_fallback(sentimento, keyword):
+        query_filter = {}
+        # 1. Filtro por Sentimento
+        if nivel_sentimento:
+            query_filter["recommendation_tags.good_for_feeling"] = nivel_sentimento.lower()
+        # 2. Filtro por Keyword (Opcional)
+        if nivel_keyword:
+            query_filter["sentiment_analysis.keywords"] = nivel_keyword.lower()
+
+        pipeline = [{"$match": query_filter}] if query_filter else []
+        pipeline.append({"$sample": {"size": tamanho}}) # Pega aleatórios
+        pipeline.append({"$project": CAMPOS_CATALOGO})  # Só o que a resposta usa
+        pipelines.append(pipeline)
+    return pipelines
+
+
+def montar_resposta(poema, analise):
+    """JSON de sucesso da rota /api/recommend."""
+    return {
+        "ok": True,
+        "sentiment": f"Detectamos um tom {analise['sentiment_display']}. Recomendação:",
+        "poem": f"{poema['title'].upper()}\n\n{poema['full_text']}\n\n-- {poema['author']}",
+        "details": {
+            "tags": poema.get("recommendation_tags", {}).get("evokes", []),
+            "match_sentiment": analise["sentiment"]
+        }
+    }
@@ -0,0 +1,260 @@
+# --- REGRAS DE DERIVAÇÃO DOS CAMPOS DE ENRIQUECIMENTO ---
+# Funções puras (sem banco) usadas pelos scripts de manutenção. Ficam num
+# módulo próprio para poderem ser importadas pelos processos da varredura
+# paralela (varredura_paralela.py), que não executam o script principal.
+
+from textblob import TextBlob
+
+TAGS_INUTEIS = {"indefinido", "não-identificado", "vazio", "subjetivo", "objetivo", "reflexivo"}
+
+
+def get_subjectivity_tag(score):
+    """Converte o score numérico de subjetividade (0.0 a 1.0) em um label."""
+    if score > 0.66:
+        return "Subjetivo" # Muito emocional / opinativo
+    elif score > 0.33:
+        return "Reflexivo" # Um balanço entre fato e opinião
+    else:
+        return "Objetivo"  # Muito factual / descritivo
+
+
+def get_combined_emotion_tag(primary_sentiment, subjectivity_score):
+    """Cria a tag de emoção combinada (ex: "Apaixonado")."""
+
+    is_subjetivo = subjectivity_score > 0.66
+    is_reflexivo = subjectivity_score > 0.33
+
+    if primary_sentiment == "POSITIVE":
+        if is_subjetivo:
+            return "Apaixonado" # (Positivo + Muito Emocional)
+        if is_reflexivo:
+            return "Esperançoso" # (Positivo + Meio Emocional)
+        return "Sereno"       # (Positivo + Objetivo)
+
+    elif primary_sentiment == "NEGATIVE":
+        if is_subjetivo:
+            return "Melancólico" # (Negativo + Muito Emocional)
+        if is_reflexivo:
+            return "Sombrio"     # (Negativo + Meio Emocional)
+        return "Crítico"      # (Negativo + Objetivo)
+
+    else: # NEUTRAL
+        if is_subjetivo:
+            return "Introspectivo" # (Neutro + Muito Emocional)
+        return "Contemplativo" # (Neutro + Objetivo/Reflexivo)
+
+
+def derivar_secondary_sentiment(primary, subjectivity_score):
+    """Array de sentimentos secundários; ["Indefinido"] se faltar a análise base."""
+    if primary is None or subjectivity_score is None:
+        return ["Indefinido"]
+    return list(set([get_subjectivity_tag(subjectivity_score),
+                     get_combined_emotion_tag(primary, subjectivity_score)]))
+
+
+def derivar_evokes(keywords, secondary_sentiment):
+    """Tags 'evokes': keywords + sentimentos secundários, em minúsculo e sem tags inúteis."""
+    keywords = keywords or []
+    secondary_sentiment = secondary_sentiment or []
+    # Se por acaso o secondary_sentiment for string (versão antiga), converte pra lista
+    if isinstance(secondary_sentiment, str):
+        secondary_sentiment = [secondary_sentiment]
+
+    # Set evita duplicatas (ex: se "amor" estiver nos dois, aparece uma vez só)
+    tags_set = {t.lower() for t in list(keywords) + list(secondary_sentiment) if t}
+    return [t for t in tags_set if t not in TAGS_INUTEIS]
+
+
+# --- TRANSFORMAÇÕES POR DOCUMENTO (para a varredura paralela) ---
+# Recebem o poema e devolvem o $set a aplicar, ou None para não alterar.
+
+def atualizar_secondary_sentiment(poem):
+    analysis = poem.get("sentiment_analysis", {}) or {}
+    tags = derivar_secondary_sentiment(analysis.get("primary_sentiment"), analysis.get("subjectivity_score"))
+    return {"sentiment_analysis.secondary_sentiment": tags, **versoes_apos_escrita(["secondary_sentiment"])}
+
+
+def marcou_indefinido(poem, novos_valores):
+    """Para a contagem da varredura: o $set trocou secondary_sentiment por ["Indefinido"]?"""
+    if novos_valores.get("sentiment_analysis.secondary_sentiment") != ["Indefinido"]:
+        return None
+    antes = (poem.get("sentiment_analysis") or {}).get("secondary_sentiment")
+    return "indefinidos" if antes != ["Indefinido"] else None
+
+
+def atualizar_evokes(poem):
+    analysis = poem.get("sentiment_analysis", {}) or {}
+    tags = derivar_evokes(analysis.get("keywords"), analysis.get("secondary_sentiment"))
+    # Atualiza o banco APENAS se houver tags para salvar
+    return {"recommendation_tags.evokes": tags, **versoes_apos_escrita(["evokes"])} if tags else None
+
+
+# --- ENRIQUECIMENTO "DO ZERO" (TextBlob) ---
+
+# Usado quando o TextBlob falha: marca como "Indefinido" para não tentar de novo
+ENRIQUECIMENTO_INDEFINIDO = {
+    "sentiment_analysis.primary_sentiment": "NEUTRAL",
+    "sentiment_analysis.score": 0.0,
+    "sentiment_analysis.subjectivity_score": 0.0,
+    "sentiment_analysis.secondary_sentiment": ["Indefinido"],
+    "recommendation_tags.good_for_feeling": ["neutral"]
+}
+
+# Campos gravados pelo enriquecimento (para as versões em 'field_versions')
+CAMPOS_DO_ENRIQUECIMENTO = ["primary_sentiment", "subjectivity_score", "secondary_sentiment", "good_for_feeling"]
+
+
+def enriquecimento_indefinido():
+    """ENRIQUECIMENTO_INDEFINIDO com as versões dos campos gravados."""
+    return dict(ENRIQUECIMENTO_INDEFINIDO, **versoes_apos_escrita(CAMPOS_DO_ENRIQUECIMENTO))
+
+
+def rotulo_primario(sentimento_score):
+    if sentimento_score >= 0.05:
+        return "POSITIVE"
+    elif sentimento_score <= -0.05:
+        return "NEGATIVE"
+    return "NEUTRAL"
+
+
+def enriquecer_poema(poem):
+    """$set completo do enriquecimento (sentimento primário, scores, secundários, good_for_feeling).
+
+    Poemas vazios viram NEUTRAL/["Indefinido"]; erros do TextBlob sobem para
+    quem chamou decidir (normalmente gravando enriquecimento_indefinido()).
+    """
+    poem_text = poem.get("full_text")
+    if not poem_text or not poem_text.strip():
+        return enriquecimento_indefinido()
+
+    analysis = TextBlob(poem_text)
+    sentimento_score = analysis.sentiment.polarity
+    subjectivity_score = analysis.sentiment.subjectivity
+    primary_label = rotulo_primario(sentimento_score)
+    return {
+        "sentiment_analysis.primary_sentiment": primary_label,
+        "sentiment_analysis.score": sentimento_score,
+        "sentiment_analysis.subjectivity_score": subjectivity_score,
+        "sentiment_analysis.secondary_sentiment": derivar_secondary_sentiment(primary_label, subjectivity_score),
+        "recommendation_tags.good_for_feeling": [primary_label.lower()],
+        **versoes_apos_escrita(CAMPOS_DO_ENRIQUECIMENTO)
+    }
+
+
+# --- GRAFO DE DEPENDÊNCIA DOS CAMPOS E VERSÕES POR DOCUMENTO ---
+# Cada campo derivado declara de quem depende e a versão da SUA regra. O
+# documento guarda em 'field_versions' a versão com que cada campo foi
+# calculado; versão diferente da declarada (ou ausente) = campo desatualizado.
+#   - Mudou a lógica de um campo? Incremente a 'versao' dele: só esse campo
+#     e os que dependem dele são recalculados (recalcular_derivados.py), e só
+#     nos documentos afetados.
+#   - Quem grava um campo marca os dependentes como desatualizados (versão 0),
+#     ver versoes_apos_escrita().
+# Campos de entrada (sem 'calcular') vêm dos scripts caros (TextBlob, spaCy)
+# e não são recalculados aqui: só disparam o recálculo dos dependentes.
+
+CAMINHOS = {
+    "primary_sentiment": "sentiment_analysis.primary_sentiment",
+    "subjectivity_score": "sentiment_analysis.subjectivity_score",
+    "keywords": "sentiment_analysis.keywords",
+    "secondary_sentiment": "sentiment_analysis.secondary_sentiment",
+    "good_for_feeling": "recommendation_tags.good_for_feeling",
+    "evokes": "recommendation_tags.evokes",
+}
+
+CAMPOS_DERIVADOS = {
+    "secondary_sentiment": {
+        "versao": 1,
+        "depende_de": ("primary_sentiment", "subjectivity_score"),
+        "calcular": lambda v: derivar_secondary_sentiment(v["primary_sentiment"], v["subjectivity_score"]),
+    },
+    "good_for_feeling": {
+        "versao": 1,
+        "depende_de": ("primary_sentiment",),
+        "calcular": lambda v: [v["primary_sentiment"].lower()] if v["primary_sentiment"] else [],
+    },
+    "evokes": {
+        "versao": 1,
+        "depende_de": ("keywords", "secondary_sentiment"),
+        "calcular": lambda v: derivar_evokes(v["keywords"], v["secondary_sentiment"]),
+    },
+}
+
+
+def _ordem_topologica():
+    ordem, visitados = [], set()
+
+    def visitar(campo):
+        if campo in visitados:
+            return
+        visitados.add(campo)
+        for dependencia in CAMPOS_DERIVADOS.get(campo, {}).get("depende_de", ()):
+            visitar(dependencia)
+        if campo in CAMPOS_DERIVADOS:
+            ordem.append(campo)
+
+    for campo in CAMPOS_DERIVADOS:
+        visitar(campo)
+    return ordem
+
+
+ORDEM_DERIVADOS = _ordem_topologica()
+
+
+def dependentes(campos):
+    """Campos derivados que dependem (direta ou indiretamente) de 'campos'."""
+    afetados = set()
+    for campo in ORDEM_DERIVADOS:  # Ordem topológica: dependências já resolvidas
+        if any(d in campos or d in afetados for d in CAMPOS_DERIVADOS[campo]["depende_de"]):
+            afetados.add(campo)
+    return afetados
+
+
+def versoes_apos_escrita(campos):
+    """$set de 'field_versions' para quem gravou 'campos' (já calculados pela regra atual).
+
+    Os gravados ficam na versão atual; os dependentes não gravados vão para 0
+    (desatualizados), para o próximo recalcular_derivados.py pegá-los.
+    """
+    versoes = {f"field_versions.{campo}": CAMPOS_DERIVADOS[campo]["versao"]
+               for campo in campos if campo in CAMPOS_DERIVADOS}
+    for campo in dependentes(campos) - set(campos):
+        versoes[f"field_versions.{campo}"] = 0
+    return versoes
+
+
+def filtro_desatualizados(campos=None):
+    """Consulta dos documentos (já enriquecidos) com algum campo derivado fora da versão declarada."""
+    return {
+        "sentiment_analysis.primary_sentiment": {"$ne": None},
+        "$or": [{f"field_versions.{campo}": {"$ne": CAMPOS_DERIVADOS[campo]["versao"]}}
+                for campo in (campos or ORDEM_DERIVADOS)],
+    }
+
+
+def projecao_do_grafo():
+    return {**{caminho: 1 for caminho in CAMINHOS.values()}, "field_versions": 1}
+
+
+def _ler(poem, caminho):
+    valor = poem
+    for parte in caminho.split("."):
+        valor = (valor or {}).get(parte)
+    return valor
+
+
+def recalcular_derivados(poem):
+    """Recalcula só os campos desatualizados e seus dependentes; devolve o $set (ou None)."""
+    versoes = poem.get("field_versions") or {}
+    valores = {campo: _ler(poem, caminho) for campo, caminho in CAMINHOS.items()}
+    recalculados, novos_valores = set(), {}
+
+    for campo in ORDEM_DERIVADOS:
+        regra = CAMPOS_DERIVADOS[campo]
+        if versoes.get(campo) == regra["versao"] and not recalculados.intersection(regra["depende_de"]):
+            continue
+        valores[campo] = regra["calcular"](valores)
+        recalculados.add(campo)
+        novos_valores[CAMINHOS[campo]] = valores[campo]
+        novos_valores[f"field_versions.{campo}"] = regra["versao"]
+    return novos_valores or None
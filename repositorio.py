@@ -0,0 +1,387 @@
+import os
+import sqlite3
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from bson import ObjectId, json_util
+from pymongo import ASCENDING, UpdateOne
+
+from conexao import NOME_BANCO, criar_cliente
+from estatisticas_corpus import contribuicao, registrar, variacao, zerar
+
+# --- REPOSITÓRIO DE POEMAS (MongoDB ou arquivo SQLite local) ---
+# As operações que a importação, o enriquecimento e o servidor fazem sobre
+# a coleção 'poems', atrás da mesma interface (mesmos nomes de método, como
+# CatalogoPoemas e CatalogoSnapshot):
+#   inserir(poemas)                                  inserção em lote
+#   reivindicar_pendentes(dono, tamanho, lease)      lote sem primary_sentiment, com lease
+#   renovar_lease(token, lease) / liberar(token)
+#   atualizar_campos([(poema, $set)], token=None)    $set (chaves com ponto) em lote
+#   candidatos(sentimento, keyword, limite)          balde good_for_feeling x keywords
+#   amostra(tamanho, sentimento, keyword)            sorteio (o $sample do Mongo)
+#   todos(projecao) / contar_pendentes() / limpar() / fechar()
+#
+# POESIA_ARMAZENAMENTO escolhe a implementação:
+#   mongo (padrão)          -> RepositorioMongo (MONGO_URI / MONGO_DB)
+#   sqlite:caminho.db       -> RepositorioSQLite: um arquivo, sem servidor,
+#                              para rodar o pipeline (e medir) numa máquina só
+
+PENDENTES = {"sentiment_analysis.primary_sentiment": None}
+# Derivados de 'poems' chaveados pelo _id dos poemas (ou contando poemas):
+# importar de novo cria ObjectIds novos, então somem junto com a coleção
+COLECOES_DERIVADAS = ("poem_terms", "term_df", "poem_neighbors")
+ESTADOS_DERIVADOS = ("tfidf",)  # Documentos de 'job_state' (ver tfidf_palavras_chave.py)
+# Token do último lote que gravou o poema (atualizar_campos com lease)
+LOTE_GRAVADO = "processing_lote"
+_OPCOES_JSON = json_util.DEFAULT_JSON_OPTIONS.with_options(tz_aware=False)
+
+
+def abrir_repositorio(destino=None):
+    """Repositório indicado por 'destino' ou por POESIA_ARMAZENAMENTO."""
+    destino = destino or os.getenv("POESIA_ARMAZENAMENTO", "mongo")
+    if destino.startswith("sqlite:"):
+        return RepositorioSQLite(destino[len("sqlite:"):])
+    if destino == "mongo":
+        return RepositorioMongo.conectar()
+    raise ValueError(f"POESIA_ARMAZENAMENTO desconhecido: {destino!r} (use 'mongo' ou 'sqlite:arquivo.db')")
+
+
+def filtro_do_balde(sentimento=None, keyword=None):
+    """Mesma semântica do $match de recomendacao.pipelines_de_busca."""
+    filtro = {}
+    if sentimento:
+        filtro["recommendation_tags.good_for_feeling"] = sentimento.lower()
+    if keyword:
+        filtro["sentiment_analysis.keywords"] = keyword.lower()
+    return filtro
+
+
+def projetar(poema, projecao):
+    """Projeção de inclusão com caminhos com ponto, feita em Python (o _id sempre vem)."""
+    if not projecao:
+        return poema
+    resultado = {"_id": poema["_id"]}
+    for caminho, incluir in projecao.items():
+        if not incluir or caminho == "_id":
+            continue
+        origem, destino = poema, resultado
+        partes = caminho.split(".")
+        for parte in partes[:-1]:
+            origem = origem.get(parte) if isinstance(origem, dict) else None
+            if origem is None:
+                break
+            destino = destino.setdefault(parte, {})
+        else:
+            if isinstance(origem, dict) and partes[-1] in origem:
+                destino[partes[-1]] = origem[partes[-1]]
+    return resultado
+
+
+class RepositorioMongo:
+    """Coleção 'poems' do MongoDB. Também mantém as estatísticas do corpus (estatisticas_corpus.py)."""
+
+    def __init__(self, db, client=None):
+        self.db = db
+        self.collection = db["poems"]
+        self._client = client
+
+    @classmethod
+    def conectar(cls, uri=None, banco=NOME_BANCO):
+        client = criar_cliente(uri)
+        return cls(client[banco], client)
+
+    def garantir_indices(self):
+        self.collection.create_index([("sentiment_analysis.primary_sentiment", ASCENDING),
+                                      ("processing.lease_until", ASCENDING)])
+        self.collection.create_index([("processing.token", ASCENDING)], sparse=True)
+
+    def limpar(self):
+        self.collection.delete_many({})
+        for colecao in COLECOES_DERIVADAS:
+            self.db[colecao].delete_many({})
+        self.db["job_state"].delete_many({"_id": {"$in": list(ESTADOS_DERIVADOS)}})
+        zerar(self.db)
+
+    def inserir(self, poemas):
+        poemas = list(poemas)
+        if not poemas:
+            return 0
+        agora = datetime.utcnow()
+        for poema in poemas:
+            poema.setdefault("atualizado_em", agora)  # Para o observador_poemas.py
+        self.collection.insert_many(poemas)
+        contagens = Counter()
+        for poema in poemas:
+            analise = poema.get("sentiment_analysis") or {}
+            contagens.update(contribuicao(analise.get("primary_sentiment"),
+                                          (poema.get("recommendation_tags") or {}).get("evokes")))
+        registrar(self.db, contagens)
+        return len(poemas)
+
+    @staticmethod
+    def _filtro_livre(agora):
+        """Pendentes sem lease ou com lease vencido."""
+        return {**PENDENTES, "$or": [{"processing": None}, {"processing.lease_until": {"$lt": agora}}]}
+
+    def reivindicar_pendentes(self, dono, tamanho, lease_segundos, projecao=None):
+        """Reivindica até 'tamanho' poemas; devolve (token, poemas) só com os que ficaram com este dono.
+
+        token None = fila vazia; token com lista vazia = outros levaram todos os candidatos.
+        """
+        agora = datetime.utcnow()
+        # $sample espalha os trabalhadores pela fila, em vez de todos disputarem os mesmos primeiros
+        candidatos = [doc["_id"] for doc in self.collection.aggregate([
+            {"$match": self._filtro_livre(agora)}, {"$sample": {"size": tamanho}}, {"$project": {"_id": 1}}
+        ])]
+        if not candidatos:
+            return None, []
+
+        token = uuid.uuid4().hex
+        # A condição de lease livre é reavaliada documento a documento pelo servidor:
+        # se outro trabalhador pegou um dos candidatos no meio tempo, ele fica de fora
+        self.collection.update_many(
+            {"_id": {"$in": candidatos}, **self._filtro_livre(agora)},
+            {"$set": {"processing": {"owner": dono, "token": token,
+                                     "lease_until": agora + timedelta(seconds=lease_segundos)}}}
+        )
+        return token, list(self.collection.find({"processing.token": token}, projecao))
+
+    def renovar_lease(self, token, lease_segundos):
+        self.collection.update_many(
+            {"processing.token": token},
+            {"$set": {"processing.lease_until": datetime.utcnow() + timedelta(seconds=lease_segundos)}}
+        )
+
+    def liberar(self, token):
+        """Devolve à fila o que sobrou do lote (ex: trabalhador interrompido)."""
+        self.collection.update_many({"processing.token": token}, {"$unset": {"processing": ""}})
+
+    def atualizar_campos(self, atualizacoes, token=None):
+        """Aplica [(poema lido, $set)] num bulk_write; com token, só onde o lease ainda é dele (e o remove).
+
+        Devolve quantos poemas foram gravados. 'poema' precisa trazer os campos
+        de estatisticas_corpus.PROJECAO_ESTATISTICAS para os contadores ficarem certos.
+        """
+        operacoes, variacoes = [], []
+        for poema, novos_valores in atualizacoes:
+            atualizacao = {"$set": novos_valores, "$currentDate": {"atualizado_em": True}}
+            if token is None:
+                operacoes.append(UpdateOne({"_id": poema["_id"]}, atualizacao))
+            else:
+                # LOTE_GRAVADO marca quem gravou, para saber depois quais lease se perderam
+                operacoes.append(UpdateOne({"_id": poema["_id"], "processing.token": token},
+                                           {"$set": dict(novos_valores, **{LOTE_GRAVADO: token}),
+                                            "$currentDate": {"atualizado_em": True},
+                                            "$unset": {"processing": ""}}))
+            variacoes.append((poema["_id"], variacao(poema, novos_valores)))
+        if not operacoes:
+            return 0
+        resultado = self.collection.bulk_write(operacoes, ordered=False)
+        if resultado.matched_count < len(operacoes):
+            # Algum poema sumiu ou mudou de dono: a variação dele não vale
+            filtro = {"_id": {"$in": [poema_id for poema_id, _ in variacoes]}}
+            if token is not None:
+                filtro[LOTE_GRAVADO] = token
+            gravados = {doc["_id"] for doc in self.collection.find(filtro, {"_id": 1})}
+            variacoes = [(poema_id, delta) for poema_id, delta in variacoes if poema_id in gravados]
+        contagens = Counter()
+        for _, delta in variacoes:
+            contagens.update(delta)
+        registrar(self.db, contagens)
+        return resultado.modified_count
+
+    def candidatos(self, sentimento=None, keyword=None, limite=None, projecao=None):
+        cursor = self.collection.find(filtro_do_balde(sentimento, keyword), projecao)
+        return list(cursor.limit(limite) if limite else cursor)
+
+    def amostra(self, tamanho, sentimento=None, keyword=None, projecao=None):
+        pipeline = [{"$match": filtro_do_balde(sentimento, keyword)}, {"$sample": {"size": tamanho}}]
+        if projecao:
+            pipeline.append({"$project": projecao})
+        return list(self.collection.aggregate(pipeline))
+
+    def todos(self, projecao=None):
+        return self.collection.find({}, projecao)
+
+    def contar_pendentes(self):
+        return self.collection.count_documents(PENDENTES)
+
+    def fechar(self):
+        if self._client is not None:
+            self._client.close()
+
+
+class RepositorioSQLite:
+    """Poemas num arquivo SQLite: o documento inteiro em JSON (Extended JSON,
+    mantém ObjectId/datetime) + colunas e uma tabela de baldes indexadas para
+    as consultas da interface. Vários processos podem reivindicar lotes ao
+    mesmo tempo (BEGIN IMMEDIATE serializa as escritas)."""
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        self._conexao = sqlite3.connect(self.caminho, isolation_level=None, timeout=30)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS poemas (
+                id TEXT PRIMARY KEY,
+                doc TEXT NOT NULL,
+                pendente INTEGER NOT NULL,
+                lease_token TEXT,
+                lease_ate REAL
+            );
+            CREATE INDEX IF NOT EXISTS poemas_pendentes ON poemas (pendente, lease_ate);
+            CREATE INDEX IF NOT EXISTS poemas_lease ON poemas (lease_token);
+            -- tipo 's' = recommendation_tags.good_for_feeling, 'k' = sentiment_analysis.keywords
+            CREATE TABLE IF NOT EXISTS baldes (
+                tipo TEXT NOT NULL,
+                valor TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (tipo, valor, id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS baldes_id ON baldes (id);
+        """)
+
+    def garantir_indices(self):
+        pass  # Criados junto com as tabelas
+
+    # --- serialização ---
+
+    @staticmethod
+    def _ler_doc(texto):
+        return json_util.loads(texto, json_options=_OPCOES_JSON)
+
+    @staticmethod
+    def _linha(poema):
+        analise = poema.get("sentiment_analysis") or {}
+        return (str(poema["_id"]), json_util.dumps(poema), int(analise.get("primary_sentiment") is None))
+
+    @staticmethod
+    def _baldes(poema):
+        chave = str(poema["_id"])
+        tags = poema.get("recommendation_tags") or {}
+        analise = poema.get("sentiment_analysis") or {}
+        linhas = {("s", sentimento.lower(), chave) for sentimento in tags.get("good_for_feeling") or []}
+        linhas.update(("k", keyword.lower(), chave) for keyword in analise.get("keywords") or [])
+        return linhas
+
+    @staticmethod
+    def _definir(poema, caminho, valor):
+        partes = caminho.split(".")
+        for parte in partes[:-1]:
+            if not isinstance(poema.get(parte), dict):
+                poema[parte] = {}
+            poema = poema[parte]
+        poema[partes[-1]] = valor
+
+    # --- interface ---
+
+    def limpar(self):
+        self._conexao.execute("BEGIN IMMEDIATE")
+        self._conexao.execute("DELETE FROM poemas")
+        self._conexao.execute("DELETE FROM baldes")
+        self._conexao.execute("COMMIT")
+
+    def inserir(self, poemas):
+        poemas = list(poemas)
+        for poema in poemas:
+            poema.setdefault("_id", ObjectId())  # Como o insert_many do pymongo
+        self._conexao.execute("BEGIN IMMEDIATE")
+        try:
+            self._conexao.executemany("INSERT INTO poemas (id, doc, pendente) VALUES (?, ?, ?)",
+                                      [self._linha(poema) for poema in poemas])
+            self._conexao.executemany("INSERT OR IGNORE INTO baldes VALUES (?, ?, ?)",
+                                      [linha for poema in poemas for linha in self._baldes(poema)])
+        except BaseException:
+            self._conexao.execute("ROLLBACK")
+            raise
+        self._conexao.execute("COMMIT")
+        return len(poemas)
+
+    def reivindicar_pendentes(self, dono, tamanho, lease_segundos, projecao=None):
+        """Mesmo contrato do RepositorioMongo; aqui a trava do SQLite garante que o lote é todo deste dono."""
+        agora = time.time()
+        self._conexao.execute("BEGIN IMMEDIATE")
+        try:
+            linhas = self._conexao.execute(
+                "SELECT id, doc FROM poemas WHERE pendente = 1 AND (lease_ate IS NULL OR lease_ate < ?) LIMIT ?",
+                (agora, tamanho),
+            ).fetchall()
+            token = uuid.uuid4().hex if linhas else None
+            if linhas:
+                self._conexao.executemany("UPDATE poemas SET lease_token = ?, lease_ate = ? WHERE id = ?",
+                                          [(token, agora + lease_segundos, chave) for chave, _ in linhas])
+        except BaseException:
+            self._conexao.execute("ROLLBACK")
+            raise
+        self._conexao.execute("COMMIT")
+        return token, [projetar(self._ler_doc(doc), projecao) for _, doc in linhas]
+
+    def renovar_lease(self, token, lease_segundos):
+        self._conexao.execute("UPDATE poemas SET lease_ate = ? WHERE lease_token = ?",
+                              (time.time() + lease_segundos, token))
+
+    def liberar(self, token):
+        self._conexao.execute("UPDATE poemas SET lease_token = NULL, lease_ate = NULL WHERE lease_token = ?",
+                              (token,))
+
+    def atualizar_campos(self, atualizacoes, token=None):
+        gravados = 0
+        self._conexao.execute("BEGIN IMMEDIATE")
+        try:
+            for poema, novos_valores in atualizacoes:
+                chave = str(poema["_id"])
+                linha = self._conexao.execute("SELECT doc, lease_token FROM poemas WHERE id = ?", (chave,)).fetchone()
+                if linha is None or (token is not None and linha[1] != token):
+                    continue  # Sumiu, ou o lease venceu e foi para outro dono
+                documento = self._ler_doc(linha[0])
+                for caminho, valor in novos_valores.items():
+                    self._definir(documento, caminho, valor)
+                _, doc, pendente = self._linha(documento)
+                if token is None:
+                    self._conexao.execute("UPDATE poemas SET doc = ?, pendente = ? WHERE id = ?", (doc, pendente, chave))
+                else:
+                    self._conexao.execute("UPDATE poemas SET doc = ?, pendente = ?, lease_token = NULL, "
+                                          "lease_ate = NULL WHERE id = ?", (doc, pendente, chave))
+                self._conexao.execute("DELETE FROM baldes WHERE id = ?", (chave,))
+                self._conexao.executemany("INSERT OR IGNORE INTO baldes VALUES (?, ?, ?)", self._baldes(documento))
+                gravados += 1
+        except BaseException:
+            self._conexao.execute("ROLLBACK")
+            raise
+        self._conexao.execute("COMMIT")
+        return gravados
+
+    def _consulta_do_balde(self, sentimento=None, keyword=None):
+        """SELECT dos documentos do balde (sem ORDER/LIMIT) e seus parâmetros."""
+        juncoes, parametros = [], []
+        for tipo, valor in (("s", sentimento), ("k", keyword)):
+            if valor:
+                apelido = f"b{tipo}"
+                juncoes.append(f"JOIN baldes {apelido} ON {apelido}.id = p.id "
+                               f"AND {apelido}.tipo = '{tipo}' AND {apelido}.valor = ?")
+                parametros.append(valor.lower())
+        return f"SELECT p.doc FROM poemas p {' '.join(juncoes)}", parametros
+
+    def candidatos(self, sentimento=None, keyword=None, limite=None, projecao=None):
+        sql, parametros = self._consulta_do_balde(sentimento, keyword)
+        if limite:
+            sql, parametros = sql + " LIMIT ?", parametros + [limite]
+        return [projetar(self._ler_doc(doc), projecao) for doc, in self._conexao.execute(sql, parametros)]
+
+    def amostra(self, tamanho, sentimento=None, keyword=None, projecao=None):
+        sql, parametros = self._consulta_do_balde(sentimento, keyword)
+        linhas = self._conexao.execute(sql + " ORDER BY random() LIMIT ?", parametros + [tamanho])
+        return [projetar(self._ler_doc(doc), projecao) for doc, in linhas]
+
+    def todos(self, projecao=None):
+        for doc, in self._conexao.execute("SELECT doc FROM poemas ORDER BY rowid"):
+            yield projetar(self._ler_doc(doc), projecao)
+
+    def contar_pendentes(self):
+        return self._conexao.execute("SELECT COUNT(*) FROM poemas WHERE pendente = 1").fetchone()[0]
+
+    def fechar(self):
+        self._conexao.close()
@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:  # Opcional: sem ele, usa o json da biblioteca padrão
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Opcional: sem ele, só a variante gzip
+    brotli = None
+
+# --- RESPOSTAS PRÉ-RENDERIZADAS E SERIALIZAÇÃO RÁPIDA ---
+# A parte da resposta do /api/recommend que só depende do poema (título em
+# maiúsculas + texto + autor, e as tags) é serializada UMA vez por poema e
+# guardada no catálogo (CatalogoPoemas.fragmento); a cada requisição só se
+# concatenam bytes: prefixo (depende do sentimento) + fragmento + sufixo.
+# O resultado é o mesmo JSON de recomendacao.montar_resposta.
+#
+# Também monta as variantes comprimidas (gzip e, com o pacote 'brotli',
+# br) e o ETag de arquivos estáticos, uma vez só.
+
+
+def serializar(conteudo):
+    """JSON em bytes UTF-8 (orjson, se instalado)."""
+    if orjson is not None:
+        return orjson.dumps(conteudo)
+    return json.dumps(conteudo, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def renderizar_fragmento(poema):
+    """Bytes de '"poem":...,"details":{"tags":...' de um poema (o miolo da resposta)."""
+    texto = f"{poema['title'].upper()}\n\n{poema['full_text']}\n\n-- {poema['author']}"
+    tags = (poema.get("recommendation_tags") or {}).get("evokes") or []
+    return b'"poem":' + serializar(texto) + b',"details":{"tags":' + serializar(list(tags))
+
+
+_bordas = {}  # (sentiment_display, sentiment) -> (prefixo, sufixo)
+
+
+def resposta_de_fragmento(fragmento, analise):
+    """Corpo JSON completo da recomendação, a partir do fragmento pré-renderizado."""
+    chave = (analise["sentiment_display"], analise["sentiment"])
+    bordas = _bordas.get(chave)
+    if bordas is None:
+        prefixo = b'{"ok":true,"sentiment":' + serializar(f"Detectamos um tom {chave[0]}. Recomendação:") + b","
+        sufixo = b',"match_sentiment":' + serializar(chave[1]) + b"}}"
+        bordas = _bordas[chave] = (prefixo, sufixo)
+    return bordas[0] + fragmento + bordas[1]
+
+
+def limite_da_consulta(valor, padrao, maximo):
+    """Parâmetro inteiro da query string entre 1 e 'maximo' ('padrao' se não for numérico)."""
+    try:
+        limite = int(valor if valor is not None else padrao)
+    except (TypeError, ValueError):
+        limite = padrao
+    return max(1, min(limite, maximo))
+
+
+class ArquivoEstatico:
+    """Conteúdo + variantes comprimidas + ETag de um arquivo, lidos uma vez."""
+
+    def __init__(self, caminho, mimetype):
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(conteudo).hexdigest()[:20]
+        self.variantes = {"identity": conteudo, "gzip": gzip.compress(conteudo, compresslevel=9)}
+        if brotli is not None:
+            self.variantes["br"] = brotli.compress(conteudo, quality=11)
+
+    def corresponde(self, if_none_match):
+        """If-None-Match casa com o ETag? Lista separada por vírgula, "*" e W/ (comparação fraca)."""
+        for etiqueta in (if_none_match or "").split(","):
+            etiqueta = etiqueta.strip()
+            if etiqueta == "*":
+                return True
+            if etiqueta.startswith("W/"):
+                etiqueta = etiqueta[2:]
+            if len(etiqueta) >= 2 and etiqueta[0] == etiqueta[-1] == '"' and etiqueta[1:-1] == self.etag:
+                return True
+        return False
+
+    def escolher(self, accept_encoding):
+        """(codificação, bytes) que o cliente prefere, pelo q de Accept-Encoding.
+
+        q=0 exclui a codificação; com q igual vence a mais compacta (br, gzip).
+        identity só entra na disputa se vier listada; senão é o último recurso.
+        """
+        pesos = _pesos_accept_encoding(accept_encoding)
+        melhor, melhor_q = "identity", pesos.get("identity", 0.0)
+        for codificacao in ("br", "gzip"):
+            q = pesos.get(codificacao, pesos.get("*", 0.0))
+            if codificacao in self.variantes and q > 0 and q > melhor_q:
+                melhor, melhor_q = codificacao, q
+        return melhor, self.variantes[melhor]
+
+
+def _pesos_accept_encoding(cabecalho):
+    """{codificação: q} de um Accept-Encoding ("gzip;q=0.8, br" -> {"gzip": 0.8, "br": 1.0})."""
+    pesos = {}
+    for parte in (cabecalho or "").split(","):
+        nome, *parametros = parte.split(";")
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        for parametro in parametros:
+            chave, _, valor = parametro.partition("=")
+            if chave.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        pesos[nome] = max(0.0, min(q, 1.0))
+    return pesos
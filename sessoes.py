@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+
+# --- POEMAS JÁ VISTOS POR SESSÃO ---
+# Cada sessão guarda um bitset sobre os índices do catálogo em memória:
+# 1 bit por poema, então mesmo uma sessão que viu o catálogo inteiro
+# ocupa len(catalogo) / 8 bytes (~2 KB para 15.000 poemas). As sessões
+# expiram por TTL e o número total de sessões também é limitado (LRU).
+
+
+class ConjuntoVistos:
+    """Bitset de índices do catálogo; cresce só até o maior índice visto."""
+
+    __slots__ = ("_bits", "quantidade")
+
+    def __init__(self):
+        self._bits = bytearray()
+        self.quantidade = 0
+
+    def __len__(self):
+        return self.quantidade
+
+    def __contains__(self, indice):
+        byte = indice >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (indice & 7)))
+
+    def adicionar(self, indice):
+        byte = indice >> 3
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte + 1 - len(self._bits)))
+        mascara = 1 << (indice & 7)
+        if not self._bits[byte] & mascara:
+            self._bits[byte] |= mascara
+            self.quantidade += 1
+
+    def limpar(self):
+        self._bits = bytearray()
+        self.quantidade = 0
+
+
+class SessoesVistos:
+    def __init__(self, ttl=1800.0, max_sessoes=10000):
+        self.ttl = ttl
+        self.max_sessoes = max_sessoes
+        self._sessoes = OrderedDict()  # session_id -> (ultimo_acesso, ConjuntoVistos)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessoes)
+
+    def obter(self, session_id):
+        """Devolve o conjunto da sessão (criando se preciso) e renova o TTL."""
+        agora = time.monotonic()
+        with self._lock:
+            self._expirar(agora)
+            entrada = self._sessoes.pop(session_id, None)
+            vistos = entrada[1] if entrada else ConjuntoVistos()
+            self._sessoes[session_id] = (agora, vistos)
+            while len(self._sessoes) > self.max_sessoes:
+                self._sessoes.popitem(last=False)
+            return vistos
+
+    def _expirar(self, agora):
+        # O OrderedDict está em ordem de último acesso: basta olhar o começo
+        while self._sessoes:
+            session_id, (ultimo_acesso, _) = next(iter(self._sessoes.items()))
+            if agora - ultimo_acesso <= self.ttl:
+                break
+            del self._sessoes[session_id]
@@ -0,0 +1,55 @@
+import threading
+
+# --- SINGLE-FLIGHT: COALESCÊNCIA DE CHAMADAS IDÊNTICAS ---
+# Se várias requisições pedem a mesma coisa ao mesmo tempo (ex: todo mundo
+# mandando o exemplo do index.html depois de uma newsletter), só a primeira
+# executa o trabalho; as outras esperam e recebem o mesmo resultado (ou a
+# mesma exceção). Nada fica guardado depois que a chamada termina: isto
+# não é um cache, só evita trabalho repetido *simultâneo*.
+
+
+class _Chamada:
+    __slots__ = ("pronto", "resultado", "erro", "compartilhada")
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.compartilhada = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+        self.execucoes = 0
+        self.coalescidas = 0
+
+    def executar(self, chave, funcao, *args, **kwargs):
+        with self._lock:
+            chamada = self._em_andamento.get(chave)
+            if chamada is not None:
+                chamada.compartilhada += 1
+                self.coalescidas += 1
+                lider = False
+            else:
+                chamada = self._em_andamento[chave] = _Chamada()
+                self.execucoes += 1
+                lider = True
+
+        if not lider:
+            chamada.pronto.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = funcao(*args, **kwargs)
+        except Exception as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+            chamada.pronto.set()
+        return chamada.resultado
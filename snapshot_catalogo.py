@@ -0,0 +1,293 @@
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from bson import ObjectId
+
+from catalogo import CAMPOS_CATALOGO, CatalogoPoemas
+
+# --- SNAPSHOT BINÁRIO DO CATÁLOGO (compartilhado via mmap) ---
+# Com o gunicorn, cada worker que carregasse o catálogo teria a sua própria
+# cópia em memória. Aqui o catálogo vira um arquivo binário compacto que
+# todos os workers abrem com mmap: o sistema operacional compartilha as
+# páginas entre os processos e a subida não faz parse de JSON nenhum.
+#
+# Layout (little-endian, seções alinhadas em 8 bytes):
+#   cabeçalho: MAGIC, versão, nº de poemas (N), nº de strings (M)
+#   diretório: (offset, tamanho) de cada seção, na ordem de SECOES
+#   - ids (12 bytes cada, na ordem dos índices) + ordem dos índices por _id
+#   - textos: um blob UTF-8 único + array de offsets (N+1)
+#   - strings internadas (autores, títulos, tags) em ordem de bytes, para
+#     busca binária direto no arquivo; autor/título viram um id inteiro
+#   - tags (evokes, keywords, good_for_feeling) como arrays de ids de string
+#   - listas invertidas keyword -> poemas e sentimento -> poemas
+#   - times_recommended no momento da exportação
+
+MAGIC = b"POESIA01"
+VERSAO = 1
+CABECALHO = struct.Struct("<8sIII4x")
+ENTRADA_DIRETORIO = struct.Struct("<QQ")
+
+SECOES = (
+    "ids", "ordem_ids",
+    "texto_offsets", "texto_blob",
+    "str_offsets", "str_blob",
+    "autor", "titulo",
+    "evokes_offsets", "evokes",
+    "keywords_offsets", "keywords",
+    "sentimentos_offsets", "sentimentos",
+    "post_keyword_offsets", "post_keyword",
+    "post_sentimento_offsets", "post_sentimento",
+    "vezes_recomendado",
+)
+
+
+def _listas_planas(listas):
+    """[[1, 2], [3]] -> (offsets [0, 2, 3], valores [1, 2, 3]) como arrays uint32."""
+    offsets = array("I", [0])
+    valores = array("I")
+    for lista in listas:
+        valores.extend(lista)
+        offsets.append(len(valores))
+    return offsets, valores
+
+
+def exportar_snapshot(poemas, caminho):
+    """Grava os poemas (documentos com os campos de CAMPOS_CATALOGO) no formato binário."""
+    poemas = list(poemas)
+    n = len(poemas)
+
+    # 1. Internação de strings (autores, títulos, tags e chaves em minúsculo)
+    textos_de_poema = []
+    autores, titulos = [], []
+    evokes, keywords, sentimentos = [], [], []
+    todas = set()
+    for poema in poemas:
+        analise = poema.get("sentiment_analysis") or {}
+        tags = poema.get("recommendation_tags") or {}
+        autores.append(str(poema.get("author") or ""))
+        titulos.append(str(poema.get("title") or ""))
+        evokes.append([str(t) for t in tags.get("evokes") or []])
+        keywords.append([str(k).lower() for k in analise.get("keywords") or []])
+        sentimentos.append([str(s).lower() for s in tags.get("good_for_feeling") or []])
+        textos_de_poema.append(str(poema.get("full_text") or "").encode("utf-8"))
+        todas.add(autores[-1])
+        todas.add(titulos[-1])
+        todas.update(evokes[-1], keywords[-1], sentimentos[-1])
+
+    strings = sorted(s.encode("utf-8") for s in todas)
+    id_string = {s.decode("utf-8"): i for i, s in enumerate(strings)}
+    m = len(strings)
+
+    # 2. Listas invertidas (índices de poema já saem em ordem crescente)
+    post_keyword = defaultdict(list)
+    post_sentimento = defaultdict(list)
+    for indice in range(n):
+        for k in dict.fromkeys(keywords[indice]):
+            post_keyword[id_string[k]].append(indice)
+        for s in dict.fromkeys(sentimentos[indice]):
+            post_sentimento[id_string[s]].append(indice)
+
+    # 3. Ids + ordem por _id (busca binária por _id sem dict em memória)
+    ids_binarios = [poema["_id"].binary for poema in poemas]
+    ordem = sorted(range(n), key=ids_binarios.__getitem__)
+
+    texto_offsets = array("Q", [0])
+    for texto in textos_de_poema:
+        texto_offsets.append(texto_offsets[-1] + len(texto))
+    str_offsets = array("Q", [0])
+    for s in strings:
+        str_offsets.append(str_offsets[-1] + len(s))
+
+    secoes = {
+        "ids": b"".join(ids_binarios),
+        "ordem_ids": array("I", ordem),
+        "texto_offsets": texto_offsets,
+        "texto_blob": b"".join(textos_de_poema),
+        "str_offsets": str_offsets,
+        "str_blob": b"".join(strings),
+        "autor": array("I", (id_string[a] for a in autores)),
+        "titulo": array("I", (id_string[t] for t in titulos)),
+        "vezes_recomendado": array("q", (
+            int((poema.get("metadata") or {}).get("times_recommended") or 0) for poema in poemas
+        )),
+    }
+    for nome, listas in (("evokes", evokes), ("keywords", keywords), ("sentimentos", sentimentos)):
+        secoes[f"{nome}_offsets"], secoes[nome] = _listas_planas(
+            [[id_string[t] for t in lista] for lista in listas]
+        )
+    for nome, postings in (("post_keyword", post_keyword), ("post_sentimento", post_sentimento)):
+        secoes[f"{nome}_offsets"], secoes[nome] = _listas_planas(postings.get(i, ()) for i in range(m))
+
+    # 4. Escrita atômica (os workers nunca veem um arquivo pela metade)
+    inicio_dados = CABECALHO.size + ENTRADA_DIRETORIO.size * len(SECOES)
+    diretorio, blocos, posicao = [], [], inicio_dados
+    for nome in SECOES:
+        dados = bytes(secoes[nome])
+        posicao += -posicao % 8
+        diretorio.append((posicao, len(dados)))
+        blocos.append((posicao, dados))
+        posicao += len(dados)
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"  # Dois processos exportando não se atropelam
+    with open(temporario, "wb") as f:
+        f.write(CABECALHO.pack(MAGIC, VERSAO, n, m))
+        for offset, tamanho in diretorio:
+            f.write(ENTRADA_DIRETORIO.pack(offset, tamanho))
+        for offset, dados in blocos:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(dados)
+    os.replace(temporario, caminho)
+    return n
+
+
+class CatalogoSnapshot(CatalogoPoemas):
+    """Mesma interface do CatalogoPoemas, lendo direto do arquivo mapeado em memória."""
+
+    # Somente leitura: alterações chegam com um novo snapshot
+    mutavel = False
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        with open(self.caminho, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, versao, self._n, self._m = CABECALHO.unpack_from(self._mm, 0)
+        if magic != MAGIC or versao != VERSAO:
+            raise ValueError(f"Snapshot inválido ou de outra versão: {self.caminho}")
+
+        bruto = memoryview(self._mm)
+        self._secoes = {}
+        for i, nome in enumerate(SECOES):
+            offset, tamanho = ENTRADA_DIRETORIO.unpack_from(
+                self._mm, CABECALHO.size + i * ENTRADA_DIRETORIO.size
+            )
+            self._secoes[nome] = bruto[offset:offset + tamanho]
+
+        formatos = {"texto_offsets": "Q", "str_offsets": "Q", "vezes_recomendado": "q"}
+        for nome in SECOES:
+            if nome in ("ids", "texto_blob", "str_blob"):
+                continue
+            setattr(self, f"_{nome}", self._secoes[nome].cast(formatos.get(nome, "I")))
+        self._ids = self._secoes["ids"]
+        self._texto_blob = self._secoes["texto_blob"]
+        self._str_blob = self._secoes["str_blob"]
+
+        # Únicas partes mutáveis e por processo: incrementos desde a exportação
+        # e os fragmentos de resposta já renderizados
+        self._incrementos = {}
+        self._fragmentos = {}
+
+    def __len__(self):
+        return self._n
+
+    def _string(self, id_string):
+        inicio, fim = self._str_offsets[id_string], self._str_offsets[id_string + 1]
+        return str(self._str_blob[inicio:fim], "utf-8")
+
+    def _strings(self, offsets, valores, indice):
+        return [self._string(valores[j]) for j in range(offsets[indice], offsets[indice + 1])]
+
+    def _id_da_string(self, texto):
+        """Busca binária na tabela de strings (ordenada por bytes)."""
+        alvo = texto.encode("utf-8")
+        chaves = _VisaoOrdenada(self._m, lambda i: bytes(
+            self._str_blob[self._str_offsets[i]:self._str_offsets[i + 1]]
+        ))
+        i = bisect_left(chaves, alvo)
+        return i if i < self._m and chaves[i] == alvo else None
+
+    def poema(self, indice):
+        inicio, fim = self._texto_offsets[indice], self._texto_offsets[indice + 1]
+        return {
+            "_id": self._id_do_indice(indice),
+            "title": self._string(self._titulo[indice]),
+            "author": self._string(self._autor[indice]),
+            "full_text": str(self._texto_blob[inicio:fim], "utf-8"),
+            "sentiment_analysis": {
+                "keywords": self._strings(self._keywords_offsets, self._keywords, indice),
+            },
+            "recommendation_tags": {
+                "evokes": self._strings(self._evokes_offsets, self._evokes, indice),
+                "good_for_feeling": self._strings(self._sentimentos_offsets, self._sentimentos, indice),
+            },
+            "metadata": {"times_recommended": self.vezes_recomendado(indice)},
+        }
+
+    def _id_do_indice(self, indice):
+        return ObjectId(self._id_binario(indice))
+
+    def indice_de(self, poem_id):
+        if not isinstance(poem_id, ObjectId):
+            return None
+        alvo = poem_id.binary
+        chaves = _VisaoOrdenada(self._n, lambda k: self._id_binario(self._ordem_ids[k]))
+        posicao = bisect_left(chaves, alvo)
+        if posicao < self._n and chaves[posicao] == alvo:
+            return self._ordem_ids[posicao]
+        return None
+
+    def _id_binario(self, indice):
+        return bytes(self._ids[indice * 12:indice * 12 + 12])
+
+    def vezes_recomendado(self, indice):
+        return self._vezes_recomendado[indice] + self._incrementos.get(indice, 0)
+
+    def _postings(self, offsets, valores, chave):
+        id_string = self._id_da_string(chave.lower())
+        if id_string is None:
+            return []
+        return valores[offsets[id_string]:offsets[id_string + 1]]
+
+    def candidatos(self, sentimento=None, keyword=None):
+        if sentimento and keyword:
+            por_keyword = set(self._postings(self._post_keyword_offsets, self._post_keyword, keyword))
+            return [i for i in self._postings(self._post_sentimento_offsets, self._post_sentimento, sentimento)
+                    if i in por_keyword]
+        if sentimento:
+            return self._postings(self._post_sentimento_offsets, self._post_sentimento, sentimento)
+        if keyword:
+            return self._postings(self._post_keyword_offsets, self._post_keyword, keyword)
+        return range(self._n)
+
+    def aplicar_incrementos(self, contagens):
+        for poem_id, quantidade in contagens.items():
+            indice = self.indice_de(poem_id)
+            if indice is not None:
+                self._incrementos[indice] = self._incrementos.get(indice, 0) + quantidade
+
+
+class _VisaoOrdenada:
+    """Sequência preguiçosa para usar bisect sem materializar as chaves."""
+
+    def __init__(self, tamanho, chave):
+        self._tamanho = tamanho
+        self._chave = chave
+
+    def __len__(self):
+        return self._tamanho
+
+    def __getitem__(self, i):
+        return self._chave(i)
+
+
+# --- EXECUÇÃO VIA LINHA DE COMANDO ---
+# python snapshot_catalogo.py [arquivo_saida]
+if __name__ == "__main__":
+    from conexao import NOME_BANCO, criar_cliente
+
+    saida = sys.argv[1] if len(sys.argv) > 1 else "catalogo.snapshot"
+    client = criar_cliente()
+    collection = client[NOME_BANCO]["poems"]
+
+    start_time = time.time()
+    total = exportar_snapshot(collection.find({}, CAMPOS_CATALOGO), saida)
+    end_time = time.time()
+
+    print(f"Snapshot com {total} poemas gravado em '{saida}' "
+          f"({os.path.getsize(saida) / 1024 / 1024:.1f} MB) em {end_time - start_time:.2f}s.")
+    client.close()
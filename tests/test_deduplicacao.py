@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from deduplicacao import DetectorDuplicatas, corte_lsh, escolher_bandas, normalizar_texto
+
+POEMA = """No meio do caminho tinha uma pedra
+tinha uma pedra no meio do caminho
+tinha uma pedra
+no meio do caminho tinha uma pedra.
+Nunca me esquecerei desse acontecimento
+na vida de minhas retinas tão fatigadas."""
+
+
+@pytest.mark.parametrize("limiar", [0.3, 0.5, 0.7, 0.8, 0.9, 0.95])
+def test_corte_das_bandas_fica_no_limiar_ou_abaixo(limiar):
+    bandas, linhas = escolher_bandas(limiar)
+    assert bandas * linhas == 128
+    assert corte_lsh(bandas, linhas) <= limiar
+
+
+def test_bandas_para_o_limiar_padrao():
+    # 16 bandas de 8 linhas: corte ~0.71, pares com Jaccard 0.8 viram candidatos ~95% das vezes
+    assert escolher_bandas(0.8) == (16, 8)
+    bandas, linhas = escolher_bandas(0.8)
+    assert 1 - (1 - 0.8 ** linhas) ** bandas > 0.9
+
+
+def test_escolhe_o_maior_corte_que_nao_passa_do_limiar():
+    escolhido = corte_lsh(*escolher_bandas(0.9))
+    for bandas in (1, 2, 4, 8, 16, 32, 64, 128):
+        corte = corte_lsh(bandas, 128 // bandas)
+        assert corte > 0.9 or corte <= escolhido
+
+
+def test_limiar_abaixo_de_qualquer_corte_usa_o_menor():
+    assert escolher_bandas(0.001) == (128, 1)
+
+
+def test_normalizar_texto():
+    assert normalizar_texto("  Olá,   MUNDO!\n") == "olá mundo"
+    assert normalizar_texto(float("nan")) == ""
+
+
+def test_detecta_quase_duplicata_e_ignora_textos_diferentes():
+    detector = DetectorDuplicatas(limiar=0.8)
+    assert detector.verificar("original", POEMA) is None
+    # Mesma letra com pontuação e espaços diferentes
+    copia = POEMA.replace(".", "").replace("\n", "  \n").upper()
+    assert detector.verificar("copia", copia) == "original"
+    assert detector.verificar("outro", "Minha terra tem palmeiras onde canta o sabiá") is None
+    assert detector.grupos["original"][0][0] == "copia"
+
+
+def test_texto_vazio_nao_e_duplicata_de_nada():
+    detector = DetectorDuplicatas()
+    assert detector.verificar("a", "") is None
+    assert detector.verificar("b", "   ") is None
+    assert detector.verificar("c", None) is None
+    assert not detector.grupos
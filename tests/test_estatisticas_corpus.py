@@ -0,0 +1,61 @@
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from estatisticas_corpus import CAMINHO_SENTIMENTO, CAMINHO_TAGS, contribuicao, resumo, variacao
+
+
+def _poema(sentimento=None, tags=None):
+    return {"sentiment_analysis": {"primary_sentiment": sentimento}, "recommendation_tags": {"evokes": tags}}
+
+
+def _sem_zeros(contagens):
+    return {chave: n for chave, n in contagens.items() if n}
+
+
+def test_contribuicao():
+    assert contribuicao(None, None) == Counter({"total": 1, "sem_sentimento": 1})
+    assert contribuicao("POSITIVE", ["amor", "amor", "mar"]) == Counter(
+        {"total": 1, "sentimentos.POSITIVE": 1, "tags.amor": 2, "tags.mar": 1})
+
+
+def test_contribuicao_escapa_chaves_invalidas_no_mongo():
+    tags = [chave[len("tags."):] for chave in contribuicao("NEUTRAL", ["a.b", "$x"]) if chave.startswith("tags.")]
+    assert len(tags) == 2
+    assert all("." not in tag and not tag.startswith("$") for tag in tags)
+
+
+def test_variacao_do_enriquecimento():
+    delta = variacao(_poema(), {CAMINHO_SENTIMENTO: "POSITIVE", CAMINHO_TAGS: ["amor"]})
+    assert _sem_zeros(delta) == {"sem_sentimento": -1, "sentimentos.POSITIVE": 1, "tags.amor": 1}
+
+
+def test_variacao_troca_so_as_tags():
+    delta = variacao(_poema("NEGATIVE", ["dor", "mar"]), {CAMINHO_TAGS: ["mar", "saudade"]})
+    assert _sem_zeros(delta) == {"tags.dor": -1, "tags.saudade": 1}
+
+
+def test_variacao_sem_campos_das_estatisticas():
+    assert variacao(_poema("NEGATIVE", ["dor"]), {"sentiment_analysis.keywords": ["x"]}) == Counter()
+
+
+def test_variacao_sem_mudanca_nao_soma_nada():
+    assert _sem_zeros(variacao(_poema("NEGATIVE", ["dor"]), {CAMINHO_SENTIMENTO: "NEGATIVE"})) == {}
+
+
+def test_resumo_volta_as_chaves_originais_e_limita_as_tags():
+    documento = {"total": 4, "sem_sentimento": 1, "sentimentos": {"POSITIVE": 3, "NEGATIVE": 0}, "tags": {}}
+    for tag, n in (("a.b", 3), ("$x", 2), ("mar", 2), ("sumiu", 0)):
+        documento["tags"].update({chave.split(".", 1)[1]: n for chave in contribuicao(None, [tag])
+                                  if chave.startswith("tags.")})
+    estatisticas = resumo(documento, limite_tags=2)
+    assert estatisticas["enriquecidos"] == 3 and estatisticas["cobertura"] == 0.75
+    assert estatisticas["sentimentos"] == {"POSITIVE": 3}
+    assert estatisticas["tags"] == {"a.b": 3, "$x": 2}
+    assert estatisticas["tags_distintas"] == 3
+
+
+def test_resumo_sem_documento():
+    assert resumo(None)["cobertura"] == 0.0
@@ -0,0 +1,64 @@
+import io
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("textblob")
+from bson import ObjectId
+
+from leitor_extended_json import em_lotes, ler_registros
+
+ID = "65a1b2c3d4e5f60718293a4b"
+REGISTRO = '{"_id": {"$oid": "%s"}, "timestamp": {"$date": "2024-05-01T12:00:00Z"}, "texto": "olá, [mundo]"}' % ID
+
+
+def _ler(texto, **opcoes):
+    # Blocos minúsculos: registros sempre chegam cortados no meio
+    return list(ler_registros(io.StringIO(texto), tamanho_bloco=5, **opcoes))
+
+
+def test_array_com_tipos_do_extended_json():
+    registros = _ler(f"[\n  {REGISTRO},\n  {REGISTRO}\n]\n")
+    assert len(registros) == 2
+    assert registros[0] == {"_id": ObjectId(ID), "timestamp": datetime(2024, 5, 1, 12), "texto": "olá, [mundo]"}
+
+
+def test_um_registro_por_linha():
+    assert len(_ler(f"{REGISTRO}\n{REGISTRO}\n{REGISTRO}")) == 3
+
+
+def test_array_vazio_e_arquivo_vazio():
+    assert _ler("[]") == []
+    assert _ler("") == []
+
+
+def test_linha_invalida_e_pulada_com_a_posicao(capsys):
+    linhas = [REGISTRO, '{"_id": 1, "quebrado": }', REGISTRO]
+    assert len(_ler("\n".join(linhas) + "\n")) == 2
+    assert f"caractere {len(REGISTRO) + 1}" in capsys.readouterr().out
+
+
+def test_registro_invalido_no_array_para_com_a_posicao():
+    with pytest.raises(ValueError, match=f"caractere {len(REGISTRO) + 2}"):
+        _ler(f"[{REGISTRO},{{\"a\": }},{REGISTRO}]")
+
+
+def test_registro_maior_que_o_limite_nao_segura_o_arquivo_inteiro():
+    class Arquivo(io.StringIO):
+        lido = 0
+
+        def read(self, tamanho=-1):
+            bloco = super().read(tamanho)
+            Arquivo.lido += len(bloco)
+            return bloco
+
+    arquivo = Arquivo('[{"texto": "' + "x" * 10000)
+    with pytest.raises(ValueError, match="caractere 1"):
+        list(ler_registros(arquivo, tamanho_bloco=100, tamanho_maximo=1000))
+    assert Arquivo.lido < 2000
+
+
+def test_em_lotes():
+    assert list(em_lotes(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(em_lotes([], 2)) == []
@@ -0,0 +1,124 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pymongo")
+from bson import ObjectId
+
+from repositorio import RepositorioSQLite, abrir_repositorio, filtro_do_balde, projetar
+
+
+def _poema(titulo, sentimento=None, sentimentos=(), keywords=()):
+    return {
+        "title": titulo,
+        "full_text": f"Texto de {titulo}",
+        "criado_em": datetime(2024, 1, 2, 3, 4, 5),
+        "sentiment_analysis": {"primary_sentiment": sentimento, "keywords": list(keywords)},
+        "recommendation_tags": {"good_for_feeling": list(sentimentos)},
+    }
+
+
+def _titulos(poemas):
+    return sorted(poema["title"] for poema in poemas)
+
+
+@pytest.fixture
+def repositorio(tmp_path):
+    repositorio = abrir_repositorio(f"sqlite:{tmp_path / 'poemas.db'}")
+    yield repositorio
+    repositorio.fechar()
+
+
+@pytest.fixture
+def poemas(repositorio):
+    poemas = [
+        _poema("A", "POSITIVE", ["happy"], ["Amor", "mar"]),
+        _poema("B", "NEGATIVE", ["sad"], ["mar"]),
+        _poema("C"),
+        _poema("D"),
+    ]
+    assert repositorio.inserir(poemas) == 4
+    return poemas
+
+
+def test_abrir_repositorio_desconhecido():
+    with pytest.raises(ValueError):
+        abrir_repositorio("redis:localhost")
+
+
+def test_documentos_voltam_com_tipos_do_bson(repositorio, poemas):
+    lidos = {poema["_id"]: poema for poema in repositorio.todos()}
+    assert set(lidos) == {poema["_id"] for poema in poemas}
+    assert all(isinstance(poem_id, ObjectId) for poem_id in lidos)
+    assert lidos[poemas[0]["_id"]]["criado_em"] == datetime(2024, 1, 2, 3, 4, 5)
+
+
+def test_candidatos_pelos_baldes(repositorio, poemas):
+    assert _titulos(repositorio.candidatos("happy")) == ["A"]
+    assert _titulos(repositorio.candidatos(keyword="MAR")) == ["A", "B"]
+    assert _titulos(repositorio.candidatos("sad", "mar")) == ["B"]
+    assert _titulos(repositorio.candidatos("sad", "amor")) == []
+    assert len(repositorio.candidatos()) == 4
+    assert len(repositorio.candidatos(limite=2)) == 2
+    assert _titulos(repositorio.amostra(10, keyword="mar")) == ["A", "B"]
+
+
+def test_projecao_com_caminhos_com_ponto(repositorio, poemas):
+    lido = repositorio.candidatos("happy", projecao={"title": 1, "sentiment_analysis.keywords": 1})[0]
+    assert lido == {"_id": poemas[0]["_id"], "title": "A", "sentiment_analysis": {"keywords": ["Amor", "mar"]}}
+
+
+def test_lease_separa_os_lotes(repositorio, poemas):
+    assert repositorio.contar_pendentes() == 2
+    token, lote = repositorio.reivindicar_pendentes("trabalhador-1", 1, 60)
+    outro_token, outro_lote = repositorio.reivindicar_pendentes("trabalhador-2", 10, 60)
+    assert len(lote) == 1 and len(outro_lote) == 1
+    assert lote[0]["_id"] != outro_lote[0]["_id"]
+    assert repositorio.reivindicar_pendentes("trabalhador-3", 10, 60) == (None, [])
+
+    repositorio.liberar(outro_token)
+    assert len(repositorio.reivindicar_pendentes("trabalhador-3", 10, 60)[1]) == 1
+
+
+def test_atualizar_campos_so_grava_com_o_lease(repositorio, poemas):
+    token, lote = repositorio.reivindicar_pendentes("trabalhador-1", 10, 60)
+    novos = {"sentiment_analysis.primary_sentiment": "NEUTRAL", "recommendation_tags.good_for_feeling": ["calm"]}
+    assert repositorio.atualizar_campos([(lote[0], novos)], token="token-de-outro") == 0
+    assert repositorio.atualizar_campos([(poema, novos) for poema in lote], token=token) == 2
+    assert repositorio.contar_pendentes() == 0
+    assert _titulos(repositorio.candidatos("calm")) == ["C", "D"]
+    # Lease devolvido junto com a escrita: o mesmo token não grava de novo
+    assert repositorio.atualizar_campos([(lote[0], novos)], token=token) == 0
+
+
+def test_atualizar_campos_troca_os_baldes(repositorio, poemas):
+    repositorio.atualizar_campos([(poemas[0], {"sentiment_analysis.keywords": ["sol"]})])
+    assert repositorio.candidatos(keyword="amor") == []
+    assert [poema["title"] for poema in repositorio.candidatos(keyword="sol")] == ["A"]
+
+
+def test_limpar(repositorio, poemas):
+    repositorio.limpar()
+    assert list(repositorio.todos()) == [] and repositorio.candidatos("happy") == []
+
+
+def test_dois_processos_no_mesmo_arquivo(tmp_path):
+    caminho = tmp_path / "compartilhado.db"
+    primeiro, segundo = RepositorioSQLite(caminho), RepositorioSQLite(caminho)
+    try:
+        primeiro.inserir([_poema("A"), _poema("B")])
+        token, lote = segundo.reivindicar_pendentes("trabalhador-2", 1, 60)
+        assert len(lote) == 1
+        assert len(primeiro.reivindicar_pendentes("trabalhador-1", 10, 60)[1]) == 1
+    finally:
+        primeiro.fechar()
+        segundo.fechar()
+
+
+def test_filtro_do_balde_e_projetar():
+    assert filtro_do_balde("Sad", "Mar") == {"recommendation_tags.good_for_feeling": "sad",
+                                             "sentiment_analysis.keywords": "mar"}
+    assert filtro_do_balde() == {}
+    poema = {"_id": 1, "a": {"b": 2, "c": 3}, "d": 4}
+    assert projetar(poema, {"a.b": 1, "x.y": 1}) == {"_id": 1, "a": {"b": 2}}
+    assert projetar(poema, None) is poema
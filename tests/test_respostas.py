@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import respostas
+from respostas import ArquivoEstatico, renderizar_fragmento, resposta_de_fragmento
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    caminho = tmp_path / "index.html"
+    caminho.write_text("<html>" + "poesia " * 500 + "</html>", encoding="utf-8")
+    estatico = ArquivoEstatico(caminho, "text/html")
+    estatico.variantes.setdefault("br", b"variante br")  # Sem o pacote brotli, finge a variante
+    return estatico
+
+
+def test_if_none_match(arquivo):
+    etag = f'"{arquivo.etag}"'
+    assert arquivo.corresponde(etag)
+    assert arquivo.corresponde(f"W/{etag}")
+    assert arquivo.corresponde(f'"outro", {etag}')
+    assert arquivo.corresponde(f'"outro",W/{etag} ')
+    assert arquivo.corresponde("*")
+    assert not arquivo.corresponde(arquivo.etag)  # Sem aspas não é um ETag
+    assert not arquivo.corresponde(f'"{arquivo.etag}x"')
+    assert not arquivo.corresponde('"outro"')
+    assert not arquivo.corresponde("")
+    assert not arquivo.corresponde(None)
+
+
+@pytest.mark.parametrize("cabecalho, esperada", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=0, br;q=0", "identity"),
+    ("gzip;q=0", "identity"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("gzip;q=0.5, br;q=0.9", "br"),
+    ("*", "br"),
+    ("*;q=0", "identity"),
+    ("*, br;q=0", "gzip"),
+    ("identity, gzip;q=0.5", "identity"),
+    ("GZIP; Q=0.3", "gzip"),
+    ("gzip;q=abc", "identity"),
+    ("deflate", "identity"),
+    ("", "identity"),
+    (None, "identity"),
+])
+def test_escolher_codificacao(arquivo, cabecalho, esperada):
+    codificacao, conteudo = arquivo.escolher(cabecalho)
+    assert codificacao == esperada
+    assert conteudo == arquivo.variantes[esperada]
+
+
+def test_variantes_descomprimem_para_o_original(arquivo):
+    import gzip
+    assert gzip.decompress(arquivo.variantes["gzip"]) == arquivo.variantes["identity"]
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    (None, 10), ("5", 5), ("0", 1), ("-3", 1), ("999", 20), ("abc", 10), ("", 10), ("2.5", 10),
+])
+def test_limite_da_consulta(valor, esperado):
+    assert respostas.limite_da_consulta(valor, 10, 20) == esperado
+
+
+def test_resposta_pre_renderizada_e_json_valido():
+    poema = {"title": "Soneto", "full_text": "Amor é fogo\nque arde sem se ver", "author": "Camões",
+             "recommendation_tags": {"evokes": ["paixão", "dor"]}}
+    analise = {"sentiment_display": "positivo", "sentiment": "happy"}
+    corpo = json.loads(resposta_de_fragmento(renderizar_fragmento(poema), analise))
+    assert corpo == {
+        "ok": True,
+        "sentiment": "Detectamos um tom positivo. Recomendação:",
+        "poem": "SONETO\n\nAmor é fogo\nque arde sem se ver\n\n-- Camões",
+        "details": {"tags": ["paixão", "dor"], "match_sentiment": "happy"},
+    }
@@ -0,0 +1,53 @@
+import sessoes
+from sessoes import ConjuntoVistos, SessoesVistos
+
+
+def test_conjunto_vistos_adiciona_e_consulta():
+    vistos = ConjuntoVistos()
+    assert 0 not in vistos and 1000 not in vistos
+    for indice in (0, 7, 8, 1000):
+        vistos.adicionar(indice)
+    assert all(indice in vistos for indice in (0, 7, 8, 1000))
+    assert 1 not in vistos and 999 not in vistos and 5000 not in vistos
+    assert len(vistos) == 4
+
+
+def test_conjunto_vistos_nao_conta_repetidos_e_cresce_so_ate_o_maior():
+    vistos = ConjuntoVistos()
+    vistos.adicionar(17)
+    vistos.adicionar(17)
+    assert len(vistos) == 1
+    assert len(vistos._bits) == 3  # 17 >> 3 = byte 2
+
+
+def test_conjunto_vistos_limpar():
+    vistos = ConjuntoVistos()
+    vistos.adicionar(3)
+    vistos.limpar()
+    assert len(vistos) == 0 and 3 not in vistos
+
+
+def test_sessoes_reusam_o_conjunto_e_expiram_por_ttl(monkeypatch):
+    agora = [100.0]
+    monkeypatch.setattr(sessoes.time, "monotonic", lambda: agora[0])
+    sessoes_vistos = SessoesVistos(ttl=10.0)
+
+    primeira = sessoes_vistos.obter("a")
+    primeira.adicionar(5)
+    agora[0] += 5
+    assert sessoes_vistos.obter("a") is primeira
+
+    agora[0] += 11
+    nova = sessoes_vistos.obter("a")
+    assert nova is not primeira and 5 not in nova
+
+
+def test_sessoes_descartam_a_menos_usada_acima_do_limite():
+    sessoes_vistos = SessoesVistos(max_sessoes=2)
+    a = sessoes_vistos.obter("a")
+    sessoes_vistos.obter("b")
+    sessoes_vistos.obter("a")  # "b" passa a ser a menos recente
+    sessoes_vistos.obter("c")
+    assert len(sessoes_vistos) == 2
+    assert sessoes_vistos.obter("a") is a
+    assert "b" not in sessoes_vistos._sessoes
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+ESPERA = 5  # Segundos: só estoura se a coalescência travar
+
+
+def _disparar(voo, chave, funcao, quantidade):
+    """Roda 'quantidade' chamadas simultâneas; devolve (resultados, erros)."""
+    resultados, erros = [], []
+
+    def chamar():
+        try:
+            resultados.append(voo.executar(chave, funcao))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=chamar) for _ in range(quantidade)]
+    for thread in threads:
+        thread.start()
+    return threads, resultados, erros
+
+
+def _esperar_seguidores(voo, quantidade):
+    # O líder está bloqueado dentro da função; espera os outros entrarem na fila
+    for _ in range(500):
+        if voo.coalescidas >= quantidade:
+            return
+        time.sleep(0.01)
+    pytest.fail("as chamadas não foram coalescidas")
+
+
+def test_chamadas_simultaneas_executam_uma_vez():
+    voo, liberar, execucoes = SingleFlight(), threading.Event(), []
+
+    def trabalho():
+        execucoes.append(1)
+        assert liberar.wait(ESPERA)
+        return "poema"
+
+    threads, resultados, erros = _disparar(voo, "chave", trabalho, 5)
+    _esperar_seguidores(voo, 4)
+    liberar.set()
+    for thread in threads:
+        thread.join(ESPERA)
+
+    assert resultados == ["poema"] * 5 and not erros
+    assert len(execucoes) == 1
+    assert (voo.execucoes, voo.coalescidas) == (1, 4)
+
+
+def test_excecao_e_compartilhada():
+    voo, liberar = SingleFlight(), threading.Event()
+
+    def trabalho():
+        assert liberar.wait(ESPERA)
+        raise RuntimeError("banco fora do ar")
+
+    threads, resultados, erros = _disparar(voo, "chave", trabalho, 3)
+    _esperar_seguidores(voo, 2)
+    liberar.set()
+    for thread in threads:
+        thread.join(ESPERA)
+
+    assert not resultados
+    assert len(erros) == 3 and all(str(e) == "banco fora do ar" for e in erros)
+
+
+def test_nada_fica_guardado_depois_da_chamada():
+    voo, contador = SingleFlight(), iter(range(10))
+    assert voo.executar("chave", lambda: next(contador)) == 0
+    assert voo.executar("chave", lambda: next(contador)) == 1
+    assert voo.coalescidas == 0
+
+
+def test_chaves_diferentes_nao_se_misturam():
+    voo = SingleFlight()
+    assert voo.executar(("sad", None), lambda: "triste") == "triste"
+    assert voo.executar(("happy", None), lambda: "feliz") == "feliz"
+    assert voo.execucoes == 2
@@ -0,0 +1,84 @@
+import pytest
+
+bson = pytest.importorskip("bson")
+from bson import ObjectId
+
+from catalogo import CatalogoPoemas
+from snapshot_catalogo import CatalogoSnapshot, exportar_snapshot
+
+
+def _poema(titulo, autor, texto, keywords=(), evokes=(), sentimentos=(), vezes=0):
+    return {
+        "_id": ObjectId(),
+        "title": titulo,
+        "author": autor,
+        "full_text": texto,
+        "sentiment_analysis": {"keywords": list(keywords)},
+        "recommendation_tags": {"evokes": list(evokes), "good_for_feeling": list(sentimentos)},
+        "metadata": {"times_recommended": vezes},
+    }
+
+
+@pytest.fixture
+def poemas():
+    return [
+        _poema("Canção do exílio", "Gonçalves Dias", "Minha terra tem palmeiras,\nOnde canta o Sabiá",
+               keywords=["terra", "sabiá"], evokes=["saudade"], sentimentos=["sad", "nostalgic"], vezes=3),
+        _poema("Soneto", "Autor", "", keywords=["Amor"], evokes=["paixão", "saudade"], sentimentos=["happy"]),
+        _poema("Sem tags", "Autor", "Só texto 🌙"),
+    ]
+
+
+@pytest.fixture
+def snapshot(tmp_path, poemas):
+    caminho = tmp_path / "catalogo.snapshot"
+    assert exportar_snapshot(poemas, caminho) == len(poemas)
+    return CatalogoSnapshot(caminho)
+
+
+def test_poemas_voltam_iguais(snapshot, poemas):
+    assert len(snapshot) == len(poemas)
+    for indice, original in enumerate(poemas):
+        lido = snapshot.poema(indice)
+        assert lido["_id"] == original["_id"]
+        assert lido["title"] == original["title"]
+        assert lido["author"] == original["author"]
+        assert lido["full_text"] == original["full_text"]
+        assert lido["sentiment_analysis"]["keywords"] == [k.lower() for k in original["sentiment_analysis"]["keywords"]]
+        assert lido["recommendation_tags"] == original["recommendation_tags"]
+        assert lido["metadata"]["times_recommended"] == original["metadata"]["times_recommended"]
+
+
+def test_indice_por_id(snapshot, poemas):
+    for indice, poema in enumerate(poemas):
+        assert snapshot.indice_de(poema["_id"]) == indice
+    assert snapshot.indice_de(ObjectId()) is None
+    assert snapshot.indice_de(str(poemas[0]["_id"])) is None
+
+
+def test_candidatos_iguais_aos_do_catalogo_em_memoria(snapshot, poemas):
+    memoria = CatalogoPoemas(poemas)
+    for filtros in [("sad", None), ("HAPPY", None), (None, "amor"), (None, "Terra"), ("sad", "terra"),
+                    ("happy", "terra"), ("inexistente", None), (None, None)]:
+        assert list(snapshot.candidatos(*filtros)) == list(memoria.candidatos(*filtros)), filtros
+
+
+def test_incrementos_somam_sobre_o_exportado(snapshot, poemas):
+    snapshot.aplicar_incrementos({poemas[0]["_id"]: 2, ObjectId(): 5})
+    assert snapshot.vezes_recomendado(0) == 5
+    assert snapshot.vezes_recomendado(1) == 0
+
+
+def test_arquivo_de_outro_formato_e_recusado(tmp_path):
+    caminho = tmp_path / "invalido.snapshot"
+    caminho.write_bytes(b"NAOEPOESIA" + bytes(64))
+    with pytest.raises(ValueError):
+        CatalogoSnapshot(caminho)
+
+
+def test_catalogo_vazio(tmp_path):
+    caminho = tmp_path / "vazio.snapshot"
+    exportar_snapshot([], caminho)
+    snapshot = CatalogoSnapshot(caminho)
+    assert len(snapshot) == 0
+    assert list(snapshot.candidatos("sad")) == []
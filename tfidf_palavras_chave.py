@@ -0,0 +1,235 @@
+import argparse
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import spacy
+from pymongo import UpdateOne
+from scipy import sparse
+
+from cache_lemas import AnalisadorCacheado
+from conexao import NOME_BANCO, criar_cliente
+from perfilamento import Perfilador
+from regras_enriquecimento import versoes_apos_escrita
+
+# --- PALAVRAS-CHAVE POR TF-IDF NO CORPUS INTEIRO ---
+# O extrair_palavras_chave.py escolhe as 5 palavras mais frequentes DENTRO do
+# poema, então termos genéricos ("olhos", "vida", "amor") dominam o corpus e
+# borram os baldes de keyword do recomendador. Aqui:
+#   1. cada poema passa UMA vez pelo spaCy (com o cache de lemas); a contagem
+#      de lemas fica salva em 'poem_terms' ({_id: id do poema, termos:
+#      {lema: n}, keywords: [...]}) e o poema ganha 'termos_contados_em' (o
+#      'atualizado_em' que ele tinha quando foi contado). Só voltam ao spaCy
+#      os poemas sem essa marca ou alterados depois dela (atualizado_em
+#      maior): o filtro roda no servidor, sem trazer o texto dos já contados;
+#   2. a frequência de documentos de cada lema fica em 'term_df' ({_id: lema,
+#      df: n}) e o total de poemas em job_state "tfidf". Poemas novos só
+#      somam ($inc) nesses contadores e os alterados trocam os termos antigos
+#      pelos novos: a IDF é atualizada sem reprocessar nada. Reimportar o CSV
+#      (repositorio.limpar) apaga esses contadores junto com os poemas;
+#   3. a matriz termo-documento (scipy.sparse CSR) é montada a partir de
+#      'poem_terms', a IDF calculada vetorizada e o top-k de cada poema sai da
+#      linha TF-IDF. Só é regravado quem teve as keywords alteradas.
+#
+# Uso: python tfidf_palavras_chave.py [--top 5] [--somente-novos] [--profile]
+
+TOP_K = 5
+LOTE_ESCRITA = 1000
+ESTADO_TFIDF = "tfidf"
+# Poemas anteriores ao campo 'atualizado_em' contam como "contados nesta data"
+SEM_DATA = datetime(1970, 1, 1)
+# Enriquecidos que nunca passaram pelo spaCy ou mudaram desde a contagem
+A_CONTAR = {
+    "sentiment_analysis.primary_sentiment": {"$ne": None},
+    "$or": [{"termos_contados_em": {"$exists": False}},
+            {"$expr": {"$gt": ["$atualizado_em", "$termos_contados_em"]}}],
+}
+CLASSES_RELEVANTES = ("NOUN", "PROPN", "ADJ")
+
+
+def lemas_relevantes(doc):
+    """Lemas (minúsculos) dos substantivos/nomes próprios/adjetivos, sem stopwords nem pontuação."""
+    return [token.lemma_.lower() for token in doc
+            if not token.is_stop and not token.is_punct and token.pos_ in CLASSES_RELEVANTES]
+
+
+def contar_novos(db, analisador, perfil):
+    """Passa pelo spaCy os poemas enriquecidos novos ou alterados desde a última contagem.
+
+    Atualiza 'term_df' e o total de documentos incrementalmente. Devolve quantos
+    poemas foram contados.
+    """
+    cursor = db["poems"].find(A_CONTAR, {"full_text": 1, "atualizado_em": 1})
+    total, lote = 0, []  # [(_id, atualizado_em, termos)]
+
+    def descarregar():
+        # Termos antigos dos alterados saem do df; os que não tinham 'poem_terms' são documentos novos
+        antigos = {doc["_id"]: doc.get("termos") or {}
+                   for doc in db["poem_terms"].find({"_id": {"$in": [poem_id for poem_id, _, _ in lote]}},
+                                                    {"termos": 1})}
+        df_delta = Counter()
+        for poem_id, _, termos in lote:
+            df_delta.update(termos.keys())
+            df_delta.subtract(antigos.get(poem_id, {}).keys())
+        with perfil.etapa("write"):
+            # Sem 'keywords': o --somente-novos recalcula os alterados também
+            db["poem_terms"].bulk_write([UpdateOne({"_id": poem_id}, {"$set": {"termos": termos},
+                                                                      "$unset": {"keywords": ""}}, upsert=True)
+                                         for poem_id, _, termos in lote], ordered=False)
+            incrementos = [UpdateOne({"_id": termo}, {"$inc": {"df": n}}, upsert=True)
+                           for termo, n in df_delta.items() if n]
+            if incrementos:
+                db["term_df"].bulk_write(incrementos, ordered=False)
+            novos = sum(1 for poem_id, _, _ in lote if poem_id not in antigos)
+            if novos:
+                db["job_state"].update_one({"_id": ESTADO_TFIDF}, {"$inc": {"documentos": novos}}, upsert=True)
+            # Por último a marca: se algo acima falhar, o poema é contado de novo
+            db["poems"].bulk_write([UpdateOne({"_id": poem_id}, {"$set": {"termos_contados_em": atualizado_em}})
+                                    for poem_id, atualizado_em, _ in lote], ordered=False)
+        lote.clear()
+
+    for poem in perfil.iterar(cursor):
+        # Poemas já vistos saem do cache de lemas, sem passar pelo modelo
+        with perfil.etapa("analyse"):
+            termos = Counter(lemas_relevantes(analisador.analisar(poem.get("full_text"))))
+        # Chaves com "." ou "$" não podem ser campos no MongoDB
+        termos = {termo: n for termo, n in termos.items() if "." not in termo and not termo.startswith("$")}
+        lote.append((poem["_id"], poem.get("atualizado_em") or SEM_DATA, termos))
+        total += 1
+        if len(lote) >= LOTE_ESCRITA:
+            descarregar()
+    if lote:
+        descarregar()
+    return total
+
+
+def montar_matriz(db, filtro=None):
+    """Matriz CSR (poemas x termos) de contagens, com os ids das linhas e o vocabulário."""
+    vocabulario, df = {}, []
+    for doc in db["term_df"].find({"df": {"$gt": 0}}):
+        vocabulario[doc["_id"]] = len(df)
+        df.append(doc["df"])
+
+    ids, keywords_atuais, indptr, indices, dados = [], [], [0], [], []
+    for doc in db["poem_terms"].find(filtro or {}):
+        colunas = [(vocabulario[t], n) for t, n in doc.get("termos", {}).items() if t in vocabulario]
+        indices.extend(c for c, _ in colunas)
+        dados.extend(n for _, n in colunas)
+        indptr.append(len(indices))
+        ids.append(doc["_id"])
+        keywords_atuais.append(doc.get("keywords"))
+
+    matriz = sparse.csr_matrix(
+        (np.asarray(dados, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(ids), len(vocabulario)),
+    )
+    return matriz, ids, keywords_atuais, vocabulario, np.asarray(df, dtype=np.float64)
+
+
+def calcular_idf(df, total_documentos):
+    """IDF suavizada (mesma fórmula do scikit-learn): log((1 + N) / (1 + df)) + 1."""
+    return np.log((1.0 + total_documentos) / (1.0 + df)) + 1.0
+
+
+def top_k_por_linha(matriz_tfidf, termos, k):
+    """Os k termos de maior peso em cada linha da CSR (empate: ordem alfabética)."""
+    resultado = []
+    for i in range(matriz_tfidf.shape[0]):
+        inicio, fim = matriz_tfidf.indptr[i], matriz_tfidf.indptr[i + 1]
+        pesos, colunas = matriz_tfidf.data[inicio:fim], matriz_tfidf.indices[inicio:fim]
+        if len(pesos) > k:
+            escolhidos = np.argpartition(-pesos, k - 1)[:k]
+            pesos, colunas = pesos[escolhidos], colunas[escolhidos]
+        ordem = sorted(range(len(pesos)), key=lambda j: (-pesos[j], termos[colunas[j]]))
+        resultado.append([termos[colunas[j]] for j in ordem])
+    return resultado
+
+
+def recalcular_keywords(db, k, perfil, filtro=None):
+    """Top-k por TF-IDF para os poemas de 'poem_terms' (filtro opcional). Devolve quantos mudaram."""
+    with perfil.etapa("matriz"):
+        matriz, ids, keywords_atuais, vocabulario, df = montar_matriz(db, filtro)
+        estado = db["job_state"].find_one({"_id": ESTADO_TFIDF}) or {}
+        total_documentos = estado.get("documentos", matriz.shape[0])
+        if matriz.shape[0] == 0:
+            return 0
+
+        # TF sublinear (1 + log tf) para um verso repetido não dominar o poema
+        tf = matriz.copy()
+        tf.data = 1.0 + np.log(tf.data)
+        tfidf = (tf @ sparse.diags(calcular_idf(df, total_documentos))).tocsr()
+
+    with perfil.etapa("analyse"):
+        termos = [None] * len(vocabulario)
+        for termo, coluna in vocabulario.items():
+            termos[coluna] = termo
+        novas_keywords = top_k_por_linha(tfidf, termos, k)
+
+    alterados, lote_poemas, lote_termos = 0, [], []
+    for poem_id, atuais, novas in zip(ids, keywords_atuais, novas_keywords):
+        if atuais == novas:
+            continue
+        # Pipeline com $$NOW: a própria escrita das keywords não conta como alteração do poema
+        # (atualizado_em == termos_contados_em), então ele não volta ao spaCy na próxima execução.
+        # A marca só acompanha se o poema não mudou desde a contagem: editado no meio tempo,
+        # ele continua com atualizado_em > termos_contados_em e é contado de novo.
+        lote_poemas.append(UpdateOne({"_id": poem_id}, [{"$set": {
+            "sentiment_analysis.keywords": {"$literal": novas},
+            **versoes_apos_escrita(["keywords"]),
+            "atualizado_em": "$$NOW",
+            "termos_contados_em": {"$cond": [
+                {"$eq": [{"$ifNull": ["$atualizado_em", SEM_DATA]}, "$termos_contados_em"]},
+                "$$NOW", "$termos_contados_em",
+            ]},
+        }}]))
+        lote_termos.append(UpdateOne({"_id": poem_id}, {"$set": {"keywords": novas}}))
+        alterados += 1
+        if len(lote_poemas) >= LOTE_ESCRITA:
+            with perfil.etapa("write"):
+                db["poems"].bulk_write(lote_poemas, ordered=False)
+                db["poem_terms"].bulk_write(lote_termos, ordered=False)
+            lote_poemas, lote_termos = [], []
+    if lote_poemas:
+        with perfil.etapa("write"):
+            db["poems"].bulk_write(lote_poemas, ordered=False)
+            db["poem_terms"].bulk_write(lote_termos, ordered=False)
+    return alterados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keywords por TF-IDF no corpus inteiro.")
+    parser.add_argument("--top", type=int, default=TOP_K, help="keywords por poema")
+    parser.add_argument("--somente-novos", action="store_true",
+                        help="só recalcula as keywords dos poemas recém-contados (a IDF é atualizada mesmo assim)")
+    Perfilador.adicionar_opcao(parser)
+    args = parser.parse_args()
+
+    # --profile grava cProfile + relatório por etapa (ver perfilamento.py)
+    perfil = Perfilador.dos_argumentos("tfidf_palavras_chave", args)
+
+    client = criar_cliente()
+    db = client[NOME_BANCO]
+    start_time = time.time()
+
+    print("Carregando o modelo de PLN (spaCy)...")
+    # Só o necessário para lema e classe gramatical
+    nlp = spacy.load("pt_core_news_md", disable=["parser", "ner"])
+
+    analisador = AnalisadorCacheado(nlp)
+    novos = contar_novos(db, analisador, perfil)
+    print(f"Poemas novos contados pelo spaCy: {novos} ({analisador.resumo()})")
+    analisador.cache.salvar()
+
+    filtro = None
+    if args.somente_novos:
+        filtro = {"keywords": {"$exists": False}}
+    alterados = recalcular_keywords(db, args.top, perfil, filtro)
+
+    end_time = time.time()
+    print("\n--- TF-IDF Concluído! ---")
+    print(f"Total de {alterados} poemas com keywords novas em {end_time - start_time:.2f} segundos.")
+    if alterados:
+        print("[AÇÃO] Rode o recalcular_derivados.py para atualizar as tags 'evokes'.")
+    perfil.finalizar(novos + alterados)
+    client.close()
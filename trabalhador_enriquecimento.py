@@ -0,0 +1,112 @@
+import argparse
+import os
+import socket
+import time
+
+from estatisticas_corpus import PROJECAO_ESTATISTICAS
+from perfilamento import Perfilador
+from regras_enriquecimento import enriquecer_poema, enriquecimento_indefinido
+from repositorio import abrir_repositorio
+
+# --- TRABALHADORES DISTRIBUÍDOS DE ENRIQUECIMENTO (com lease) ---
+# Vários destes podem rodar ao mesmo tempo, em máquinas diferentes, sobre o
+# mesmo banco, sem processar o mesmo poema duas vezes:
+#   1. REIVINDICA um lote: marca no próprio poema o campo 'processing'
+#      {owner, token, lease_until}. A marcação é condicional (só pega poema
+#      sem lease ou com lease vencido), então cada poema tem um único dono.
+#   2. PROCESSA o lote (TextBlob, regras_enriquecimento.enriquecer_poema),
+#      renovando o lease se o lote demorar.
+#   3. GRAVA o resultado e REMOVE o lease numa única escrita, condicionada
+#      ao token: quem perdeu o lease (vencido e reivindicado por outro) não
+#      sobrescreve nada.
+# Lease abandonado (trabalhador morto) vence e o poema volta para a fila.
+# A reivindicação e a gravação ficam no repositório (repositorio.py): no
+# MongoDB ou num arquivo SQLite local (POESIA_ARMAZENAMENTO / --armazenamento).
+#
+# Uso: python trabalhador_enriquecimento.py [--lote 100] [--lease 300] [--armazenamento sqlite:poemas.db] [--profile]
+
+CAMPOS_LIDOS = {"full_text": 1, "title": 1, **PROJECAO_ESTATISTICAS}
+
+
+def processar_lote(repositorio, token, poemas, lease_segundos, perfil):
+    """Enriquece e grava; devolve (gravados, erros). Só grava quem ainda detém o lease."""
+    atualizacoes, erros = [], 0
+    renovar_em = time.monotonic() + lease_segundos / 2
+    for poem in poemas:
+        try:
+            with perfil.etapa("analyse"):
+                update_data = enriquecer_poema(poem)
+        except Exception as e:
+            print(f"ERRO ao analisar o poema '{poem.get('title')}' (ID: {poem['_id']}): {e}")
+            erros += 1
+            update_data = enriquecimento_indefinido()
+        atualizacoes.append((poem, update_data))
+
+        if time.monotonic() > renovar_em:
+            repositorio.renovar_lease(token, lease_segundos)
+            renovar_em = time.monotonic() + lease_segundos / 2
+
+    with perfil.etapa("write"):
+        gravados = repositorio.atualizar_campos(atualizacoes, token)
+    return gravados, erros
+
+
+def trabalhar(repositorio, tamanho_lote=100, lease_segundos=300, espera_vazia=0, perfil=None):
+    """Loop do trabalhador. Com espera_vazia=0 termina quando a fila esvazia."""
+    perfil = perfil or Perfilador("trabalhador_enriquecimento")
+    dono = f"{socket.gethostname()}:{os.getpid()}"
+    totais = {"gravados": 0, "perdidos": 0, "erros": 0, "lotes": 0}
+    start_time = time.time()
+    print(f"Trabalhador {dono} iniciado (lote {tamanho_lote}, lease {lease_segundos}s).")
+
+    while True:
+        with perfil.etapa("claim"):
+            token, poemas = repositorio.reivindicar_pendentes(dono, tamanho_lote, lease_segundos, CAMPOS_LIDOS)
+        if token is None:  # Fila vazia
+            if not espera_vazia:
+                break
+            time.sleep(espera_vazia)
+            continue
+        if not poemas:  # Outros trabalhadores levaram todos os candidatos: tenta de novo
+            continue
+
+        try:
+            gravados, erros = processar_lote(repositorio, token, poemas, lease_segundos, perfil)
+        except BaseException:
+            repositorio.liberar(token)
+            raise
+        totais["gravados"] += gravados
+        totais["perdidos"] += len(poemas) - gravados  # lease venceu e outro trabalhador assumiu
+        totais["erros"] += erros
+        totais["lotes"] += 1
+        decorrido = time.time() - start_time
+        print(f"  > {dono}: {totais['gravados']} poemas gravados "
+              f"({totais['gravados'] / decorrido if decorrido else 0:.1f}/s)...")
+    return totais
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trabalhador de enriquecimento com lease (pode rodar em N máquinas).")
+    parser.add_argument("--lote", type=int, default=100, help="poemas reivindicados por vez")
+    parser.add_argument("--lease", type=int, default=300, help="segundos até um lease abandonado ser retomado")
+    parser.add_argument("--esperar", type=float, default=0,
+                        help="com fila vazia, espera N segundos e tenta de novo (0 = termina)")
+    parser.add_argument("--armazenamento", default=None,
+                        help="'mongo' ou 'sqlite:arquivo.db' (padrão: POESIA_ARMAZENAMENTO ou mongo)")
+    Perfilador.adicionar_opcao(parser)
+    args = parser.parse_args()
+
+    # --profile grava cProfile + relatório por etapa (ver perfilamento.py)
+    perfil = Perfilador.dos_argumentos("trabalhador_enriquecimento", args)
+
+    repositorio = abrir_repositorio(args.armazenamento)
+    repositorio.garantir_indices()
+
+    totais = trabalhar(repositorio, args.lote, args.lease, args.esperar, perfil)
+
+    print("\n--- Trabalhador Finalizado ---")
+    print(f"Lotes: {totais['lotes']} | gravados: {totais['gravados']} | erros de análise: {totais['erros']}")
+    if totais["perdidos"]:
+        print(f"Leases perdidos (refeitos por outro trabalhador): {totais['perdidos']}")
+    perfil.finalizar(totais["gravados"])
+    repositorio.fechar()
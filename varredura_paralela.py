@@ -0,0 +1,182 @@
+import multiprocessing
+import os
+import queue
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from pymongo import UpdateOne
+
+from conexao import criar_cliente
+from estatisticas_corpus import PROJECAO_ESTATISTICAS, registrar, variacao
+from perfilamento import Perfilador
+
+# --- VARREDURA PARALELA DA COLEÇÃO POR FAIXAS DE _id ---
+# Para as passadas de manutenção que percorrem o corpus inteiro:
+#   1. sorteia uma amostra de _id ($sample) e escolhe pontos de corte,
+#      dividindo a coleção em faixas de tamanho parecido;
+#   2. cada faixa vai para um processo do pool, que abre o SEU cliente,
+#      o SEU cursor ({_id: {$gte: início, $lt: fim}}) e acumula as
+#      atualizações num bulk_write próprio;
+#   3. o processo principal agrega o progresso de todos (via fila).
+#
+# A transformação é uma função de módulo (importável pelos processos, ver
+# regras_enriquecimento.py) que recebe o poema e devolve o $set ou None.
+# Opcionalmente, 'contar(poema, $set)' (outra função de módulo) classifica
+# cada alteração gravada; as classes somadas voltam em totais["contagem"].
+# Na coleção 'poems', cada lote gravado também soma a variação das
+# estatísticas do corpus (estatisticas_corpus.py).
+
+AMOSTRA_POR_FAIXA = 20
+TAMANHO_LOTE_ESCRITA = 500
+
+
+def pontos_de_corte(collection, faixas, query=None):
+    """_id que dividem a coleção em 'faixas' partes de tamanho parecido (pela amostra)."""
+    if faixas <= 1:
+        return []
+    pipeline = [{"$match": query}] if query else []
+    pipeline += [{"$sample": {"size": faixas * AMOSTRA_POR_FAIXA}}, {"$project": {"_id": 1}}]
+    amostra = sorted({doc["_id"] for doc in collection.aggregate(pipeline)})
+    if len(amostra) < faixas:
+        return amostra[1:]
+    passo = len(amostra) / faixas
+    return [amostra[int(i * passo)] for i in range(1, faixas)]
+
+
+def montar_faixas(cortes):
+    """[(None, c1), (c1, c2), ..., (cn, None)]: None = sem limite."""
+    limites = [None] + list(cortes) + [None]
+    return list(zip(limites[:-1], limites[1:]))
+
+
+def filtro_da_faixa(query, faixa):
+    inicio, fim = faixa
+    condicao = {}
+    if inicio is not None:
+        condicao["$gte"] = inicio
+    if fim is not None:
+        condicao["$lt"] = fim
+    if not condicao:
+        return dict(query or {})
+    if not query:
+        return {"_id": condicao}
+    return {"$and": [query, {"_id": condicao}]}
+
+
+def processar_faixa(transformacao, faixa, banco, colecao, query, projecao, progresso=None, contar=None):
+    """Roda num processo do pool: cursor + bulk_write próprios para uma faixa de _id."""
+    client = criar_cliente()
+    collection = client[banco][colecao]
+    perfil = Perfilador(transformacao.__name__)
+    perfil.iniciar()
+    processados = atualizados = erros = informados = 0
+    lote = []
+    contagens = Counter() if colecao == "poems" else None
+    contagem = Counter()
+
+    def descarregar():
+        with perfil.etapa("write"):
+            collection.bulk_write(lote, ordered=False)
+            if contagens:
+                registrar(collection.database, contagens)
+                contagens.clear()
+        lote.clear()
+
+    def informar():
+        nonlocal informados
+        if progresso is not None:
+            progresso.put(processados - informados)
+        informados = processados
+
+    try:
+        cursor = collection.find(filtro_da_faixa(query, faixa), projecao).sort("_id", 1)
+        for poem in perfil.iterar(cursor):
+            try:
+                with perfil.etapa("analyse"):
+                    novos_valores = transformacao(poem)
+            except Exception as e:
+                print(f"ERRO ao processar o poema (ID: {poem['_id']}): {e}")
+                novos_valores = None
+                erros += 1
+            if novos_valores:
+                if contagens is None:
+                    lote.append(UpdateOne({"_id": poem["_id"]}, {"$set": novos_valores}))
+                else:
+                    # Poemas: 'atualizado_em' para o observador_poemas.py (modo sem change stream)
+                    lote.append(UpdateOne({"_id": poem["_id"]}, {"$set": novos_valores,
+                                                                 "$currentDate": {"atualizado_em": True}}))
+                    contagens.update(variacao(poem, novos_valores))
+                if contar is not None and (classe := contar(poem, novos_valores)) is not None:
+                    contagem[classe] += 1
+                atualizados += 1
+            processados += 1
+
+            if len(lote) >= TAMANHO_LOTE_ESCRITA:
+                descarregar()
+                informar()
+        if lote:
+            descarregar()
+        informar()
+    finally:
+        client.close()
+    return {"processados": processados, "atualizados": atualizados, "erros": erros,
+            "contagem": contagem, "etapas": perfil.etapas}
+
+
+def varrer_em_paralelo(transformacao, banco, colecao="poems", query=None, projecao=None,
+                       processos=None, faixas_por_processo=4, perfil=None, intervalo_progresso=5.0,
+                       contar=None):
+    """Aplica 'transformacao' a todos os documentos de 'query', em paralelo por faixas de _id.
+
+    Devolve os totais {processados, atualizados, erros, contagem}. Com processos=1 roda no
+    próprio processo (mesmo código, sem pool), útil para depuração.
+    """
+    processos = processos or os.cpu_count() or 1
+    if colecao == "poems" and projecao:
+        # A variação das estatísticas precisa do sentimento e das tags de antes
+        projecao = {**projecao, **PROJECAO_ESTATISTICAS}
+    client = criar_cliente()
+    collection = client[banco][colecao]
+    total = collection.count_documents(query or {})
+    faixas = montar_faixas(pontos_de_corte(collection, processos * faixas_por_processo, query))
+    client.close()  # Antes de subir os processos: nada de cliente herdado
+
+    print(f"Varredura de {total} documentos em {len(faixas)} faixas de _id com {processos} processo(s)...")
+    totais = {"processados": 0, "atualizados": 0, "erros": 0, "contagem": Counter()}
+    inicio = time.time()
+
+    def acumular(resultado):
+        for chave in totais:
+            totais[chave] += resultado[chave]  # Counter também soma
+        if perfil is not None:
+            perfil.incorporar(resultado["etapas"])
+
+    if processos == 1:
+        for faixa in faixas:
+            acumular(processar_faixa(transformacao, faixa, banco, colecao, query, projecao, contar=contar))
+        return totais
+
+    # spawn: os processos filhos não herdam threads nem sockets do pai
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Manager() as gerente, ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        progresso = gerente.Queue()
+        pendentes = {
+            pool.submit(processar_faixa, transformacao, faixa, banco, colecao, query, projecao, progresso, contar)
+            for faixa in faixas
+        }
+        vistos, ultimo_aviso = 0, time.time()
+        while pendentes:
+            concluidos, pendentes = wait(pendentes, timeout=1.0, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                acumular(futuro.result())
+            while True:
+                try:
+                    vistos += progresso.get_nowait()
+                except queue.Empty:
+                    break
+            if time.time() - ultimo_aviso >= intervalo_progresso or not pendentes:
+                decorrido = time.time() - inicio
+                print(f"  > Processados {vistos}/{total} ({vistos / decorrido if decorrido else 0:.0f} docs/s)...")
+                ultimo_aviso = time.time()
+    return totais
@@ -0,0 +1,131 @@
+import argparse
+import heapq
+import math
+import time
+from collections import defaultdict
+
+from bson import Binary, ObjectId
+from pymongo import UpdateOne
+
+from conexao import NOME_BANCO, criar_cliente
+from perfilamento import Perfilador
+
+# --- VIZINHOS PRÉ-CALCULADOS ("mais como este") ---
+# Job offline: para cada poema, os TOP_N mais parecidos pelas tags
+# (sentiment_analysis.keywords + recommendation_tags.evokes), com Jaccard
+# ponderado: soma(min(peso)) / soma(max(peso)). O peso de cada tag é o da
+# origem (keyword vale mais que evokes) vezes a IDF da tag, para que tags
+# genéricas ("amor", "melancólico") pesem pouco.
+#
+# Nada de todos-contra-todos: um índice invertido tag -> poemas gera os
+# candidatos, começando pelas tags mais raras e parando em MAX_CANDIDATOS.
+# O resultado vai para 'poem_neighbors' como um array compacto de ids
+# (Binary com 12 bytes por vizinho) + os scores; a rota
+# /api/poems/<id>/similar responde com uma única leitura.
+#
+# Uso: python vizinhos_poemas.py [--top 20] [--profile]
+
+TOP_N = 20
+MAX_CANDIDATOS = 2000
+PESO_KEYWORD = 2.0
+PESO_EVOKES = 1.0
+LOTE_ESCRITA = 1000
+
+
+def pesos_das_tags(poema):
+    """{tag: peso da origem} (a maior, se a tag vem das duas origens)."""
+    pesos = {}
+    for tag in (poema.get("recommendation_tags") or {}).get("evokes") or []:
+        pesos[tag.lower()] = PESO_EVOKES
+    for tag in (poema.get("sentiment_analysis") or {}).get("keywords") or []:
+        pesos[tag.lower()] = max(pesos.get(tag.lower(), 0.0), PESO_KEYWORD)
+    return pesos
+
+
+def jaccard_ponderado(a, b):
+    """soma(min) / soma(max) sobre a união das tags."""
+    minimos = sum(min(peso, b[tag]) for tag, peso in a.items() if tag in b)
+    if not minimos:
+        return 0.0
+    maximos = sum(a.values()) + sum(b.values()) - minimos
+    return minimos / maximos
+
+
+def calcular_vizinhos(poemas, top_n=TOP_N, max_candidatos=MAX_CANDIDATOS):
+    """Lista (por índice) de [(score, índice do vizinho)] em ordem decrescente."""
+    # Índice invertido e IDF
+    postings = defaultdict(list)
+    for indice, poema in enumerate(poemas):
+        for tag in poema:
+            postings[tag].append(indice)
+    total = len(poemas)
+    idf = {tag: math.log((1 + total) / (1 + len(lista))) + 1 for tag, lista in postings.items()}
+    ponderados = [{tag: peso * idf[tag] for tag, peso in poema.items()} for poema in poemas]
+
+    resultado = []
+    for indice, poema in enumerate(ponderados):
+        candidatos = set()
+        # Tags mais raras primeiro: são as que mais discriminam e as que custam menos
+        for tag in sorted(poema, key=lambda t: len(postings[t])):
+            candidatos.update(postings[tag])
+            if len(candidatos) >= max_candidatos:
+                break
+        candidatos.discard(indice)
+        melhores = heapq.nlargest(top_n, ((jaccard_ponderado(poema, ponderados[c]), c) for c in candidatos))
+        resultado.append([(score, c) for score, c in melhores if score > 0])
+    return resultado
+
+
+def ids_compactos(ids):
+    """ObjectIds -> Binary de 12 bytes por id (e volta, com ids_de_binario)."""
+    return Binary(b"".join(poem_id.binary for poem_id in ids))
+
+
+def ids_de_binario(binario):
+    dados = bytes(binario)
+    return [ObjectId(dados[i:i + 12]) for i in range(0, len(dados), 12)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-calcula os vizinhos de cada poema.")
+    parser.add_argument("--top", type=int, default=TOP_N, help="vizinhos guardados por poema")
+    Perfilador.adicionar_opcao(parser)
+    args = parser.parse_args()
+
+    # --profile grava cProfile + relatório por etapa (ver perfilamento.py)
+    perfil = Perfilador.dos_argumentos("vizinhos_poemas", args)
+
+    client = criar_cliente()
+    db = client[NOME_BANCO]
+    start_time = time.time()
+
+    ids, poemas = [], []
+    cursor = db["poems"].find({}, {"sentiment_analysis.keywords": 1, "recommendation_tags.evokes": 1})
+    for poema in perfil.iterar(cursor):
+        ids.append(poema["_id"])
+        poemas.append(pesos_das_tags(poema))
+    print(f"{len(poemas)} poemas carregados. Calculando vizinhos...")
+
+    with perfil.etapa("analyse"):
+        vizinhos = calcular_vizinhos(poemas, args.top)
+
+    lote = []
+    for indice, lista in enumerate(vizinhos):
+        lote.append(UpdateOne({"_id": ids[indice]}, {"$set": {
+            "vizinhos": ids_compactos(ids[c] for _, c in lista),
+            "scores": [round(score, 4) for score, _ in lista],
+        }}, upsert=True))
+        if len(lote) >= LOTE_ESCRITA:
+            with perfil.etapa("write"):
+                db["poem_neighbors"].bulk_write(lote, ordered=False)
+            lote = []
+    if lote:
+        with perfil.etapa("write"):
+            db["poem_neighbors"].bulk_write(lote, ordered=False)
+
+    end_time = time.time()
+    com_vizinhos = sum(1 for lista in vizinhos if lista)
+    print("\n--- Vizinhos Calculados! ---")
+    print(f"{com_vizinhos} de {len(poemas)} poemas com vizinhos, em {end_time - start_time:.2f} segundos.")
+    perfil.finalizar(len(poemas))
+    client.close()
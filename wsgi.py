@@ -0,0 +1,12 @@
+# --- ENTRYPOINT DE PRODUÇÃO (gunicorn) ---
+# Uso: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Com preload_app=True este módulo é importado UMA vez no processo mestre,
+# antes do fork: o app, o catálogo e os recursos de PLN ficam em páginas
+# compartilhadas (copy-on-write) entre todos os workers.
+from app_principal import aquecer, app
+
+# Carrega os recursos pesados ainda no mestre (TextBlob, catálogo). Sem
+# ping no MongoDB aqui: o pool e as threads de monitoramento do driver não
+# atravessam o fork; cada worker aquece a própria conexão em post_worker_init.
+aquecer(mongo=False)